@@ -1,28 +1,45 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, MenuItem, Order, OrderItem, ShiftTokenAllocation, TokenDistribution
+from .models import ArchivedOrder, CustomUser, MenuItem, PickupSlot, Site, Order, OrderItem, ShiftTokenAllocation, TokenDistribution
+
+@admin.register(Site)
+class SiteAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['name', 'code']
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
-    list_display = ['username', 'email', 'first_name', 'last_name', 'role', 'work_shift', 'monthly_tokens', 'last_token_reset']
-    list_filter = ['role', 'is_active', 'is_staff', 'work_shift']
+    list_display = ['username', 'email', 'first_name', 'last_name', 'role', 'work_shift', 'site', 'monthly_tokens', 'last_token_reset']
+    list_filter = ['site', 'role', 'is_active', 'is_staff', 'work_shift']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'user_id']
     
     fieldsets = UserAdmin.fieldsets + (
-        ('Custom Fields', {'fields': ('role', 'work_shift', 'user_id', 'monthly_tokens', 'last_token_reset')}),
+        ('Custom Fields', {'fields': ('site', 'role', 'work_shift', 'user_id', 'monthly_tokens', 'last_token_reset')}),
     )
     readonly_fields = ('last_token_reset',)
 
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
-    list_display = ['name', 'price','description', 'is_available', 'created_at']
-    list_filter = ['is_available', 'created_at']
+    list_display = ['name', 'site', 'price','description', 'is_available', 'daily_stock', 'stock_remaining', 'created_at']
+    list_filter = ['site', 'is_available', 'created_at']
     search_fields = ['name', 'description']
 
+@admin.register(PickupSlot)
+class PickupSlotAdmin(admin.ModelAdmin):
+    list_display = ['starts_at', 'ends_at', 'site', 'capacity', 'reserved']
+    list_filter = ['site', 'starts_at']
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'status', 'total_tokens', 'created_at']
-    list_filter = ['status', 'created_at']
+    list_display = ['id', 'user', 'site', 'pickup_slot', 'status', 'total_tokens', 'created_at']
+    list_filter = ['site', 'status', 'created_at']
+    search_fields = ['user__username', 'user__first_name', 'user__last_name']
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'site', 'status', 'total_tokens', 'created_at', 'archived_at']
+    list_filter = ['site', 'status', 'created_at']
     search_fields = ['user__username', 'user__first_name', 'user__last_name']
 
 @admin.register(OrderItem)
@@ -32,8 +49,8 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 @admin.register(ShiftTokenAllocation)
 class ShiftTokenAllocationAdmin(admin.ModelAdmin):
-    list_display = ['shift', 'tokens_per_user', 'allocation_month']
-    list_filter = ['shift', 'allocation_month']
+    list_display = ['site', 'shift', 'tokens_per_user', 'allocation_month']
+    list_filter = ['site', 'shift', 'allocation_month']
     search_fields = []
 
 
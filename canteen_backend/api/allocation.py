@@ -0,0 +1,99 @@
+"""
+Set-based application of ShiftTokenAllocation rows.
+
+For a month, each (site, shift) allocation's ``tokens_per_user`` is the
+target for that site's users on that shift. A user is due when they have
+no TokenDistribution row for that month with the target amount. Due users are updated in primary-key chunks: one
+UPDATE for balances and one bulk upsert for distribution rows per chunk.
+Running it again is a no-op until an allocation changes or new users
+join, so it is safe to call from the scheduler, the admin endpoint and
+ShiftTokenAllocation.save alike.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+from .models import CustomUser, ShiftTokenAllocation, TokenDistribution
+from .signals import tokens_changed
+from .sites import site_scope
+
+
+def allocation_targets(month, shifts=None, site_ids=None):
+    """{(site_id, shift): tokens_per_user} configured for ``month``"""
+    allocations = ShiftTokenAllocation.objects.filter(allocation_month=month.replace(day=1))
+    if shifts is not None:
+        allocations = allocations.filter(shift__in=shifts)
+    if site_ids is not None:
+        allocations = allocations.filter(site_scope(site_ids))
+    return {
+        (site_id, shift): tokens
+        for site_id, shift, tokens in allocations.values_list('site_id', 'shift', 'tokens_per_user')
+    }
+
+
+def due_users(month, site_id, shift, tokens):
+    return CustomUser.objects.filter(
+        site_id=site_id, role__in=CustomUser.TOKEN_ROLES, work_shift=shift
+    ).exclude(
+        Exists(TokenDistribution.objects.filter(
+            user=OuterRef('pk'), allocation_month=month, tokens_allocated=tokens
+        ))
+    )
+
+
+def plan_allocations(month, shifts=None, site_ids=None):
+    """Dry-run diff: per site and shift, how many users would change and the token totals before and after"""
+    month = month.replace(day=1)
+    plan = []
+    targets = allocation_targets(month, shifts, site_ids)
+    for (site_id, shift), tokens in sorted(targets.items(), key=lambda item: (item[0][0] or 0, item[0][1])):
+        totals = due_users(month, site_id, shift, tokens).aggregate(users=Count('id'), tokens=Sum('monthly_tokens'))
+        plan.append({
+            'site': site_id,
+            'shift': shift,
+            'tokens_per_user': tokens,
+            'users': totals['users'],
+            'tokens_before': totals['tokens'] or 0,
+            'tokens_after': tokens * totals['users'],
+        })
+    return plan
+
+
+def apply_allocations(month, shifts=None, site_ids=None, chunk_size=1000):
+    """
+    Apply the month's allocations to every due user; returns {(site_id, shift): users updated}.
+    A month that has not started yet is left alone (returns {}): its balances would replace the
+    current month's, and its distribution rows would mark everyone as already served.
+    """
+    month = month.replace(day=1)
+    if month > timezone.localdate().replace(day=1):
+        return {}
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    applied = {}
+    for (site_id, shift), tokens in allocation_targets(month, shifts, site_ids).items():
+        due = due_users(month, site_id, shift, tokens)
+        last_pk = 0
+        key = (site_id, shift)
+        applied[key] = 0
+        while True:
+            ids = list(due.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                # Balances already reset for a later month are left alone
+                CustomUser.objects.filter(pk__in=ids, last_token_reset__lt=next_month).update(
+                    monthly_tokens=tokens, last_token_reset=month
+                )
+                TokenDistribution.objects.bulk_create(
+                    [TokenDistribution(user_id=pk, tokens_allocated=tokens, allocation_month=month) for pk in ids],
+                    update_conflicts=True,
+                    unique_fields=['user', 'allocation_month'],
+                    update_fields=['tokens_allocated'],
+                )
+            applied[key] += len(ids)
+            last_pk = ids[-1]
+    if any(applied.values()):
+        tokens_changed.send(sender=CustomUser, site_ids=list({site_id for site_id, _ in applied}))
+    return applied
@@ -0,0 +1,201 @@
+"""
+Time-bucketed analytics for the revenue and consumption charts.
+
+``bucketed`` runs one grouped query per chart. Orders are truncated to
+day, week (Monday) or month in the current timezone, using
+TruncDay/TruncWeek/TruncMonth rather than Python-side date maths, and
+can be split by a dimension (the customer's shift or role, or the menu
+item). The sparse database result is then laid onto the full bucket
+sequence, so every series has one value per bucket and empty buckets
+read 0. With NumPy installed that is one scatter into a (series, bucket)
+grid; without it, the same fill runs over plain lists.
+
+Only completed orders count, as on the dashboards. Ranges are bounded by
+aware local-day boundaries, so the created_at indexes are usable.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .models import CustomUser, Order, OrderItem
+from .utils import day_bounds
+
+TRUNCATE = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+MAX_BUCKETS = 400
+
+# Named ranges: (days back from today, bucket)
+PERIODS = {'week': (7, 'day'), 'month': (30, 'day')}
+
+# Dimension -> (Order lookup, OrderItem lookup); values are grouped on these
+DIMENSIONS = {
+    'shift': ('user__work_shift', 'order__user__work_shift'),
+    'role': ('user__role', 'order__user__role'),
+    'menu_item': (None, 'menu_item_id'),
+}
+# Series labels: menu items are grouped by id, so renamed or same-named dishes
+# stay apart, and labelled with their name from the same query
+MENU_ITEM_LABEL = 'menu_item__name'
+CHOICE_LABELS = {'shift': dict(CustomUser.WORK_SHIFT_CHOICES), 'role': dict(CustomUser.ROLE_CHOICES)}
+METRICS = ('revenue', 'orders', 'items')
+
+
+class AnalyticsError(ValueError):
+    pass
+
+
+def period_range(period, today=None):
+    """(start, end, bucket) for a named period; 'year' is the last 12 calendar months"""
+    today = today or timezone.localdate()
+    if period == 'year':
+        first = today.replace(day=1)
+        for _ in range(11):
+            first = (first - timedelta(days=1)).replace(day=1)
+        return first, today, 'month'
+    if period not in PERIODS:
+        raise AnalyticsError(f"Unknown period '{period}'")
+    days, bucket = PERIODS[period]
+    return today - timedelta(days=days - 1), today, bucket
+
+
+def requested_range(params):
+    """(start, end, bucket) from ?period=week|month|year or ?period=custom&start=&end=, plus ?bucket="""
+    period = params.get('period', 'week')
+    if period == 'custom':
+        try:
+            start, end = parse_date(params.get('start') or ''), parse_date(params.get('end') or '')
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            raise AnalyticsError('A custom period needs start and end dates (YYYY-MM-DD)')
+        bucket = default_bucket(start, end)
+    else:
+        start, end, bucket = period_range(period)
+    return start, end, params.get('bucket') or bucket
+
+
+def default_bucket(start, end):
+    days = (end - start).days + 1
+    if days <= 62:
+        return 'day'
+    if days <= 7 * 52:
+        return 'week'
+    return 'month'
+
+
+def bucket_starts(start, end, bucket):
+    """Every bucket's first day from the one containing ``start`` to the one containing ``end``"""
+    if bucket == 'day':
+        current, step = start, timedelta(days=1)
+    elif bucket == 'week':
+        current, step = start - timedelta(days=start.weekday()), timedelta(days=7)
+    else:
+        current, step = start.replace(day=1), None
+    starts = []
+    while current <= end:
+        starts.append(current)
+        if len(starts) > MAX_BUCKETS:
+            raise AnalyticsError(f'Too many {bucket} buckets; use a wider bucket or a shorter range')
+        current = current + step if step else (current + timedelta(days=32)).replace(day=1)
+    return starts
+
+
+def _rows(site_id, start, end, bucket, metric, dimension):
+    """(bucket, key, menu item name or None, value) rows from one grouped query"""
+    truncate = TRUNCATE[bucket]
+    tz = timezone.get_current_timezone()
+    range_start, range_end = day_bounds(start)[0], day_bounds(end)[1]
+    order_lookup, item_lookup = DIMENSIONS[dimension] if dimension else (None, None)
+
+    if dimension == 'menu_item':
+        # Per-item figures come from the order lines
+        queryset = OrderItem.objects.filter(
+            order__site_id=site_id, order__status='completed',
+            order__created_at__gte=range_start, order__created_at__lt=range_end,
+        ).values(bucket_start=truncate('order__created_at', output_field=DateField(), tzinfo=tz))
+        queryset = queryset.values('bucket_start', key=F(item_lookup), label=F(MENU_ITEM_LABEL))
+        value = {
+            'revenue': Sum(F('quantity') * F('tokens_per_item')),
+            'orders': Count('order', distinct=True),
+            'items': Sum('quantity'),
+        }[metric]
+    else:
+        queryset = Order.objects.filter(
+            site_id=site_id, status='completed', created_at__gte=range_start, created_at__lt=range_end,
+        ).values(bucket_start=truncate('created_at', output_field=DateField(), tzinfo=tz))
+        if dimension:
+            queryset = queryset.values('bucket_start', key=F(order_lookup))
+        value = {'revenue': Sum('total_tokens'), 'orders': Count('id'), 'items': Sum('item_count')}[metric]
+
+    for row in queryset.annotate(value=value).order_by():
+        yield row['bucket_start'], row.get('key'), row.get('label'), row['value'] or 0
+
+
+def _fill(starts, rows):
+    """{key: [value per bucket]} from sparse (bucket start, key, value) rows"""
+    if np is None or not rows:
+        position = {day: index for index, day in enumerate(starts)}
+        series = {}
+        for bucket_start, key, value in rows:
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * len(starts)
+            values[position[bucket_start]] = value
+        return series
+
+    bucket_days, keys, values = zip(*rows)
+    ordinals = np.fromiter((day.toordinal() for day in bucket_days), dtype=np.int64, count=len(rows))
+    positions = np.searchsorted([day.toordinal() for day in starts], ordinals)
+    labels, series_index = np.unique(np.array(keys), return_inverse=True)
+    grid = np.zeros((len(labels), len(starts)), dtype=np.int64)
+    # One row per (bucket, key) after grouping, so plain assignment is enough
+    grid[series_index, positions] = values
+    return dict(zip(labels.tolist(), grid.tolist()))
+
+
+def bucketed(site_id, start, end, bucket=None, metric='revenue', dimension=None):
+    """
+    {'bucket', 'buckets': [first day of each bucket], 'series': [{'key', 'label', 'values'}]}
+    with one value per bucket; without a dimension there is a single 'total' series.
+    """
+    if metric not in METRICS:
+        raise AnalyticsError(f"Unknown metric '{metric}'")
+    if dimension is not None and dimension not in DIMENSIONS:
+        raise AnalyticsError(f"Unknown dimension '{dimension}'")
+    if end < start:
+        raise AnalyticsError('Range ends before it starts')
+    bucket = bucket or default_bucket(start, end)
+    if bucket not in TRUNCATE:
+        raise AnalyticsError(f"Unknown bucket '{bucket}'")
+
+    starts = bucket_starts(start, end, bucket)
+    rows, labels = [], {'total': 'Total'}
+    for bucket_start, key, name, value in _rows(site_id, start, end, bucket, metric, dimension):
+        key = 'total' if dimension is None else key
+        rows.append((bucket_start, key, value))
+        if name is not None:
+            labels[key] = name
+    series = _fill(starts, rows)
+    if not series and dimension is None:
+        series['total'] = [0] * len(starts)
+
+    choices = CHOICE_LABELS.get(dimension, {})
+    return {
+        'bucket': bucket,
+        'start': start,
+        'end': end,
+        'metric': metric,
+        'dimension': dimension,
+        'buckets': starts,
+        'series': [
+            {'key': key, 'label': labels.get(key) or choices.get(key, key), 'values': values}
+            for key, values in sorted(series.items())
+        ],
+    }
@@ -0,0 +1,258 @@
+"""
+Async versions of the hot read endpoints, for ASGI deployments.
+
+DRF views are sync, so under an ASGI server each of them is handed to a
+worker thread. The views here are native ``async def`` Django views that
+use the async ORM and async session API. They mirror their DRF
+counterparts' authentication (session role claim or kiosk token),
+role permissions, throttles and response shapes, and serialize through
+the async fast row functions. Writes stay on the DRF views, except login,
+whose password check awaits the hashing pool instead of holding a worker
+thread (see hashing.py).
+"""
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import SESSION_KEY
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from rest_framework import exceptions
+
+from .authentication import (
+    ROLE_CLAIM_SESSION_KEY, ClaimUser, KioskTokenAuthentication, claim_is_current, claim_version_cache,
+    claim_version_key, role_claim,
+)
+from .fast_serializers import amenu_item_rows, aorder_rows, auser_rows
+from .models import CustomUser, Order
+from .pagination import OrderHistoryPagination
+from .permissions import IsStaffOrAdmin
+from .renderers import FastJSONRenderer
+from .sites import request_site_id
+from .slots import slot_snapshot
+from .sparse import FieldSpec
+from .stock import arollover_stock
+from .throttling import LocMemBucketStore, LoginThrottle, RoleBucketThrottle, UserBucketThrottle, get_store
+from .utils import day_bounds, month_bounds, parse_month
+
+QUEUE_STATUSES = ('pending', 'approved')
+
+
+async def aauthenticate(request):
+    """The requesting user (ClaimUser or CustomUser), or None; raises AuthenticationFailed for bad kiosk tokens"""
+    result = KioskTokenAuthentication().authenticate(request)
+    if result is not None:
+        return result[0]
+
+    session = request.session
+    user_id = await session.aget(SESSION_KEY)
+    if user_id is None:
+        return None
+    claim = await session.aget(ROLE_CLAIM_SESSION_KEY)
+    cache = claim_version_cache()
+    if claim_is_current(claim, await cache.aget(claim_version_key(user_id))):
+        return ClaimUser(CustomUser._meta.pk.to_python(user_id), claim['role'], claim['site_id'])
+
+    # Stale or outdated claim: full lookup (checks the password hash and active flag), then renew it
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_active:
+        return None
+    await session.aset(ROLE_CLAIM_SESSION_KEY, role_claim(user))
+    await cache.aset(claim_version_key(user.pk), user.claim_version, timeout=settings.ROLE_CLAIM_TTL)
+    return user
+
+
+def render(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def throttled(wait):
+    response = JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {int(wait + 1)} seconds.'}, status=429
+    )
+    response['Retry-After'] = str(int(wait + 1))
+    return response
+
+
+async def athrottle(request, throttle_classes=(UserBucketThrottle, RoleBucketThrottle)):
+    """Seconds to wait if one of the throttles refuses the request, else None"""
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        # Only the file and cache stores do blocking I/O
+        if isinstance(get_store(), LocMemBucketStore):
+            allowed = throttle.allow_request(request, None)
+        else:
+            allowed = await sync_to_async(throttle.allow_request)(request, None)
+        if not allowed:
+            return throttle.wait()
+    return None
+
+
+def async_endpoint(permission_class=None):
+    """Authenticate, authorize and throttle like the DRF views, then render the returned data"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method != 'GET':
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                user = await aauthenticate(request)
+            except exceptions.AuthenticationFailed as exc:
+                return JsonResponse({'detail': str(exc.detail)}, status=401)
+            if user is None:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+            request.user = user
+            if permission_class is not None and not permission_class().has_permission(request, None):
+                return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+            wait = await athrottle(request)
+            if wait is not None:
+                return throttled(wait)
+            try:
+                data = await view(request, *args, **kwargs)
+            except exceptions.ValidationError as exc:
+                # Unknown ?fields=/?expand= names (see sparse.py)
+                return render(exc.detail, status=400)
+            return render(data)
+        return wrapped
+    return decorator
+
+
+def menu_view(policy):
+    @async_endpoint(policy.permission_class)
+    async def menu(request):
+        await arollover_stock()
+        items = await amenu_item_rows(policy.menu_queryset(request), FieldSpec.from_request(request))
+        if request.GET.get('slots') not in ('1', 'true'):
+            return items
+        return {'items': items, 'pickup_slots': await sync_to_async(slot_snapshot)(request_site_id(request))}
+    return menu
+
+
+def order_history_view(policy):
+    """
+    Same payload as OrderHistoryView. Past orders are paged with a keyset
+    ``?before=<created_at>,<id>`` cursor; ``next`` links to the following page.
+    """
+    @async_endpoint(policy.permission_class)
+    async def order_history(request):
+        orders = policy.history_queryset(request)
+        today_start, today_end = day_bounds()
+        today_orders = orders.filter(created_at__gte=today_start, created_at__lt=today_end)
+
+        if request.GET.get('archive') in ('1', 'true'):
+            orders = policy.archive_queryset(request)
+        month = parse_month(request.GET.get('month'))
+        if month:
+            start, end = month_bounds(month)
+            past = orders.filter(created_at__gte=start, created_at__lt=min(end, today_start))
+        elif request.GET.get('archive') in ('1', 'true'):
+            past = orders
+        else:
+            start = today_start - timedelta(days=settings.ORDER_HISTORY_DAYS)
+            past = orders.filter(created_at__gte=start, created_at__lt=today_start)
+
+        cursor = request.GET.get('before', '')
+        created_at, _, pk = cursor.partition(',')
+        created_at = parse_datetime(created_at) if created_at else None
+        if created_at and pk.isdigit():
+            past = past.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=int(pk)))
+
+        page_size = OrderHistoryPagination.page_size
+        try:
+            page_size = max(1, min(int(request.GET['page_size']), OrderHistoryPagination.max_page_size))
+        except (KeyError, ValueError):
+            pass
+        keys = [
+            key async for key in past.order_by('-created_at', '-pk').values_list('created_at', 'pk')[:page_size + 1]
+        ]
+        page = keys[:page_size]
+
+        next_link = None
+        if len(keys) > page_size:
+            query = request.GET.copy()
+            query['before'] = f'{page[-1][0].isoformat()},{page[-1][1]}'
+            next_link = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+        field_spec = FieldSpec.from_request(request)
+        past_page = past.filter(pk__in=[pk for _, pk in page]).order_by('-created_at', '-pk')
+        return {
+            'today_orders': await aorder_rows(today_orders, field_spec),
+            'past_orders': await aorder_rows(past_page, field_spec),
+            'next': next_link,
+            'previous': None,
+        }
+    return order_history
+
+
+@async_endpoint()
+async def profile(request):
+    rows = await auser_rows(CustomUser.objects.filter(pk=request.user.pk), FieldSpec.from_request(request))
+    return rows[0]
+
+
+@async_endpoint(IsStaffOrAdmin)
+async def kitchen_queue(request):
+    """Today's pending and approved orders for the site, oldest first (?status= narrows it)"""
+    statuses = QUEUE_STATUSES
+    if request.GET.get('status') in QUEUE_STATUSES:
+        statuses = (request.GET['status'],)
+    start, end = day_bounds()
+    orders = Order.objects.filter(
+        site_id=request_site_id(request), status__in=statuses, created_at__gte=start, created_at__lt=end
+    ).order_by('created_at')
+    return await aorder_rows(orders, FieldSpec.from_request(request))
+
+
+# CSRF-exempt like the DRF login_view, which only enforces CSRF for authenticated requests
+@csrf_exempt
+@ensure_csrf_cookie
+async def login(request):
+    """Same request and payload as login_view"""
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'detail': 'JSON parse error'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'detail': 'JSON parse error'}, status=400)
+    else:
+        data = request.POST
+    # LoginThrottle keys on the username in request.data, as on a DRF request
+    request.data = data
+    wait = await athrottle(request, (LoginThrottle,))
+    if wait is not None:
+        return throttled(wait)
+
+    username, password = data.get('username'), data.get('password')
+    if not username or not password:
+        return JsonResponse({'non_field_errors': ['Must include username and password']}, status=400)
+    user = await auth.aauthenticate(request, username=str(username), password=str(password))
+    if user is None:
+        return JsonResponse({'non_field_errors': ['Invalid credentials']}, status=400)
+    if not user.is_active:
+        return JsonResponse({'non_field_errors': ['User account is disabled']}, status=400)
+
+    await auth.alogin(request, user)
+    session = request.session
+    await session.aset(ROLE_CLAIM_SESSION_KEY, role_claim(user))
+    await claim_version_cache().aset(claim_version_key(user.pk), user.claim_version, timeout=settings.ROLE_CLAIM_TTL)
+    if not data.get('remember_me'):
+        await session.aset_expiry(0)
+
+    response = render({
+        'id': user.id,
+        'email': user.email,
+        'name': user.get_full_name(),
+        'role': user.role,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+    })
+    response.set_cookie('sessionid', session.session_key, httponly=True, samesite='Lax', max_age=1209600)
+    return response
@@ -0,0 +1,149 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication, get_authorization_header
+
+from .models import CustomUser
+
+ROLE_CLAIM_SESSION_KEY = '_role_claim'
+KIOSK_TOKEN_SALT = 'api.kiosk'
+
+
+def role_claim(user):
+    return {
+        'role': user.role, 'site_id': user.site_id, 'version': user.claim_version, 'issued_at': int(time.time()),
+    }
+
+
+def claim_is_fresh(claim):
+    # Claims written before sites or versions existed lack those keys; renew them too
+    return (
+        bool(claim) and 'site_id' in claim and 'version' in claim
+        and time.time() - claim['issued_at'] <= settings.ROLE_CLAIM_TTL
+    )
+
+
+def claim_version_key(user_id):
+    return f'claim_version:{user_id}'
+
+
+def claim_version_cache():
+    """
+    Where each user's current claim_version is published.
+
+    The query cache alias: with a shared backend every worker sees a bump
+    at once; with a process-local one the other workers notice on their
+    next cache miss, within ROLE_CLAIM_TTL.
+    """
+    return caches[settings.QUERY_CACHE_ALIAS]
+
+
+def publish_claim_version(user):
+    claim_version_cache().set(claim_version_key(user.pk), user.claim_version, timeout=settings.ROLE_CLAIM_TTL)
+
+
+def claim_is_current(claim, version):
+    """A fresh claim whose version matches the published one; ``None`` (not published) is never current"""
+    return claim_is_fresh(claim) and version is not None and claim['version'] == version
+
+
+def store_role_claim(request, user):
+    """Remember the user's role and site in the session so later requests can skip the user query"""
+    request.session[ROLE_CLAIM_SESSION_KEY] = role_claim(user)
+    publish_claim_version(user)
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='auth_user_claims')
+def _user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # CustomUser.save bumps claim_version when a claim field changes
+    if raw or (update_fields is not None and 'claim_version' not in update_fields):
+        return
+    transaction.on_commit(lambda: publish_claim_version(instance))
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid='auth_user_deleted')
+def _user_deleted(sender, instance, **kwargs):
+    key = claim_version_key(instance.pk)
+    transaction.on_commit(lambda: claim_version_cache().delete(key))
+
+
+class ClaimUser(SimpleLazyObject):
+    """
+    Authenticated user known only by id, role and site.
+
+    ``id``, ``pk``, ``role``, ``site_id`` and the authentication flags are answered from
+    the claim; touching anything else loads the CustomUser row once.
+    """
+
+    def __init__(self, user_id, role, site_id=None):
+        super().__init__(lambda: CustomUser.objects.get(pk=user_id))
+        self.__dict__.update(
+            id=user_id,
+            pk=user_id,
+            role=role,
+            site_id=site_id,
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
+
+class SessionClaimAuthentication(SessionAuthentication):
+    """
+    Session authentication that trusts the role claim written at login.
+
+    The claim is trusted only while it is younger than ROLE_CLAIM_TTL
+    seconds and carries the user's published claim_version, which
+    changes with their role, site, active flag or password. Otherwise the
+    regular session lookup re-checks the user row (active flag, password
+    hash) and renews the claim.
+    """
+
+    def authenticate(self, request):
+        session = request._request.session
+        user_id = session.get(SESSION_KEY)
+        claim = session.get(ROLE_CLAIM_SESSION_KEY)
+        version = claim_version_cache().get(claim_version_key(user_id)) if user_id is not None else None
+        if user_id is None or not claim_is_current(claim, version):
+            result = super().authenticate(request)
+            if result is not None:
+                store_role_claim(request._request, result[0])
+            return result
+
+        self.enforce_csrf(request)
+        return (ClaimUser(CustomUser._meta.pk.to_python(user_id), claim['role'], claim['site_id']), None)
+
+
+def issue_kiosk_token(user):
+    return signing.dumps({'uid': user.pk, 'role': user.role, 'site': user.site_id}, salt=KIOSK_TOKEN_SALT)
+
+
+class KioskTokenAuthentication(BaseAuthentication):
+    """Stateless ``Authorization: Kiosk <token>`` authentication for badge logins (see kiosk.py)"""
+    keyword = 'Kiosk'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid kiosk token header.')
+        try:
+            claim = signing.loads(
+                auth[1].decode(), salt=KIOSK_TOKEN_SALT, max_age=settings.KIOSK_TOKEN_MAX_AGE
+            )
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Kiosk token expired.')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise exceptions.AuthenticationFailed('Invalid kiosk token.')
+        return (ClaimUser(claim['uid'], claim['role'], claim.get('site')), None)
+
+    def authenticate_header(self, request):
+        return self.keyword
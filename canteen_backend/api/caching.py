@@ -0,0 +1,214 @@
+"""
+Tag-versioned cache for view and queryset results.
+
+Each result is stored in the QUERY_CACHE_ALIAS cache under a key that
+embeds the current version of every tag it depends on ("menu",
+"orders:user:42", "dashboard"). Invalidating a tag bumps its version, so
+every entry carrying that tag becomes unreachable at once without keeping
+a list of keys. Orphaned entries age out through the backend: LocMemCache
+culls least recently used entries past MAX_ENTRIES, and since tag versions
+are read on every lookup they are the last to go.
+
+The receivers at the bottom bump tags on post_save/post_delete of
+MenuItem, Order, OrderItem and CustomUser. They also handle the
+menu_changed and tokens_changed signals for queryset updates, which bypass
+post_save. A bump waits for the surrounding transaction to commit, so a
+concurrent read cannot re-cache rows from before the commit.
+
+Hits and misses are counted per cache name for this process (cache_stats).
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import CustomUser, MenuItem, Order, OrderItem
+from .signals import menu_changed, tokens_changed
+from .sites import request_site_id
+
+_MISSING = object()
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.QUERY_CACHE_ALIAS]
+
+
+def _count(name, hit):
+    with _stats_lock:
+        counts = _stats.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def cache_stats():
+    """{name: {hits, misses, hit_rate}} for this process"""
+    with _stats_lock:
+        return {
+            name: {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 3)}
+            for name, (hits, misses) in sorted(_stats.items())
+        }
+
+
+def tag_versions(tags):
+    cache = get_cache()
+    keys = [f'tag:{tag}' for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh version never matches entries stored under one that was evicted
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(tags):
+    cache = get_cache()
+    for tag in tags:
+        try:
+            cache.incr(f'tag:{tag}')
+        except ValueError:
+            cache.set(f'tag:{tag}', time.time_ns(), timeout=None)
+
+
+_pending = threading.local()
+
+
+def _bump_pending():
+    tags = getattr(_pending, 'tags', None)
+    if tags:
+        _pending.tags = set()
+        _bump(tags)
+
+
+def invalidate(*tags):
+    """Drop every cached result carrying any of ``tags`` once the current transaction commits"""
+    if tags and settings.QUERY_CACHE_ENABLED:
+        # Tags collect per thread, so the first commit callback bumps each of them once and
+        # the rest find nothing left: deleting a thousand rows costs one bump per tag. Tags
+        # left by a rolled back transaction are bumped with the next commit's, which is harmless.
+        pending = getattr(_pending, 'tags', None)
+        if pending is None:
+            pending = _pending.tags = set()
+        pending.update(tags)
+        transaction.on_commit(_bump_pending)
+
+
+def cached_result(name, tags, key, compute, timeout=None):
+    """``compute()``, served from the cache while none of ``tags`` has been invalidated"""
+    if not settings.QUERY_CACHE_ENABLED:
+        return compute()
+    cache = get_cache()
+    versions = ','.join(str(version) for version in tag_versions(tags))
+    cache_key = f"result:{name}:{hashlib.md5(f'{key}|{versions}'.encode()).hexdigest()}"
+    result = cache.get(cache_key, _MISSING)
+    _count(name, result is not _MISSING)
+    if result is _MISSING:
+        result = compute()
+        cache.set(cache_key, result, **({} if timeout is None else {'timeout': timeout}))
+    return result
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def cache_response(name, tags, per_user=False, timeout=None):
+    """
+    Cache a DRF view's successful response data.
+
+    ``tags`` is a list or a callable taking the request. The key covers the
+    site, the full URL, the local date (for "today" windows) and, with
+    ``per_user``, the user. Per-user responses are only cached in a shared
+    backend (QUERY_CACHE_SHARED): a process-local cache would keep serving a
+    user their old orders from workers that never saw the invalidation.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if per_user and not settings.QUERY_CACHE_SHARED:
+                return view(request, *args, **kwargs)
+            uncached = []
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    uncached.append(response)
+                    raise _Uncacheable
+                return response.data
+
+            key = [request_site_id(request), request.build_absolute_uri(), timezone.localdate()]
+            if per_user:
+                key.append(request.user.pk)
+            try:
+                data = cached_result(name, tags(request) if callable(tags) else tags, key, compute, timeout)
+            except _Uncacheable:
+                return uncached[0]
+            return Response(data)
+        return wrapped
+    return decorator
+
+
+def user_orders_tag(user_id):
+    return f'orders:user:{user_id}'
+
+
+@receiver([post_save, post_delete], sender=MenuItem, dispatch_uid='cache_menu_item')
+def _menu_item_changed(sender, instance, **kwargs):
+    invalidate('menu', 'dashboard')
+
+
+@receiver(menu_changed, dispatch_uid='cache_menu_changed')
+def _menu_changed(sender, **kwargs):
+    invalidate('menu')
+
+
+@receiver([post_save, post_delete], sender=Order, dispatch_uid='cache_order')
+def _order_changed(sender, instance, **kwargs):
+    invalidate(user_orders_tag(instance.user_id), 'dashboard')
+
+
+@receiver(post_save, sender=OrderItem, dispatch_uid='cache_order_item')
+def _order_item_changed(sender, instance, **kwargs):
+    if OrderItem.order.field.is_cached(instance):
+        user_id = instance.order.user_id
+    else:
+        user_id = Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+    invalidate(*([user_orders_tag(user_id)] if user_id else []), 'dashboard')
+
+
+@receiver(post_delete, sender=OrderItem, dispatch_uid='cache_order_item_deleted')
+def _order_item_deleted(sender, instance, origin=None, **kwargs):
+    # Items deleted along with their orders (or the orders' users) are covered by
+    # the orders' own signal. Other deletions, such as a menu item taking its
+    # order lines along, drop every user's order history rather than looking up
+    # each deleted line's order.
+    origin_model = origin._meta.model if hasattr(origin, '_meta') else getattr(origin, 'model', None)
+    if origin_model in (Order, CustomUser):
+        return
+    if OrderItem.order.field.is_cached(instance):
+        invalidate(user_orders_tag(instance.order.user_id), 'dashboard')
+    else:
+        invalidate('orders', 'dashboard')
+
+
+@receiver([post_save, post_delete], sender=CustomUser, dispatch_uid='cache_user')
+def _user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached result shows
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate(user_orders_tag(instance.pk), 'dashboard')
+
+
+@receiver(tokens_changed, dispatch_uid='cache_tokens_changed')
+def _tokens_changed(sender, **kwargs):
+    invalidate('users', 'dashboard')
@@ -0,0 +1,253 @@
+"""
+Read-only serialization straight from ``.values()`` rows.
+
+Each function here returns exactly what the matching DRF serializer in
+``serializers.py`` produces for ``many=True``, without building model
+instances or field objects per row. Views opt in through
+``serialize_many`` or ``FastListMixin``; ``FAST_SERIALIZATION = False``
+in settings switches every view back to the regular serializers.
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+from .models import MenuItem
+from .serializers import (
+    ArchivedOrderSerializer, CustomUserSerializer, MenuItemSerializer, OrderItemSerializer, OrderSerializer
+)
+from .sparse import FieldSpec, SparseFieldsMixin, check_field_spec, prune_queryset
+
+# Field names rather than attnames, since .values('site') yields the key DRF uses for the
+# related pk; relations go last as in ModelSerializer's '__all__'
+MENU_ITEM_FIELDS = sorted(
+    (field.name for field in MenuItem._meta.concrete_fields),
+    key=lambda name: MenuItem._meta.get_field(name).is_relation,
+)
+USER_FIELDS = ['id', 'username', 'first_name', 'last_name', 'email', 'role', 'work_shift', 'user_id', 'site']
+
+
+ORDER_KEYS = [
+    'id', 'user', 'user_details', 'site', 'pickup_slot', 'status', 'total_tokens', 'item_count', 'items_summary',
+    'created_at', 'updated_at', 'order_items',
+]
+# Response key -> the column read for it. Rows are built as dict(zip(keys, values)) and the
+# nested objects, which only hold a placeholder column there, are filled in afterwards.
+ORDER_COLUMNS = {'user': 'user_id', 'user_details': 'user_id', 'site': 'site_id', 'pickup_slot': 'pickup_slot_id',
+                 'order_items': 'id'}
+USER_DETAILS_VALUES = ['user__username', 'user__first_name', 'user__last_name', 'user__user_id']
+ORDER_ITEM_KEYS = ['id', 'menu_item', 'quantity', 'tokens_per_item']
+USER_KEYS = [*USER_FIELDS, 'tokens']
+TOKEN_VALUES = ['role', 'monthly_tokens', 'last_token_reset']
+
+# Each *_rows function fetches with the sync ORM and its a*_rows twin with
+# the async ORM; both shape rows through the same helpers. ``spec`` is an
+# optional sparse.FieldSpec.
+
+
+# The string DRF's DateTimeField renders (current timezone, DATETIME_FORMAT), so the
+# output does not depend on how the renderer would encode a datetime object
+_datetime = DateTimeField().to_representation
+
+
+def _shown(keys, spec, serializer_class):
+    """The keys a serializer would render under ``spec``, in order"""
+    if spec is None:
+        return keys
+    expandable = getattr(serializer_class.Meta, 'expandable', {})
+    return [
+        key for key in keys
+        if spec.includes(key) and (key not in expandable or spec.expands(key) or expandable[key] is not None)
+    ]
+
+
+def _menu_fields(spec):
+    return _shown(MENU_ITEM_FIELDS, spec, MenuItemSerializer)
+
+
+def _menu_items(rows, fields):
+    if not fields:
+        # Nothing requested exists; .values() was only given 'pk' to avoid fetching every column
+        return [{} for _ in rows]
+    for row in rows:
+        if 'created_at' in row:
+            row['created_at'] = _datetime(row['created_at'])
+    return rows
+
+
+def _order_plan(spec):
+    """(order keys, order columns, item keys, item columns, menu fields or None when collapsed)"""
+    check_field_spec(spec, OrderSerializer)
+    keys = _shown(ORDER_KEYS, spec, OrderSerializer)
+    columns = [ORDER_COLUMNS.get(key, key) for key in keys] + ['id']
+    if 'user_details' in keys:
+        columns.extend(USER_DETAILS_VALUES)
+
+    item_spec = spec.child('order_items') if spec is not None else None
+    item_keys = _shown(ORDER_ITEM_KEYS, item_spec, OrderItemSerializer)
+    item_columns = [('menu_item_id' if key == 'menu_item' else key) for key in item_keys] + ['order_id']
+    menu_fields = None
+    if 'menu_item' in item_keys and (item_spec is None or item_spec.expands('menu_item')):
+        menu_fields = _menu_fields(item_spec.child('menu_item') if item_spec is not None else None)
+        item_columns.extend('menu_item__' + name for name in menu_fields)
+    return keys, columns, item_keys, item_columns, menu_fields
+
+
+def _order_items(queryset, order_ids, item_columns):
+    # OrderItem, or ArchivedOrderItem for archived orders
+    item_model = queryset.model.order_items.rel.related_model
+    return (
+        item_model.objects.filter(order_id__in=order_ids)
+        .order_by('id')
+        .values_list(*item_columns)
+    )
+
+
+def _orders(orders, order_items, keys, item_keys, menu_fields):
+    items_by_order = {}
+    n_item = len(item_keys)
+    for values in order_items:
+        row = dict(zip(item_keys, values))
+        if menu_fields is not None:
+            menu_item = dict(zip(menu_fields, values[n_item + 1:]))
+            if 'created_at' in menu_item:
+                menu_item['created_at'] = _datetime(menu_item['created_at'])
+            row['menu_item'] = menu_item
+        items_by_order.setdefault(values[n_item], []).append(row)
+
+    n = len(keys)
+    datetime_keys = [key for key in ('created_at', 'updated_at') if key in keys]
+    with_details = 'user_details' in keys
+    with_items = 'order_items' in keys
+    rows = []
+    for values in orders:
+        row = dict(zip(keys, values))
+        for key in datetime_keys:
+            row[key] = _datetime(row[key])
+        if with_details:
+            row['user_details'] = {
+                'username': values[n + 1],
+                'first_name': values[n + 2],
+                'last_name': values[n + 3],
+                'user_id': values[n + 4],
+            }
+        if with_items:
+            row['order_items'] = items_by_order.get(values[n], [])
+        rows.append(row)
+    return rows
+
+
+def _user_plan(spec):
+    check_field_spec(spec, CustomUserSerializer)
+    keys = _shown(USER_KEYS, spec, CustomUserSerializer)
+    columns = [key for key in keys if key != 'tokens']
+    if 'tokens' in keys:
+        columns.extend(TOKEN_VALUES)
+    return keys, columns
+
+
+def _users(values_rows, keys):
+    today = timezone.now().date()
+    with_tokens = 'tokens' in keys
+    n = len(keys) - with_tokens
+    rows = []
+    for values in values_rows:
+        row = dict(zip(keys[:n], values))
+        if with_tokens:
+            role, monthly_tokens, last_reset = values[n:]
+            # Same as CustomUser.current_tokens(), minus the write-back of the reset
+            if role in ['admin', 'staff']:
+                row['tokens'] = None
+            elif (last_reset.year, last_reset.month) != (today.year, today.month):
+                row['tokens'] = 0
+            else:
+                row['tokens'] = monthly_tokens
+        rows.append(row)
+    return rows
+
+
+def menu_item_rows(queryset, spec=None):
+    check_field_spec(spec, MenuItemSerializer)
+    fields = _menu_fields(spec)
+    return _menu_items(list(queryset.prefetch_related(None).values(*fields or ['pk'])), fields)
+
+
+async def amenu_item_rows(queryset, spec=None):
+    check_field_spec(spec, MenuItemSerializer)
+    fields = _menu_fields(spec)
+    return _menu_items([row async for row in queryset.prefetch_related(None).values(*fields or ['pk'])], fields)
+
+
+def order_rows(queryset, spec=None):
+    keys, columns, item_keys, item_columns, menu_fields = _order_plan(spec)
+    orders = list(queryset.prefetch_related(None).values_list(*columns))
+    if not orders:
+        return []
+    order_items = []
+    if 'order_items' in keys:
+        order_items = _order_items(queryset, [values[len(keys)] for values in orders], item_columns)
+    return _orders(orders, order_items, keys, item_keys, menu_fields)
+
+
+async def aorder_rows(queryset, spec=None):
+    keys, columns, item_keys, item_columns, menu_fields = _order_plan(spec)
+    orders = [row async for row in queryset.prefetch_related(None).values_list(*columns)]
+    if not orders:
+        return []
+    order_items = []
+    if 'order_items' in keys:
+        order_ids = [values[len(keys)] for values in orders]
+        order_items = [row async for row in _order_items(queryset, order_ids, item_columns)]
+    return _orders(orders, order_items, keys, item_keys, menu_fields)
+
+
+def user_rows(queryset, spec=None):
+    keys, columns = _user_plan(spec)
+    return _users(queryset.prefetch_related(None).values_list(*columns or ['pk']), keys)
+
+
+async def auser_rows(queryset, spec=None):
+    keys, columns = _user_plan(spec)
+    return _users([row async for row in queryset.prefetch_related(None).values_list(*columns or ['pk'])], keys)
+
+
+FAST_ROWS = {
+    MenuItemSerializer: menu_item_rows,
+    OrderSerializer: order_rows,
+    ArchivedOrderSerializer: order_rows,
+    CustomUserSerializer: user_rows,
+}
+
+
+def serialize_many(queryset, serializer_class, field_spec=None, **kwargs):
+    """Serialize a queryset with the fast path when one exists for the serializer"""
+    rows = FAST_ROWS.get(serializer_class)
+    if rows is not None and getattr(settings, 'FAST_SERIALIZATION', True):
+        return rows(queryset, field_spec)
+    if field_spec is None:
+        return serializer_class(queryset, many=True, **kwargs).data
+    serializer = serializer_class(queryset, many=True, field_spec=field_spec, **kwargs)
+    serializer.instance = prune_queryset(queryset, serializer.child)
+    return serializer.data
+
+
+class FastListMixin:
+    """
+    Viewset mixin serving unpaginated ``list`` through ``serialize_many``,
+    with ?fields=/?expand= (see sparse.py) on list and retrieve
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        field_spec = FieldSpec.from_request(self.request)
+        if field_spec is not None and issubclass(self.get_serializer_class(), SparseFieldsMixin):
+            kwargs.setdefault('field_spec', field_spec)
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        data = serialize_many(
+            queryset, self.get_serializer_class(), FieldSpec.from_request(request),
+            context=self.get_serializer_context(),
+        )
+        return Response(data)
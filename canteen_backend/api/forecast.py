@@ -0,0 +1,132 @@
+"""
+Menu-item demand forecast for kitchen prep.
+
+``compute_forecasts`` runs nightly (forecast_demand). It reads the last
+FORECAST_WEEKS weeks of order lines in one grouped query and lays them
+into a compact matrix: one row per day, one column per (menu item,
+customer shift). For every column and weekday, NumPy then derives:
+
+- weekday_average: the mean quantity on that weekday, with linear weights
+  so recent weeks count more
+- recent_average: the trailing 7-day moving average
+- forecast: weekday_average scaled by recent_average / window average, a
+  multiplicative seasonal forecast that follows the current level
+
+The results replace the site's DemandForecast rows, so ``prep_forecast``
+answers with one indexed lookup on (site, weekday) however long the
+history is. Declined orders are not demand and are left out.
+
+NumPy is only needed by the nightly job, not by the web process.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .models import CustomUser, DemandForecast, OrderItem
+from .utils import day_bounds
+
+SHIFTS = [shift for shift, _ in CustomUser.WORK_SHIFT_CHOICES]
+
+
+def daily_matrix(site_id, start, days):
+    """(menu item ids, matrix) where matrix[day, item * len(SHIFTS) + shift] is the quantity ordered"""
+    rows = list(
+        OrderItem.objects.filter(
+            order__site_id=site_id,
+            order__created_at__gte=day_bounds(start)[0],
+            order__created_at__lt=day_bounds(start + timedelta(days=days))[0],
+        ).exclude(order__status='declined')
+        .values(
+            day=TruncDate('order__created_at', tzinfo=timezone.get_current_timezone()),
+            shift=F('order__user__work_shift'), item=F('menu_item_id'),
+        ).annotate(quantity=Sum('quantity')).order_by()
+        .values_list('day', 'shift', 'item', 'quantity')
+    )
+    item_ids = sorted({item for _, _, item, _ in rows})
+    item_column = {item: index * len(SHIFTS) for index, item in enumerate(item_ids)}
+    shift_offset = {shift: index for index, shift in enumerate(SHIFTS)}
+
+    matrix = np.zeros((days, len(item_ids) * len(SHIFTS)))
+    if rows:
+        # One row per (day, shift, item) after grouping, so plain assignment is enough
+        days_at, columns, quantities = zip(*(
+            ((day - start).days, item_column[item] + shift_offset[shift], quantity)
+            for day, shift, item, quantity in rows
+        ))
+        matrix[np.array(days_at), np.array(columns)] = quantities
+    return item_ids, matrix
+
+
+def seasonal_forecast(matrix, start):
+    """(weekday_average, recent_average, forecast); the first and last are indexed [weekday, column]"""
+    weeks = matrix.shape[0] // 7
+    by_week = matrix[-weeks * 7:].reshape(weeks, 7, -1)
+    weights = np.arange(1, weeks + 1, dtype=float)
+    weekday_average = np.tensordot(weights, by_week, axes=1) / weights.sum()
+    # Row j is the weekday of start + j; rotate so row w is weekday w
+    weekday_average = np.roll(weekday_average, start.weekday(), axis=0)
+
+    recent_average = matrix[-7:].mean(axis=0)
+    window_average = matrix.mean(axis=0)
+    level = np.divide(recent_average, window_average, out=np.zeros_like(window_average),
+                      where=window_average > 0)
+    return weekday_average, recent_average, weekday_average * level
+
+
+def compute_forecasts(site_id, today=None, weeks=None):
+    """Replace the site's forecasts from the ``weeks`` full weeks before ``today``; returns how many rows were stored"""
+    today = today or timezone.localdate()
+    weeks = weeks or settings.FORECAST_WEEKS
+    start = today - timedelta(days=weeks * 7)
+    item_ids, matrix = daily_matrix(site_id, start, weeks * 7)
+
+    forecasts = []
+    if item_ids:
+        weekday_average, recent_average, forecast = seasonal_forecast(matrix, start)
+        computed_at = timezone.now()
+        for weekday, column in zip(*np.nonzero(weekday_average > 0)):
+            item, shift = divmod(int(column), len(SHIFTS))
+            expected = round(float(forecast[weekday, column]), 2)
+            forecasts.append(DemandForecast(
+                site_id=site_id, menu_item_id=item_ids[item], shift=SHIFTS[shift], weekday=int(weekday),
+                weekday_average=round(float(weekday_average[weekday, column]), 2),
+                recent_average=round(float(recent_average[column]), 2),
+                forecast=expected, prep_quantity=math.ceil(expected), computed_at=computed_at,
+            ))
+
+    with transaction.atomic():
+        DemandForecast.objects.filter(site_id=site_id).delete()
+        DemandForecast.objects.bulk_create(forecasts, batch_size=1000)
+    return len(forecasts)
+
+
+def prep_forecast(site_id, day):
+    """The stored forecast for ``day``'s weekday: available items, busiest first, with per-shift quantities"""
+    rows = (
+        DemandForecast.objects.filter(site_id=site_id, weekday=day.weekday(), menu_item__is_available=True)
+        .values_list('menu_item_id', 'menu_item__name', 'shift', 'prep_quantity', 'forecast', 'computed_at')
+    )
+    items, computed_at = {}, None
+    for menu_item_id, name, shift, prep_quantity, forecast, row_computed_at in rows:
+        item = items.setdefault(menu_item_id, {
+            'menu_item_id': menu_item_id, 'name': name, 'prep_quantity': 0, 'forecast': 0.0, 'shifts': {},
+        })
+        item['shifts'][shift] = prep_quantity
+        item['prep_quantity'] += prep_quantity
+        item['forecast'] = round(item['forecast'] + forecast, 2)
+        computed_at = row_computed_at
+    return {
+        'date': day,
+        'computed_at': computed_at,
+        'items': sorted(items.values(), key=lambda item: (-item['forecast'], item['name'])),
+    }
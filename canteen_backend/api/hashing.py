@@ -0,0 +1,70 @@
+"""
+Bounded worker pool for password hashing.
+
+Hash verification is CPU bound and the hashlib/argon2 primitives release
+the GIL, so running them on a pool sized to the machine's cores gives real
+parallelism while stopping a login burst from starting more concurrent
+hashes than there are cores. Async callers await the pool without
+blocking the event loop.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASHING_WORKERS or os.cpu_count(),
+                    thread_name_prefix='password-hashing',
+                )
+    return _pool
+
+
+def _verify(raw_password, encoded):
+    # Runs on the pool: no database access here, only hashing
+    is_correct, must_update = verify_password(raw_password, encoded)
+    new_encoded = make_password(raw_password) if is_correct and must_update else None
+    return is_correct, new_encoded
+
+
+def _rehashed(user):
+    # The same password under the current tier: written with a queryset update rather than
+    # save(), so it is not taken for a password change that invalidates role claims
+    return type(user)._default_manager.filter(pk=user.pk)
+
+
+def check_password(user, raw_password):
+    """Verify ``raw_password`` on the pool and upgrade the stored hash when the hasher tier changed"""
+    is_correct, new_encoded = get_pool().submit(_verify, raw_password, user.password).result()
+    if new_encoded:
+        user.password = new_encoded
+        _rehashed(user).update(password=new_encoded)
+    return is_correct
+
+
+async def acheck_password(user, raw_password):
+    future = get_pool().submit(_verify, raw_password, user.password)
+    is_correct, new_encoded = await asyncio.wrap_future(future)
+    if new_encoded:
+        user.password = new_encoded
+        await _rehashed(user).aupdate(password=new_encoded)
+    return is_correct
+
+
+def hash_password(raw_password):
+    return get_pool().submit(make_password, raw_password).result()
+
+
+async def ahash_password(raw_password):
+    return await asyncio.wrap_future(get_pool().submit(make_password, raw_password))
@@ -0,0 +1,96 @@
+"""
+Badge login for canteen kiosks.
+
+A kiosk proves it is a trusted device with the ``X-Kiosk-Key`` header and
+identifies the customer by badge (``CustomUser.user_id``). Each device key
+belongs to one site (KIOSK_DEVICE_KEYS), and only that site's badges are
+accepted. Instead of a
+session it gets a short-lived signed token carrying the user id and role,
+sent back as ``Authorization: Kiosk <token>``. Nothing is written to the
+session table and no CSRF round trip is needed, since the token never
+travels in a cookie.
+"""
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .authentication import issue_kiosk_token
+from .models import CustomUser, Site
+from .ordering import POLICIES, place_order
+from .throttling import KioskThrottle
+
+
+def device_site(key):
+    """(known, site id) for a device key; the site id is None for the default canteen"""
+    site_code = None
+    for allowed, code in settings.KIOSK_DEVICE_KEYS.items():
+        if constant_time_compare(key, allowed):
+            site_code = code
+    if site_code is None:
+        return False, None
+    if not site_code:
+        return True, None
+    site_id = Site.objects.filter(code=site_code, is_active=True).values_list('id', flat=True).first()
+    # A key pointing at an unknown or closed site serves nobody
+    return site_id is not None, site_id
+
+
+class IsKioskDevice(permissions.BasePermission):
+    """Accepts known device keys and stores the device's site on the request as ``kiosk_site_id``"""
+
+    def has_permission(self, request, view):
+        key = request.headers.get('X-Kiosk-Key', '')
+        if not key:
+            return False
+        known, request.kiosk_site_id = device_site(key)
+        return known
+
+
+class KioskView(APIView):
+    authentication_classes = []
+    permission_classes = [IsKioskDevice]
+    throttle_classes = [KioskThrottle]
+
+    def get_badge_user(self, request):
+        badge = str(request.data.get('badge', '')).strip()
+        if not badge:
+            return None
+        return CustomUser.objects.filter(
+            user_id=badge, site_id=request.kiosk_site_id, is_active=True, role__in=list(POLICIES)
+        ).first()
+
+    def token_payload(self, user):
+        return {
+            'token': issue_kiosk_token(user),
+            'expires_in': settings.KIOSK_TOKEN_MAX_AGE,
+            'user': {
+                'id': user.id,
+                'name': user.get_full_name() or user.username,
+                'role': user.role,
+                'tokens': user.current_tokens(),
+            },
+        }
+
+
+class KioskLoginView(KioskView):
+    def post(self, request):
+        user = self.get_badge_user(request)
+        if user is None:
+            return Response({'error': 'Unknown badge'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.token_payload(user))
+
+
+class KioskOrderView(KioskView):
+    """Badge login and order placement in a single request"""
+
+    def post(self, request):
+        user = self.get_badge_user(request)
+        if user is None:
+            return Response({'error': 'Unknown badge'}, status=status.HTTP_400_BAD_REQUEST)
+        request.user = user
+        response = place_order(request, POLICIES[user.role])
+        if response.status_code == status.HTTP_201_CREATED:
+            response.data = {'order': response.data, **self.token_payload(user)}
+        return response
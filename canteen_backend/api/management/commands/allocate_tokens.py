@@ -0,0 +1,95 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.allocation import apply_allocations, plan_allocations
+from api.models import Site
+from api.utils import parse_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the month's ShiftTokenAllocation rows to every employee and guest in one bulk pass. "
+        'With --daemon, keep running and apply at every month rollover (and to users who join later).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to apply as YYYY-MM (default: current month)')
+        parser.add_argument('--site', help="Site code to apply (default: every site); 'default' for users without a site")
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--daemon', action='store_true', help='Run forever, checking every --interval seconds')
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        month = None
+        if options['month']:
+            month = parse_month(options['month'])
+            if month is None:
+                raise CommandError('--month must be YYYY-MM')
+
+        self.site_ids = None
+        if options['site']:
+            if options['site'] == 'default':
+                self.site_ids = [None]
+            else:
+                site = Site.objects.filter(code=options['site']).first()
+                if site is None:
+                    raise CommandError(f"Unknown site '{options['site']}'")
+                self.site_ids = [site.pk]
+        self.site_codes = dict(Site.objects.values_list('pk', 'code'))
+
+        if options['dry_run']:
+            self.show_plan(month or timezone.localdate().replace(day=1))
+            return
+
+        if not options['daemon']:
+            if month and month > timezone.localdate().replace(day=1):
+                raise CommandError('A future month is applied at its rollover; use --dry-run to preview it')
+            self.apply(month or timezone.localdate().replace(day=1), options['chunk_size'])
+            return
+
+        self.stdout.write(f"Allocation scheduler started, checking every {options['interval']}s")
+        try:
+            while True:
+                # Nothing is due between rollovers, so each tick is a few cheap queries
+                self.apply(timezone.localdate().replace(day=1), options['chunk_size'], quiet=True)
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Allocation scheduler stopped')
+
+    def show_plan(self, month):
+        plan = plan_allocations(month, site_ids=self.site_ids)
+        if not plan:
+            self.stdout.write(self.style.WARNING(f"No allocations configured for {month.strftime('%b %Y')}"))
+            return
+        self.stdout.write(f"Dry run for {month.strftime('%b %Y')}:")
+        for row in plan:
+            self.stdout.write(
+                f"  {self.site_label(row['site']):<12} {row['shift']:<6} {row['tokens_per_user']:>5} tokens/user  "
+                f"{row['users']:>6} users to update  "
+                f"balance {row['tokens_before']} -> {row['tokens_after']}"
+            )
+
+    def apply(self, month, chunk_size, quiet=False):
+        started = time.monotonic()
+        applied = apply_allocations(month, site_ids=self.site_ids, chunk_size=chunk_size)
+        updated = sum(applied.values())
+        if quiet and not updated:
+            return
+        if not applied:
+            self.stdout.write(self.style.WARNING(f"No allocations configured for {month.strftime('%b %Y')}"))
+            return
+        details = ', '.join(
+            f'{self.site_label(site_id)}/{shift}: {count}' for (site_id, shift), count in applied.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Applied {month.strftime('%b %Y')} allocations to {updated} users ({details}) "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
+
+    def site_label(self, site_id):
+        return self.site_codes.get(site_id, 'default')
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.archive import archivable_orders, archive_cutoff, archive_orders
+from api.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        'Move completed and declined orders older than the archive horizon into the archive tables '
+        'in bounded batches, then prune expired order tombstones. Safe to re-run; schedule it monthly '
+        '(e.g. from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_DAYS,
+                            help='Archive orders created more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches (the rest is picked up next run)')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches to leave room for other writers')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} orders created before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        orders, items, elapsed = archive_orders(
+            cutoff, options['batch_size'], options['max_batches'], options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {orders} orders ({items} items) created before {cutoff:%Y-%m-%d} in {elapsed:.2f}s"
+        ))
+        self.stdout.write(f"Pruned {prune_tombstones()} order tombstones")
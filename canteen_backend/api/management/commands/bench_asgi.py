@@ -0,0 +1,165 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from api.authentication import ROLE_CLAIM_SESSION_KEY, publish_claim_version, role_claim
+from api.models import CustomUser, MenuItem, Order, OrderItem, Site, summarize_lines
+
+# endpoint -> (DRF path, async path)
+ENDPOINTS = {
+    'menu': ('/api/employee/menu/', '/api/async/employee/menu/'),
+    'orders': ('/api/employee/orders/', '/api/async/employee/orders/'),
+    'profile': ('/api/profile/', '/api/async/profile/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the DRF read endpoints under WSGI (a fixed pool of worker threads) with the async '
+        'endpoints under ASGI (one event loop) for many simultaneous clients, on a scratch database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000,
+                            help='Simulated clients, each with its own session, all arriving at once')
+        parser.add_argument('--threads', type=int, default=32,
+                            help='WSGI worker threads (e.g. gunicorn --threads)')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append',
+                            help='Endpoint to benchmark; repeatable (default: all)')
+        parser.add_argument('--menu-items', type=int, default=50)
+        parser.add_argument('--orders-per-client', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['threads'] < 1:
+            raise CommandError('--clients and --threads must be positive')
+
+        # Worker threads use their own connections, so the rows have to be committed;
+        # a throwaway test database keeps them out of the real one
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            session_keys = self._seed(options)
+            self.stdout.write(f"{options['clients']} clients, {options['threads']} WSGI threads")
+            self.stdout.write(
+                f"{'endpoint':<10}{'server':<18}{'wall s':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}"
+            )
+            for name in options['endpoint'] or sorted(ENDPOINTS):
+                sync_path, async_path = ENDPOINTS[name]
+                runs = [
+                    ('wsgi sync view', self._wsgi(sync_path, session_keys, options['threads'])),
+                    ('asgi sync view', asyncio.run(self._asgi(sync_path, session_keys))),
+                    ('asgi async view', asyncio.run(self._asgi(async_path, session_keys))),
+                ]
+                for server, (wall, latencies, errors) in runs:
+                    self._report(name, server, wall, latencies, errors)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _client(self, client_class, session_key):
+        client = client_class()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        return client
+
+    def _wsgi(self, path, session_keys, threads):
+        # Every client arrives at t0; latency includes time queued for a free thread
+        self._client(Client, session_keys[0]).get(path)  # warm up (stock rollover, imports)
+        start = time.perf_counter()
+
+        def call(session_key):
+            response = self._client(Client, session_key).get(path)
+            return time.perf_counter() - start, response.status_code
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(call, session_keys))
+        return self._summarize(start, results)
+
+    async def _asgi(self, path, session_keys):
+        await self._client(AsyncClient, session_keys[0]).get(path)
+        start = time.perf_counter()
+
+        async def call(session_key):
+            response = await self._client(AsyncClient, session_key).get(path)
+            return time.perf_counter() - start, response.status_code
+
+        results = await asyncio.gather(*(call(session_key) for session_key in session_keys))
+        return self._summarize(start, results)
+
+    def _summarize(self, start, results):
+        wall = time.perf_counter() - start
+        latencies = sorted(elapsed for elapsed, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        return wall, latencies, errors
+
+    def _report(self, name, server, wall, latencies, errors):
+        p50 = statistics.median(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{name:<10}{server:<18}{wall:>8.2f}{len(latencies) / wall:>9.0f}'
+            f'{p50 * 1000:>9.0f}{p95 * 1000:>9.0f}{errors:>8}'
+        )
+
+    def _seed(self, options):
+        """Users, menu and order history for one site; returns one session key per client"""
+        site = Site.objects.create(name='Bench site', code='bench')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_client_{i}', role='employee', site=site, monthly_tokens=1000,
+                       work_shift=random.choice(['day', 'mid', 'night']))
+            for i in range(options['clients'])
+        ])
+        menu_items = MenuItem.objects.bulk_create([
+            MenuItem(site=site, name=f'Bench item {i}', description='Benchmark menu item',
+                     price=random.randint(5, 60))
+            for i in range(options['menu_items'])
+        ])
+
+        orders, lines = [], []
+        for user in users:
+            for _ in range(options['orders_per_client']):
+                order_lines = [
+                    (menu_item, random.randint(1, 3))
+                    for menu_item in random.sample(menu_items, min(3, len(menu_items)))
+                ]
+                total, count, summary = summarize_lines(
+                    [(menu_item.name, quantity, menu_item.price) for menu_item, quantity in order_lines]
+                )
+                orders.append(Order(user=user, site=site, status='completed', total_tokens=total,
+                                    item_count=count, items_summary=summary))
+                lines.append(order_lines)
+        Order.objects.bulk_create(orders, batch_size=2000)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=menu_item, quantity=quantity, tokens_per_item=menu_item.price)
+            for order, order_lines in zip(orders, lines)
+            for menu_item, quantity in order_lines
+        ], batch_size=2000)
+        # Spread the history over the last few weeks
+        now = timezone.now()
+        for order in orders:
+            order.created_at = now - timedelta(days=random.randint(1, 28), minutes=random.randint(0, 600))
+        Order.objects.bulk_update(orders, ['created_at'], batch_size=2000)
+
+        # Sessions as login_view leaves them, role claim included
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        session_keys = []
+        for user in users:
+            session = session_store()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session[ROLE_CLAIM_SESSION_KEY] = role_claim(user)
+            session.create()
+            publish_claim_version(user)
+            session_keys.append(session.session_key)
+        return session_keys
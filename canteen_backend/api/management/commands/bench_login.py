@@ -0,0 +1,67 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from api import hashing
+from api.models import CustomUser
+
+BENCH_PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput per password hasher tier (logins/sec and logins/sec per core)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tiers', default=','.join(settings.PASSWORD_HASHER_TIERS))
+        parser.add_argument('--logins', type=int, default=200,
+                            help='Concurrent logins pushed through the hashing pool per tier')
+        parser.add_argument('--sequential', type=int, default=10,
+                            help='Full authenticate() calls timed one after another per tier')
+
+    def handle(self, *args, **options):
+        tiers = [tier.strip() for tier in options['tiers'].split(',') if tier.strip()]
+        unknown = set(tiers) - set(settings.PASSWORD_HASHER_TIERS)
+        if unknown:
+            raise CommandError(f"Unknown hasher tiers: {', '.join(sorted(unknown))}")
+
+        cores = os.cpu_count()
+        workers = hashing.get_pool()._max_workers
+        self.stdout.write(f'{cores} cores, {workers} hashing workers')
+        self.stdout.write(f"{'tier':<8}{'ms/login':>10}{'logins/s':>10}{'per core':>10}")
+        for tier in tiers:
+            hashers = [settings.PASSWORD_HASHER_TIERS[tier]] + settings.PASSWORD_HASHERS
+            with override_settings(PASSWORD_HASHERS=hashers):
+                try:
+                    encoded = make_password(BENCH_PASSWORD)
+                except (ImportError, ValueError) as exc:
+                    self.stdout.write(self.style.WARNING(f'{tier:<8}skipped: {exc}'))
+                    continue
+                latency = self._sequential(encoded, options['sequential'])
+                rate = self._concurrent(encoded, options['logins'])
+            self.stdout.write(f'{tier:<8}{latency * 1000:>10.1f}{rate:>10.1f}{rate / cores:>10.1f}')
+
+    def _sequential(self, encoded, count):
+        # Full ModelBackend path, including the user lookup; rolled back afterwards
+        with transaction.atomic():
+            user = CustomUser.objects.create(username='bench_login_user', password=encoded)
+            start = time.perf_counter()
+            for _ in range(count):
+                if authenticate(username=user.username, password=BENCH_PASSWORD) is None:
+                    raise CommandError('Benchmark login failed')
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed / count
+
+    def _concurrent(self, encoded, count):
+        pool = hashing.get_pool()
+        start = time.perf_counter()
+        futures = [pool.submit(hashing._verify, BENCH_PASSWORD, encoded) for _ in range(count)]
+        for future in futures:
+            future.result()
+        return count / (time.perf_counter() - start)
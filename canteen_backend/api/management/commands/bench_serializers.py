@@ -0,0 +1,74 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import menu_item_rows, order_rows, user_rows
+from api.models import CustomUser, MenuItem, Order, OrderItem
+from api.renderers import FastJSONRenderer
+from api.serializers import CustomUserSerializer, MenuItemSerializer, OrderSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark DRF serializers against the fast .values() serialization path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--menu-items', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Generated rows live only inside this transaction
+        with transaction.atomic():
+            self._seed(options)
+            cases = [
+                ('menu', MenuItem.objects.all(), MenuItemSerializer, menu_item_rows),
+                ('users', CustomUser.objects.exclude(role='admin'), CustomUserSerializer, user_rows),
+                ('orders', Order.objects.select_related('user').prefetch_related('order_items__menu_item'),
+                 OrderSerializer, order_rows),
+            ]
+            self.stdout.write(f"{'case':<8}{'rows':>8}{'serializer ms':>16}{'fast ms':>12}{'speedup':>10}")
+            for name, queryset, serializer_class, rows in cases:
+                slow = self._time(options['repeat'], lambda: JSONRenderer().render(
+                    serializer_class(queryset.all(), many=True).data))
+                fast = self._time(options['repeat'], lambda: FastJSONRenderer().render(rows(queryset.all())))
+                self.stdout.write(
+                    f"{name:<8}{queryset.count():>8}{slow * 1000:>16.1f}{fast * 1000:>12.1f}{slow / fast:>9.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    def _time(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _seed(self, options):
+        password = make_password('bench')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_user_{i}', password=password, role='employee',
+                       work_shift=random.choice(['day', 'mid', 'night']), monthly_tokens=100)
+            for i in range(options['users'])
+        ])
+        menu_items = MenuItem.objects.bulk_create([
+            MenuItem(name=f'Bench item {i}', description='Benchmark menu item', price=random.randint(5, 60))
+            for i in range(options['menu_items'])
+        ])
+        orders = Order.objects.bulk_create([
+            Order(user=random.choice(users), status='completed')
+            for _ in range(options['orders'])
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=menu_item, quantity=random.randint(1, 3),
+                      tokens_per_item=menu_item.price)
+            for order in orders
+            for menu_item in random.sample(menu_items, min(options['items_per_order'], len(menu_items)))
+        ], batch_size=2000)
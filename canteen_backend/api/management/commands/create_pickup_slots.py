@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from api.models import PickupSlot, Site
+
+
+class Command(BaseCommand):
+    help = (
+        'Create consecutive pickup slots of equal length and capacity for one day, '
+        'e.g. --start 12:00 --end 14:00 --minutes 10 --capacity 40 for a lunch break.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day as YYYY-MM-DD (default: today)')
+        parser.add_argument('--start', required=True, help='First slot start, HH:MM local time')
+        parser.add_argument('--end', required=True, help='Last slot end, HH:MM local time')
+        parser.add_argument('--minutes', type=int, default=10, help='Slot length')
+        parser.add_argument('--capacity', type=int, required=True, help='Orders per slot')
+        parser.add_argument('--site', help='Site code (default: the default canteen)')
+
+    def handle(self, *args, **options):
+        try:
+            day = parse_date(options['date']) if options['date'] else timezone.localdate()
+            start, end = parse_time(options['start']), parse_time(options['end'])
+        except ValueError:
+            day = start = end = None
+        if not (day and start and end) or end <= start or options['minutes'] <= 0 or options['capacity'] <= 0:
+            raise CommandError('Need a valid --date, --start before --end, and positive --minutes and --capacity')
+
+        site = None
+        if options['site']:
+            site = Site.objects.filter(code=options['site']).first()
+            if site is None:
+                raise CommandError(f"Unknown site '{options['site']}'")
+
+        current = timezone.make_aware(datetime.combine(day, start))
+        last = timezone.make_aware(datetime.combine(day, end))
+        length = timedelta(minutes=options['minutes'])
+        # Slots already created for the same start are left alone, so re-running is harmless
+        existing = set(PickupSlot.objects.filter(site=site, starts_at__gte=current, starts_at__lt=last)
+                       .values_list('starts_at', flat=True))
+        slots = []
+        while current + length <= last:
+            if current not in existing:
+                slots.append(PickupSlot(site=site, starts_at=current, ends_at=current + length,
+                                        capacity=options['capacity']))
+            current += length
+        PickupSlot.objects.bulk_create(slots)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(slots)} pickup slots on {day} for {site or 'the default canteen'}"
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import forecast
+from api.models import Site
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the per-item, per-shift, per-weekday demand forecast served to the kitchen '
+        '(staff/forecast/) from recent order history. Needs NumPy; schedule it nightly (e.g. from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, default=None,
+                            help='Weeks of history to use (default: FORECAST_WEEKS)')
+        parser.add_argument('--site', help='Site code (default: every active site and the default canteen)')
+
+    def handle(self, *args, **options):
+        if forecast.np is None:
+            raise CommandError('Demand forecasting needs NumPy (pip install numpy)')
+        if options['weeks'] is not None and options['weeks'] < 1:
+            raise CommandError('--weeks must be positive')
+
+        if options['site']:
+            site = Site.objects.filter(code=options['site']).first()
+            if site is None:
+                raise CommandError(f"Unknown site '{options['site']}'")
+            sites = [site]
+        else:
+            sites = [None, *Site.objects.filter(is_active=True).order_by('id')]
+
+        for site in sites:
+            stored = forecast.compute_forecasts(site.pk if site else None, weeks=options['weeks'])
+            self.stdout.write(f"{site or 'Default canteen'}: {stored} forecast rows")
+        self.stdout.write(self.style.SUCCESS('Demand forecast updated'))
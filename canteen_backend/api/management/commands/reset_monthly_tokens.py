@@ -1,24 +1,79 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from django.contrib.auth import get_user_model
+
+from api.models import CustomUser, TokenDistribution
+from api.signals import tokens_changed
+from api.utils import parse_month
+
 
 class Command(BaseCommand):
-    help = 'Reset monthly tokens for all users on the 1st of each month'
+    help = (
+        'Reset monthly tokens in primary-key chunks, recording a TokenDistribution row per user. '
+        'Users that already have a row for the month are skipped, so the command can be re-run '
+        'to resume an interrupted reset or to catch up on a missed month.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to reset as YYYY-MM (default: current month)')
+        parser.add_argument('--tokens', type=int, default=0, help='Balance to reset users to')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between chunks to leave room for other writers')
 
     def handle(self, *args, **options):
-        today = timezone.now().date()
-        if today.day != 1:
-            self.stdout.write(self.style.WARNING(
-                'This command should only be run on the 1st of the month'
-            ))
-            return
-
-        User = get_user_model()
-        updated = User.objects.update(
-            monthly_tokens=0,
-            last_token_reset=today
-        )
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Reset tokens for {updated} users')
+        if options['month']:
+            month = parse_month(options['month'])
+            if month is None:
+                raise CommandError('--month must be YYYY-MM')
+        else:
+            month = timezone.now().date().replace(day=1)
+        tokens = options['tokens']
+        chunk_size = options['chunk_size']
+
+        pending = CustomUser.objects.filter(role__in=CustomUser.TOKEN_ROLES).exclude(
+            Exists(TokenDistribution.objects.filter(user=OuterRef('pk'), allocation_month=month))
         )
+
+        started = time.monotonic()
+        last_pk = 0
+        recorded = reset = chunks = 0
+        while True:
+            ids = list(
+                pending.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                # Users already moved on to a later month keep their balance and get no history row
+                due_sites = dict(
+                    CustomUser.objects.select_for_update()
+                    .filter(pk__in=ids, last_token_reset__lt=month).values_list('pk', 'site_id')
+                )
+                due = list(due_sites)
+                reset += CustomUser.objects.filter(pk__in=due).update(monthly_tokens=tokens, last_token_reset=month)
+                # bulk_create returns every object even when ignore_conflicts skipped its row
+                history = TokenDistribution.objects.filter(user_id__in=due, allocation_month=month)
+                before = history.count()
+                TokenDistribution.objects.bulk_create(
+                    [TokenDistribution(user_id=pk, tokens_allocated=tokens, allocation_month=month) for pk in due],
+                    ignore_conflicts=True,
+                )
+                recorded += history.count() - before
+                if due:
+                    # The UPDATE skips post_save; drop cached balances for the sites touched
+                    tokens_changed.send(sender=CustomUser, site_ids=list(set(due_sites.values())))
+            last_pk = ids[-1]
+            chunks += 1
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = time.monotonic() - started
+        rate = reset / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Reset tokens for {reset} users and recorded {recorded} distributions for "
+            f"{month.strftime('%b %Y')} in {chunks} chunks, {elapsed:.2f}s ({rate:.0f} users/s)"
+        ))
@@ -0,0 +1,208 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.caching import invalidate
+from api.models import (
+    ArchivedOrder, ArchivedOrderItem, CustomUser, MenuItem, Order, OrderItem, ShiftTokenAllocation, Site,
+    TokenDistribution, summarize_lines,
+)
+from api.utils import day_bounds
+
+DISHES = [
+    'Chicken Biryani', 'Veg Pulao', 'Masala Dosa', 'Idli Sambar', 'Paneer Wrap', 'Egg Fried Rice',
+    'Dal Tadka', 'Chole Bhature', 'Grilled Sandwich', 'Veg Noodles', 'Fish Curry', 'Rajma Chawal',
+    'Aloo Paratha', 'Tomato Soup', 'Fruit Bowl', 'Masala Chai', 'Filter Coffee', 'Lime Soda',
+]
+
+# Meal time per customer shift: (mean, spread) in hours after local midnight
+SHIFT_MEAL_HOURS = {'day': (12.5, 0.75), 'mid': (18.5, 0.75), 'night': (1.0, 0.75)}
+SHIFT_MIX = {'day': 0.6, 'mid': 0.25, 'night': 0.15}
+SHIFT_TOKENS = {'day': 600, 'mid': 500, 'night': 700}
+WEEKEND_FACTOR = 0.4
+
+
+def insert_sql(model, columns):
+    """Parameterised INSERT of ``columns`` into ``model``'s table, for cursor.executemany"""
+    quote = connection.ops.quote_name
+    return (
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill a site with synthetic users, menu items, token allocation history and orders for scale '
+        'testing. Rows go in through chunked bulk inserts with precomputed ids and one shared password '
+        'hash; e.g. --orders 10000000 builds a 10M-order dataset. Never run it against production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', default='seed', help='Site code to fill (created if missing)')
+        parser.add_argument('--employees', type=int, default=2000)
+        parser.add_argument('--guests', type=int, default=200)
+        parser.add_argument('--staff', type=int, default=20)
+        parser.add_argument('--admins', type=int, default=2)
+        parser.add_argument('--menu-items', type=int, default=60)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=365, help='Spread orders over this many days up to today')
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Orders per bulk insert and transaction')
+        parser.add_argument('--password', default='password', help='Password of every generated user')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for a reproducible dataset')
+
+    def handle(self, *args, **options):
+        counts = ('employees', 'guests', 'staff', 'admins', 'menu_items', 'orders')
+        if any(options[name] < 0 for name in counts) or options['days'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('Counts must not be negative; --days and --chunk-size must be positive')
+        if options['orders'] and not (options['employees'] + options['guests'] and options['menu_items']):
+            raise CommandError('Orders need at least one employee or guest and one menu item')
+
+        self.random = random.Random(options['seed'])
+        site, _ = Site.objects.get_or_create(code=options['site'], defaults={'name': f"Seed {options['site']}"})
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            customers = self._users(site, options)
+            menu_items = self._menu(site, options['menu_items'])
+            self._token_history(site, customers, options['days'])
+        self.stdout.write(
+            f"{len(customers)} employees/guests, {options['staff'] + options['admins']} staff/admins, "
+            f"{len(menu_items)} menu items and token history in {time.perf_counter() - started:.1f}s"
+        )
+
+        if options['orders']:
+            self._orders(site, customers, menu_items, options)
+        # Bulk inserts send no signals; drop cached dashboards, menus and summaries
+        invalidate('menu', 'dashboard', 'users')
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded site '{site.code}' in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def _users(self, site, options):
+        """Create the users; returns the employees and guests as (id, work_shift) pairs"""
+        prefix = f'seed_{site.code}'
+        if CustomUser.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Site '{site.code}' is already seeded; pick another --site")
+
+        # make_password per user would spend most of the run in the hasher
+        password = make_password(options['password'])
+        shifts, weights = list(SHIFT_MIX), list(SHIFT_MIX.values())
+        users = [
+            CustomUser(username=f'{prefix}_{role}_{i}', password=password, role=role, site=site,
+                       work_shift=self.random.choices(shifts, weights)[0])
+            for role, count in (('employee', options['employees']), ('guest', options['guests']),
+                                ('staff', options['staff']), ('admin', options['admins']))
+            for i in range(count)
+        ]
+        CustomUser.objects.bulk_create(users, batch_size=2000)
+        return list(
+            CustomUser.objects.filter(site=site, role__in=CustomUser.TOKEN_ROLES, username__startswith=f'{prefix}_')
+            .values_list('id', 'work_shift')
+        )
+
+    def _menu(self, site, count):
+        """Create the menu; returns (id, name, price, popularity weight) per item"""
+        items = MenuItem.objects.bulk_create([
+            MenuItem(site=site, name=DISHES[i % len(DISHES)] + (f' {i // len(DISHES) + 1}' if i >= len(DISHES) else ''),
+                     description='Generated by seed_canteen', price=self.random.randint(5, 60))
+            for i in range(count)
+        ])
+        # A few favourites take most orders
+        return [(item.pk, item.name, item.price, 1 / (rank + 1)) for rank, item in enumerate(items)]
+
+    def _token_history(self, site, customers, days):
+        """Monthly shift allocations and per-user distributions for every month the orders span"""
+        month = timezone.localdate().replace(day=1)
+        first = (timezone.localdate() - timedelta(days=days - 1)).replace(day=1)
+        months = []
+        while month >= first:
+            months.append(month)
+            month = (month - timedelta(days=1)).replace(day=1)
+
+        ShiftTokenAllocation.objects.bulk_create([
+            ShiftTokenAllocation(site=site, shift=shift, tokens_per_user=tokens, allocation_month=month)
+            for month in months for shift, tokens in SHIFT_TOKENS.items()
+        ], ignore_conflicts=True)
+        TokenDistribution.objects.bulk_create([
+            TokenDistribution(user_id=user_id, tokens_allocated=SHIFT_TOKENS[shift], allocation_month=month)
+            for month in months for user_id, shift in customers
+        ], batch_size=5000)
+        for shift, tokens in SHIFT_TOKENS.items():
+            CustomUser.objects.filter(id__in=[user_id for user_id, user_shift in customers if user_shift == shift]) \
+                .update(monthly_tokens=tokens, last_token_reset=months[0])
+
+    def _orders(self, site, customers, menu_items, options):
+        rng, total, chunk_size = self.random, options['orders'], options['chunk_size']
+        today = timezone.localdate()
+        days = [today - timedelta(days=offset) for offset in range(options['days'] - 1, -1, -1)]
+        # Weekends are quieter, and the canteen has grown over the period
+        day_weights = [
+            (WEEKEND_FACTOR if day.weekday() >= 5 else 1.0) * (0.7 + 0.3 * index / len(days))
+            for index, day in enumerate(days)
+        ]
+        day_starts = [day_bounds(day)[0] for day in days]
+        menu_weights = [weight for *_, weight in menu_items]
+
+        # Orders and their lines are the bulk of the run. They skip model instances and
+        # bulk_create, whose per-batch SQL compilation (about 150 rows per batch on SQLite)
+        # dominated the time, and go through executemany with ids assigned here. Archived
+        # rows keep their original ids, so new ids start above those too.
+        next_order_id = 1 + max(Order.objects.aggregate(m=Max('id'))['m'] or 0,
+                                ArchivedOrder.objects.aggregate(m=Max('id'))['m'] or 0)
+        next_item_id = 1 + max(OrderItem.objects.aggregate(m=Max('id'))['m'] or 0,
+                               ArchivedOrderItem.objects.aggregate(m=Max('id'))['m'] or 0)
+
+        adapt = connection.ops.adapt_datetimefield_value
+        insert_order = insert_sql(Order, ['id', 'user_id', 'site_id', 'status', 'total_tokens', 'item_count',
+                                          'items_summary', 'created_at', 'updated_at'])
+        insert_line = insert_sql(OrderItem, ['id', 'order_id', 'menu_item_id', 'quantity', 'tokens_per_item'])
+
+        started, created = time.perf_counter(), 0
+        while created < total:
+            count = min(chunk_size, total - created)
+            orders, lines = [], []
+            for day_index in rng.choices(range(len(days)), day_weights, k=count):
+                user_id, shift = customers[rng.randrange(len(customers))]
+                mean, spread = SHIFT_MEAL_HOURS[shift]
+                seconds = min(max(rng.gauss(mean, spread) * 3600, 0), 86399)
+                created_at = day_starts[day_index] + timedelta(seconds=seconds)
+                if days[day_index] == today:
+                    status = rng.choice(('pending', 'approved', 'completed'))
+                else:
+                    status = 'declined' if rng.random() < 0.05 else 'completed'
+
+                order_lines = []
+                picked = rng.choices(menu_items, menu_weights, k=rng.choice((1, 1, 2, 2, 3)))
+                for menu_item_id, name, price, _ in dict.fromkeys(picked):
+                    quantity = 1 if rng.random() < 0.8 else 2
+                    order_lines.append((name, quantity, price))
+                    lines.append((next_item_id, next_order_id, menu_item_id, quantity, price))
+                    next_item_id += 1
+                total_tokens, item_count, items_summary = summarize_lines(order_lines)
+                orders.append((
+                    next_order_id, user_id, site.pk, status, total_tokens, item_count, items_summary,
+                    adapt(created_at), adapt(created_at + timedelta(minutes=rng.randint(1, 30))),
+                ))
+                next_order_id += 1
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(insert_order, orders)
+                cursor.executemany(insert_line, lines)
+            created += count
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{created}/{total} orders ({created / elapsed:.0f}/s)')
+
+        # Backends with sequences (PostgreSQL) must continue after the explicit ids
+        statements = connection.ops.sequence_reset_sql(no_style(), [Order, OrderItem])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.session_sweeper import DB_SESSION_ENGINES, sweep_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the session table in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SESSION_SWEEP_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches (default: until no expired rows remain)')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches to leave room for other writers')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+            raise CommandError(f'{settings.SESSION_ENGINE} does not store sessions in the database')
+
+        removed, elapsed = sweep_expired_sessions(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+        )
+        rate = removed / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(f'Removed {removed} expired sessions in {elapsed:.2f}s ({rate:.0f} rows/s)')
+        )
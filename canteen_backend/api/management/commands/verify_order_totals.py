@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from api.models import ArchivedOrder, Order
+
+# items_summary is left alone: it records the item names as they were when
+# the order was placed, and menu items may be renamed since
+TOTAL_FIELDS = ['total_tokens', 'item_count']
+
+
+class Command(BaseCommand):
+    help = (
+        "Check each order's denormalized total_tokens and item_count against its items "
+        '(live and archived orders). With --fix, rewrite the rows that drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite drifted orders from their items')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--show', type=int, default=10, help='How many drifted orders to list')
+
+    def handle(self, *args, **options):
+        total_drifted = 0
+        for model in (Order, ArchivedOrder):
+            checked, drifted = self.verify(model, options['chunk_size'], options['fix'], options['show'])
+            total_drifted += drifted
+            self.stdout.write(f'{model.__name__}: checked {checked}, drifted {drifted}')
+
+        if not total_drifted:
+            self.stdout.write(self.style.SUCCESS('All order summaries match their items'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {total_drifted} orders'))
+        else:
+            raise CommandError(f'{total_drifted} orders drifted from their items; re-run with --fix')
+
+    def verify(self, model, chunk_size, fix, show):
+        item_model = model.order_items.rel.related_model
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            orders = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', *TOTAL_FIELDS)[:chunk_size])
+            if not orders:
+                break
+            totals = {
+                order_id: (total_tokens, item_count)
+                for order_id, total_tokens, item_count in (
+                    item_model.objects.filter(order_id__in=[order.pk for order in orders])
+                    .values('order_id')
+                    .annotate(total_tokens=Sum(F('quantity') * F('tokens_per_item')), item_count=Sum('quantity'))
+                    .values_list('order_id', 'total_tokens', 'item_count')
+                )
+            }
+
+            stale = []
+            for order in orders:
+                expected = totals.get(order.pk, (0, 0))
+                stored = tuple(getattr(order, field) for field in TOTAL_FIELDS)
+                if stored == expected:
+                    continue
+                if drifted < show:
+                    self.stdout.write(
+                        f'  {model.__name__} #{order.pk}: total {stored[0]} -> {expected[0]}, '
+                        f'items {stored[1]} -> {expected[1]}'
+                    )
+                drifted += 1
+                order.total_tokens, order.item_count = expected
+                stale.append(order)
+            if fix and stale:
+                # Bump updated_at so staff queues syncing with ?since= pick up the fix
+                now = timezone.now()
+                for order in stale:
+                    order.updated_at = now
+                model.objects.bulk_update(stale, TOTAL_FIELDS + ['updated_at'])
+
+            checked += len(orders)
+            last_pk = orders[-1].pk
+        return checked, drifted
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_shifttokenallocation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='daily_stock',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='stock_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='stock_remaining',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
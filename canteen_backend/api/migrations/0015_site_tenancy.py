@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_order_user_created_at_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Site',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.SlugField(max_length=20, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='shifttokenallocation',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='users', to='api.site'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='menu_items', to='api.site'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='api.site'),
+        ),
+        migrations.AddField(
+            model_name='shifttokenallocation',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='api.site'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['site', 'role', 'work_shift'], name='api_customu_site_id_d1cf35_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['site', 'is_available'], name='api_menuite_site_id_e4ffff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['site', 'created_at'], name='api_order_site_id_a0f448_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['site', 'status', 'created_at'], name='api_order_site_id_8ee3d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shifttokenallocation',
+            index=models.Index(fields=['site', 'allocation_month', 'shift'], name='api_shiftto_site_id_11f210_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='shifttokenallocation',
+            constraint=models.UniqueConstraint(fields=('site', 'shift', 'allocation_month'), name='unique_site_shift_allocation'),
+        ),
+        migrations.AddConstraint(
+            model_name='shifttokenallocation',
+            constraint=models.UniqueConstraint(condition=models.Q(('site__isnull', True)), fields=('shift', 'allocation_month'), name='unique_default_site_shift_allocation'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    # Inlined copy of api.models.summarize_lines, as migrations must not depend on current code
+    for order_model, item_model in (('Order', 'OrderItem'), ('ArchivedOrder', 'ArchivedOrderItem')):
+        Order = apps.get_model('api', order_model)
+        OrderItem = apps.get_model('api', item_model)
+        last_pk = 0
+        while True:
+            orders = list(Order.objects.filter(pk__gt=last_pk).order_by('pk').only('id')[:500])
+            if not orders:
+                break
+            lines = {}
+            for order_id, name, quantity, tokens in (
+                OrderItem.objects.filter(order_id__in=[order.pk for order in orders])
+                .order_by('id').values_list('order_id', 'menu_item__name', 'quantity', 'tokens_per_item')
+            ):
+                lines.setdefault(order_id, []).append((name, quantity, tokens))
+            for order in orders:
+                order_lines = lines.get(order.pk, [])
+                order.total_tokens = sum(quantity * tokens for _, quantity, tokens in order_lines)
+                order.item_count = sum(quantity for _, quantity, _ in order_lines)
+                order.items_summary = '\n'.join(f'{quantity}x {name}' for name, quantity, _ in order_lines)
+            Order.objects.bulk_update(orders, ['total_tokens', 'item_count', 'items_summary'])
+            last_pk = orders[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='items_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
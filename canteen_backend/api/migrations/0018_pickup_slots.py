@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_order_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='pickup_slots', to='api.site')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='pickup_slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='api.pickupslot'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='pickup_slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='api.pickupslot'),
+        ),
+        migrations.AddIndex(
+            model_name='pickupslot',
+            index=models.Index(fields=['site', 'starts_at'], name='api_pickups_site_id_733676_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pickupslot',
+            constraint=models.CheckConstraint(condition=models.Q(('reserved__lte', models.F('capacity'))), name='pickup_slot_within_capacity'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_order_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shift', models.CharField(choices=[('day', 'Day'), ('mid', 'Mid'), ('night', 'Night')], max_length=10)),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('weekday_average', models.FloatField()),
+                ('recent_average', models.FloatField()),
+                ('forecast', models.FloatField()),
+                ('prep_quantity', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.menuitem')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'weekday'], name='api_demandf_site_id_b99b33_idx')],
+            },
+        ),
+    ]
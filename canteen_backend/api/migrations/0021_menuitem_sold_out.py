@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:52
+
+from django.db import migrations, models
+
+
+def mark_sold_out(apps, schema_editor):
+    # Before this flag every switched-off item with no stock left was refilled as sold out
+    MenuItem = apps.get_model('api', 'MenuItem')
+    MenuItem.objects.filter(daily_stock__isnull=False, stock_remaining=0, is_available=False).update(sold_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_demand_forecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='sold_out',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_sold_out, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_menuitem_sold_out'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='claim_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
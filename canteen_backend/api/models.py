@@ -1,7 +1,28 @@
 from django.contrib.auth.models import AbstractUser
+from django.utils.crypto import salted_hmac
 from django.db import models
 from django.utils import timezone
-from django.contrib.auth.hashers import make_password
+
+from .hashing import hash_password
+
+
+def summarize_lines(lines):
+    """(total_tokens, item_count, items_summary) for an order's (name, quantity, tokens_per_item) lines"""
+    lines = list(lines)
+    total_tokens = sum(quantity * tokens for _, quantity, tokens in lines)
+    item_count = sum(quantity for _, quantity, _ in lines)
+    items_summary = '\n'.join(f'{quantity}x {name}' for name, quantity, _ in lines)
+    return total_tokens, item_count, items_summary
+
+
+class Site(models.Model):
+    """A canteen. Rows with no site belong to the default (single-site) canteen."""
+    name = models.CharField(max_length=100)
+    code = models.SlugField(max_length=20, unique=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
 
 
 class CustomUser(AbstractUser):
@@ -16,18 +37,46 @@ class CustomUser(AbstractUser):
         ('employee', 'Employee'),
         ('guest', 'Guest'),
     ]
+    # Roles that receive and spend meal tokens
+    TOKEN_ROLES = ['employee', 'guest']
+    CLAIM_FIELDS = ['role', 'site_id', 'is_active', 'password']
     work_shift = models.CharField(max_length=10, choices=WORK_SHIFT_CHOICES, default='day')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='employee')
     user_id = models.CharField(max_length=20, unique=True, null=True, blank=True)
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name='users')
     monthly_tokens = models.PositiveIntegerField(default=0)
     last_token_reset = models.DateField(default=timezone.now)
+    # Bumped when any of CLAIM_FIELDS changes; session role claims carry it, so
+    # older claims stop authorizing at once (see authentication.py)
+    claim_version = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['site', 'role', 'work_shift']),
+        ]
 
     def save(self, *args, **kwargs):
-        # Only set a default password if creating and no password has been set
+        # Only set a default password if creating and no password has been set;
+        # hashed on the bounded hashing pool like every other request-path hash
         if not self.pk and not self.password:
-            self.password = make_password(self.username)
+            self.password = hash_password(self.username)
+        update_fields = kwargs.get('update_fields')
+        claim_fields = {'role', 'site', 'site_id', 'is_active', 'password'}
+        if self.pk and (update_fields is None or claim_fields & set(update_fields)):
+            old = CustomUser.objects.filter(pk=self.pk).values(*self.CLAIM_FIELDS).first()
+            if old is not None and any(old[name] != getattr(self, name) for name in self.CLAIM_FIELDS):
+                self.claim_version += 1
+                if update_fields is not None:
+                    kwargs['update_fields'] = [*update_fields, 'claim_version']
         super().save(*args, **kwargs)
 
+    def get_session_auth_hash(self):
+        # Keyed on claim_version rather than the password hash, so a rehash on login
+        # (same password, new hasher tier) does not log out the user's other sessions
+        return salted_hmac(
+            'api.CustomUser.get_session_auth_hash', f'{self.pk}:{self.claim_version}', algorithm='sha256'
+        ).hexdigest()
+
     def current_tokens(self):
         # Admin and staff don't use tokens
         if self.role in ['admin', 'staff']:
@@ -47,16 +96,55 @@ class CustomUser(AbstractUser):
 
 
 class MenuItem(models.Model):
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name='menu_items')
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.PositiveIntegerField()  
     is_available = models.BooleanField(default=True)
+    # Daily stock; a null daily_stock means the item is never sold out
+    daily_stock = models.PositiveIntegerField(null=True, blank=True)
+    stock_remaining = models.PositiveIntegerField(null=True, blank=True)
+    stock_date = models.DateField(null=True, blank=True)
+    # Switched off because its stock ran out (rather than by hand); the next refill switches it back on
+    sold_out = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'is_available']),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class PickupSlot(models.Model):
+    """A pickup window that takes at most ``capacity`` orders (see slots.py)"""
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name='pickup_slots')
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(fields=['site', 'starts_at']),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(reserved__lte=models.F('capacity')), name='pickup_slot_within_capacity'),
+        ]
+
+    @property
+    def remaining(self):
+        return self.capacity - self.reserved
+
+    def __str__(self):
+        start = timezone.localtime(self.starts_at)
+        end = timezone.localtime(self.ends_at)
+        return f"{start:%d %b %H:%M}-{end:%H:%M} ({self.reserved}/{self.capacity})"
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -66,18 +154,33 @@ class Order(models.Model):
     ]
 
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='orders')
+    # Copied from the user when the order is placed so site queues need no join
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name='orders')
+    pickup_slot = models.ForeignKey(PickupSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     total_tokens = models.PositiveIntegerField(default=0)
+    # Set from the order items once, when the order is placed (summarize_lines),
+    # so lists and reports never need to join OrderItem. items_summary is a
+    # snapshot of the item names at that time; verify_order_totals checks the
+    # two totals, which cannot legitimately change afterwards
+    item_count = models.PositiveIntegerField(default=0)
+    items_summary = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['site', 'created_at']),
+            models.Index(fields=['site', 'status', 'created_at']),
+            # Staff queue delta sync (?since=)
+            models.Index(fields=['site', 'updated_at']),
+        ]
 
     @property
     def total_amount(self):
-        """Calculate total amount from order items"""
-        return sum(item.tokens_per_item * item.quantity for item in self.order_items.all())
+        return self.total_tokens
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
@@ -95,19 +198,106 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.menu_item.name} x {self.quantity}"
+
+
+class ArchivedOrder(models.Model):
+    """Completed or declined order moved out of the live tables by ``archive_orders``"""
+    # Keeps the original Order id
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_orders')
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name='archived_orders')
+    pickup_slot = models.ForeignKey(
+        PickupSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_orders'
+    )
+    status = models.CharField(max_length=10, choices=Order.STATUS_CHOICES)
+    total_tokens = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    items_summary = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['site', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.user.username}"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_items')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    tokens_per_item = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.menu_item.name} x {self.quantity}"
       
 
+class OrderTombstone(models.Model):
+    """Id of a deleted (or archived) Order, so staff queues syncing with ?since= can drop it"""
+    order_id = models.BigIntegerField()
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Deleted order #{self.order_id}"
+
+
+class DemandForecast(models.Model):
+    """Precomputed prep forecast for one menu item, customer shift and weekday (see api/forecast.py)"""
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+    shift = models.CharField(max_length=10, choices=CustomUser.WORK_SHIFT_CHOICES)
+    # Monday is 0, as date.weekday()
+    weekday = models.PositiveSmallIntegerField()
+    weekday_average = models.FloatField()
+    recent_average = models.FloatField()
+    forecast = models.FloatField()
+    prep_quantity = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'weekday']),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item_id} {self.shift} weekday {self.weekday}: {self.prep_quantity}"
+
+
 class ShiftTokenAllocation(models.Model):
     SHIFT_CHOICES = CustomUser.WORK_SHIFT_CHOICES
 
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name='allocations')
     shift = models.CharField(max_length=10, choices=SHIFT_CHOICES, db_index=True)
     tokens_per_user = models.PositiveIntegerField(default=0)
     allocation_month = models.DateField(default=timezone.now, db_index=True)
 
     class Meta:
-        unique_together = ('shift', 'allocation_month')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['site', 'shift', 'allocation_month'], name='unique_site_shift_allocation'
+            ),
+            # NULLs never collide in the constraint above
+            models.UniqueConstraint(
+                fields=['shift', 'allocation_month'], condition=models.Q(site__isnull=True),
+                name='unique_default_site_shift_allocation'
+            ),
+        ]
         indexes = [
             models.Index(fields=['shift', 'allocation_month']),
+            models.Index(fields=['site', 'allocation_month', 'shift']),
         ]
 
     def save(self, *args, **kwargs):
@@ -115,16 +305,11 @@ class ShiftTokenAllocation(models.Model):
         self.allocation_month = self.allocation_month.replace(day=1)
         super().save(*args, **kwargs)
 
-        # Apply tokens to all users in this shift
-        # Use the allocation_month just saved, not the current month
-        month_start = self.allocation_month
-        users = CustomUser.objects.filter(work_shift=self.shift, role='employee')
-        for user in users:
-            dist, _ = TokenDistribution.objects.get_or_create(
-                user=user,
-                allocation_month=month_start
-            )
-            dist.assign_tokens(self.tokens_per_user, month_start)
+        # Apply tokens to all users in this shift for the month just saved; a future
+        # month waits for its rollover (allocate_tokens), so current balances stay put
+        if self.allocation_month <= timezone.localdate().replace(day=1):
+            from .allocation import apply_allocations
+            apply_allocations(self.allocation_month, shifts=[self.shift], site_ids=[self.site_id])
 
     def __str__(self):
         return f"{self.get_shift_display()} shift - {self.tokens_per_user} tokens ({self.allocation_month.strftime('%b %Y')})"
@@ -0,0 +1,224 @@
+"""
+Menu, order history and order placement shared by every ordering role.
+
+Employees and guests go through the same views; what differs per role
+lives on an ``OrderingPolicy`` passed to the views' ``as_view()``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.decorators import method_decorator
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .caching import cache_response, cached_result, user_orders_tag
+from .fast_serializers import serialize_many
+from .models import ArchivedOrder, CustomUser, MenuItem, Order
+from .pagination import OrderHistoryPagination
+from .permissions import IsEmployee, IsGuest
+from .serializers import ArchivedOrderSerializer, MenuItemSerializer, OrderSerializer
+from .sites import request_site_id
+from .slots import SlotUnavailable, reserve_slot, slot_snapshot
+from .sparse import FieldSpec
+from .stock import OutOfStock, reserve_stock, rollover_stock
+from .throttling import OrderThrottle, RoleBucketThrottle
+from .utils import day_bounds, month_bounds, parse_month
+
+
+class InsufficientTokens(Exception):
+    def __init__(self, required, available):
+        self.required = required
+        self.available = available
+        super().__init__(f'Insufficient tokens. Required: {required}, Available: {available}')
+
+
+class OrderingPolicy:
+    """Per-role hooks for the shared ordering views"""
+    role = None
+    permission_class = None
+
+    def menu_queryset(self, request):
+        return MenuItem.objects.filter(site_id=request_site_id(request), is_available=True)
+
+    def history_queryset(self, request):
+        return (
+            Order.objects.filter(user_id=request.user.pk)
+            .select_related('user')
+            .prefetch_related('order_items__menu_item')
+        )
+
+    def archive_queryset(self, request):
+        return (
+            ArchivedOrder.objects.filter(user_id=request.user.pk)
+            .select_related('user')
+            .prefetch_related('order_items__menu_item')
+        )
+
+    def available_tokens(self, user):
+        return user.current_tokens()
+
+    def charge(self, user, total_tokens):
+        """Deduct tokens with a conditional UPDATE so concurrent orders cannot overspend"""
+        updated = CustomUser.objects.filter(
+            pk=user.pk, monthly_tokens__gte=total_tokens
+        ).update(monthly_tokens=F('monthly_tokens') - total_tokens)
+        if not updated:
+            user.refresh_from_db(fields=['monthly_tokens'])
+            raise InsufficientTokens(total_tokens, user.monthly_tokens)
+        user.monthly_tokens -= total_tokens
+
+
+class EmployeePolicy(OrderingPolicy):
+    role = 'employee'
+    permission_class = IsEmployee
+
+
+class GuestPolicy(OrderingPolicy):
+    role = 'guest'
+    permission_class = IsGuest
+
+
+POLICIES = {policy.role: policy for policy in (EmployeePolicy(), GuestPolicy())}
+
+
+class OrderingView(APIView):
+    policy = None
+
+    def get_permissions(self):
+        return [self.policy.permission_class()]
+
+
+class MenuView(OrderingView):
+    """Available items; with ``?slots=1``, ``{items, pickup_slots}`` including remaining slot capacity"""
+
+    def get(self, request):
+        rollover_stock()
+        site_id = request_site_id(request)
+        field_spec = FieldSpec.from_request(request)
+        menu_items = cached_result(
+            'menu', ['menu'], (self.policy.role, site_id, field_spec and field_spec.cache_key()),
+            lambda: serialize_many(self.policy.menu_queryset(request), MenuItemSerializer, field_spec),
+        )
+        if request.query_params.get('slots') not in ('1', 'true'):
+            return Response(menu_items)
+        return Response({'items': menu_items, 'pickup_slots': slot_snapshot(site_id)})
+
+
+class OrderHistoryView(OrderingView):
+    """
+    Today's orders plus one cursor page of earlier orders in a bounded window.
+
+    With ``?archive=1`` the earlier orders come from the archive tables
+    instead, over the whole archive unless ``?month`` narrows it.
+    """
+
+    @method_decorator(cache_response(
+        'order_history', lambda request: [user_orders_tag(request.user.pk), 'orders', 'users'], per_user=True
+    ))
+    def get(self, request):
+        orders = self.policy.history_queryset(request)
+        today_start, today_end = day_bounds()
+        today_orders = orders.filter(created_at__gte=today_start, created_at__lt=today_end)
+
+        archive = request.query_params.get('archive') in ('1', 'true')
+        past_serializer = OrderSerializer
+        if archive:
+            orders = self.policy.archive_queryset(request)
+            past_serializer = ArchivedOrderSerializer
+
+        # Past orders come from ?month=YYYY-MM, else the last ORDER_HISTORY_DAYS days (whole archive)
+        month = parse_month(request.query_params.get('month'))
+        if month:
+            start, end = month_bounds(month)
+            past_orders = orders.filter(created_at__gte=start, created_at__lt=min(end, today_start))
+        elif archive:
+            past_orders = orders
+        else:
+            start = today_start - timedelta(days=settings.ORDER_HISTORY_DAYS)
+            past_orders = orders.filter(created_at__gte=start, created_at__lt=today_start)
+
+        paginator = OrderHistoryPagination()
+        page = paginator.paginate_queryset(
+            past_orders.select_related(None).prefetch_related(None).only('id', 'created_at'), request
+        )
+        past_page = orders.filter(pk__in=[order.pk for order in page])
+
+        field_spec = FieldSpec.from_request(request)
+        return Response({
+            'today_orders': serialize_many(today_orders, OrderSerializer, field_spec),
+            'past_orders': serialize_many(past_page, past_serializer, field_spec),
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+        })
+
+
+class PlaceOrderView(OrderingView):
+    throttle_classes = [OrderThrottle, RoleBucketThrottle]
+
+    def post(self, request):
+        return place_order(request, self.policy)
+
+
+def place_order(request, policy):
+    """Validate, reserve a pickup slot and stock, charge tokens and create an order for ``request.user``"""
+    items = request.data.get('items', [])
+    if not items:
+        return Response({'error': 'No items provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+    slot_id = request.data.get('pickup_slot_id')
+    if slot_id in (None, ''):
+        if settings.PICKUP_SLOT_REQUIRED:
+            return Response({'error': 'A pickup_slot_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        slot_id = None
+    else:
+        try:
+            slot_id = int(slot_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid pickup_slot_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    quantities = {}
+    try:
+        for item in items:
+            menu_item_id, quantity = int(item['menu_item_id']), int(item['quantity'])
+            if quantity < 1:
+                raise ValueError(quantity)
+            quantities[menu_item_id] = quantities.get(menu_item_id, 0) + quantity
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'Each item needs a menu_item_id and a positive quantity'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    # Items of other canteens are treated as missing
+    menu_items = MenuItem.objects.filter(site_id=request_site_id(request)).in_bulk(list(quantities))
+    total_tokens_needed = 0
+    for menu_item_id, quantity in quantities.items():
+        if menu_item_id not in menu_items:
+            return Response({'error': f'Menu item with id {menu_item_id} does not exist'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        total_tokens_needed += menu_items[menu_item_id].price * quantity
+
+    user = request.user
+
+    # Check if user has enough tokens
+    available = policy.available_tokens(user)
+    if available < total_tokens_needed:
+        return Response(
+            {'error': str(InsufficientTokens(total_tokens_needed, available))},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    serializer = OrderSerializer(data={'items': items}, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    try:
+        with transaction.atomic():
+            if slot_id is not None:
+                reserve_slot(slot_id, request_site_id(request))
+            reserve_stock(menu_items, quantities)
+            policy.charge(user, total_tokens_needed)
+            serializer.save(pickup_slot_id=slot_id)
+    except (SlotUnavailable, OutOfStock, InsufficientTokens) as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
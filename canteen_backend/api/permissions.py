@@ -1,22 +1,25 @@
 from rest_framework import permissions
 
-class IsAdmin(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'admin'
 
-class IsStaff(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'staff'
+class RolePermission(permissions.BasePermission):
+    """Allow authenticated users whose role is in ``roles``; reads only the role claim"""
+    roles = ()
 
-class IsEmployee(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'employee'
+        user = request.user
+        return user.is_authenticated and user.role in self.roles
 
-class IsGuest(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'guest'
+class IsAdmin(RolePermission):
+    roles = ('admin',)
 
-class IsStaffOrAdmin(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role in ['staff', 'admin']
-    
\ No newline at end of file
+class IsStaff(RolePermission):
+    roles = ('staff',)
+
+class IsEmployee(RolePermission):
+    roles = ('employee',)
+
+class IsGuest(RolePermission):
+    roles = ('guest',)
+
+class IsStaffOrAdmin(RolePermission):
+    roles = ('staff', 'admin')
@@ -0,0 +1,93 @@
+"""
+Read-replica routing for the admin dashboards and reports.
+
+When ``DATABASE_REPLICA`` is set, settings.py adds a ``replica`` database
+alias. Views decorated with ``reads_from_replica`` send their reads there;
+every other read and every write stays on ``default``, so report
+aggregates never compete with order placement.
+
+Replication lag is hidden from the user who just wrote something:
+``ReplicaPinMiddleware`` sets a short-lived cookie after any successful
+unsafe request, and while it is present that client's report reads stay
+on ``default`` (read-your-writes). The replica is kept up to date by the
+database's own replication (or a copied SQLite file when testing), so
+migrations never run against it.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def reads_from_replica(view):
+    """Route the view's reads to the replica unless the client is pinned to the primary"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not replica_configured() or request.COOKIES.get(settings.REPLICA_PIN_COOKIE):
+            return view(request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance loaded from the replica still writes to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """Pin a client to the primary for REPLICA_PIN_SECONDS after each successful write"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method in UNSAFE_METHODS and response.status_code < 400 and replica_configured():
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
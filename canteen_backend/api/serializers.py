@@ -1,6 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import CustomUser, MenuItem, Order, OrderItem, ShiftTokenAllocation, TokenDistribution
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, CustomUser, MenuItem, Order, OrderItem, PickupSlot, ShiftTokenAllocation,
+    TokenDistribution, summarize_lines
+)
+from .hashing import hash_password
+from .sites import request_site_id
+from .sparse import SparseFieldsMixin
+
+
+def collapsed_menu_item():
+    return serializers.PrimaryKeyRelatedField(read_only=True)
+
 
 class CustomUserCreateSerializer(serializers.ModelSerializer):
     role = serializers.ChoiceField(choices=CustomUser.ROLE_CHOICES)
@@ -12,19 +23,21 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         password = validated_data.pop('user_id')
         user = CustomUser(**validated_data)
-        user.set_password(password)
+        user.password = hash_password(password)
         user.save()
         return user
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tokens = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
-        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'role', 'work_shift', 'user_id', 'tokens']
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'role', 'work_shift', 'user_id', 'site', 'tokens']
+        read_only_fields = ['site']
         extra_kwargs = {
             'tokens': {'read_only': True}
         }
+        sparse_sources = {'tokens': ['role', 'monthly_tokens', 'last_token_reset']}
 
     def get_tokens(self, obj):
         # Don't return tokens for admin and staff users
@@ -50,28 +63,37 @@ class LoginSerializer(serializers.Serializer):
             return attrs
         raise serializers.ValidationError('Must include username and password')
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = MenuItem
         fields = '__all__'
+        read_only_fields = ['site', 'sold_out']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     menu_item = MenuItemSerializer(read_only=True)
     menu_item_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = OrderItem
         fields = ['id', 'menu_item', 'menu_item_id', 'quantity', 'tokens_per_item']
+        # Collapsed to the menu item's id unless expanded
+        expandable = {'menu_item': collapsed_menu_item}
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     order_items = OrderItemSerializer(many=True, read_only=True)
     items = serializers.ListField(child=serializers.DictField(), write_only=True, required=False)
     user_details = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'user_details', 'status', 'total_tokens', 'created_at', 'updated_at', 'order_items', 'items']
-        read_only_fields = ['user', 'total_tokens']
+        fields = [
+            'id', 'user', 'user_details', 'site', 'pickup_slot', 'status', 'total_tokens', 'item_count', 'items_summary',
+            'created_at', 'updated_at', 'order_items', 'items'
+        ]
+        read_only_fields = ['user', 'site', 'pickup_slot', 'total_tokens', 'item_count', 'items_summary']
+        # Left out unless expanded; 'user' and 'items_summary' carry the short form
+        expandable = {'user_details': None, 'order_items': None}
+        sparse_sources = {'user_details': ['user__username', 'user__first_name', 'user__last_name', 'user__user_id']}
 
     def get_user_details(self, obj):
         return {
@@ -85,33 +107,85 @@ class OrderSerializer(serializers.ModelSerializer):
         items_data = validated_data.pop('items', [])
         user = self.context['request'].user
 
-        order = Order.objects.create(user=user, **validated_data)
-        total_tokens = 0
+        order = Order.objects.create(user=user, site_id=user.site_id, **validated_data)
+        menu_items = MenuItem.objects.in_bulk([int(item['menu_item_id']) for item in items_data])
 
+        order_items = []
         for item_data in items_data:
-            menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
-            quantity = item_data['quantity']
-            tokens_per_item = menu_item.price
-
-            OrderItem.objects.create(
+            menu_item = menu_items[int(item_data['menu_item_id'])]
+            order_items.append(OrderItem(
                 order=order,
                 menu_item=menu_item,
-                quantity=quantity,
-                tokens_per_item=tokens_per_item
-            )
-            total_tokens += tokens_per_item * quantity
+                quantity=int(item_data['quantity']),
+                tokens_per_item=menu_item.price
+            ))
+        OrderItem.objects.bulk_create(order_items)
 
-        order.total_tokens = total_tokens
-        order.save()
+        order.total_tokens, order.item_count, order.items_summary = summarize_lines(
+            (item.menu_item.name, item.quantity, item.tokens_per_item) for item in order_items
+        )
+        order.save(update_fields=['total_tokens', 'item_count', 'items_summary', 'updated_at'])
 
         return order
 
 
+class ArchivedOrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    menu_item = MenuItemSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'menu_item', 'quantity', 'tokens_per_item']
+        expandable = {'menu_item': collapsed_menu_item}
+
+class ArchivedOrderSerializer(OrderSerializer):
+    """Read-only: same shape as OrderSerializer for orders moved to the archive"""
+    order_items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    items = None
+
+    class Meta(OrderSerializer.Meta):
+        model = ArchivedOrder
+        fields = [
+            'id', 'user', 'user_details', 'site', 'pickup_slot', 'status', 'total_tokens', 'item_count',
+            'items_summary', 'created_at', 'updated_at', 'order_items'
+        ]
+        read_only_fields = fields
+
+
+class PickupSlotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PickupSlot
+        fields = ['id', 'site', 'starts_at', 'ends_at', 'capacity', 'reserved']
+        read_only_fields = ['site', 'reserved']
+
+    def validate(self, attrs):
+        starts_at = attrs.get('starts_at', getattr(self.instance, 'starts_at', None))
+        ends_at = attrs.get('ends_at', getattr(self.instance, 'ends_at', None))
+        if starts_at and ends_at and ends_at <= starts_at:
+            raise serializers.ValidationError('Slot must end after it starts')
+        if self.instance and attrs.get('capacity', self.instance.capacity) < self.instance.reserved:
+            raise serializers.ValidationError('Capacity cannot be lower than the places already reserved')
+        return attrs
+
 
 class ShiftTokenAllocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShiftTokenAllocation
-        fields = ['id', 'shift', 'tokens_per_user', 'allocation_month']
+        fields = ['id', 'site', 'shift', 'tokens_per_user', 'allocation_month']
+        read_only_fields = ['site']
+
+    def validate(self, attrs):
+        # 'site' is read-only, so DRF skips the model's unique constraints; check them for the requester's site
+        shift = attrs.get('shift', getattr(self.instance, 'shift', None))
+        month = attrs.get('allocation_month', getattr(self.instance, 'allocation_month', None))
+        if shift and month:
+            duplicates = ShiftTokenAllocation.objects.filter(
+                site_id=request_site_id(self.context['request']), shift=shift, allocation_month=month.replace(day=1)
+            )
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError('This shift already has an allocation for that month.')
+        return attrs
 
 
 class TokenDistributionSerializer(serializers.ModelSerializer):
@@ -121,4 +195,16 @@ class TokenDistributionSerializer(serializers.ModelSerializer):
         model = TokenDistribution
         fields = ['id', 'user', 'user_username', 'tokens_allocated', 'allocation_month']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Admins may only hand tokens to users of their own site
+        request = self.context.get('request')
+        if request is not None:
+            self.fields['user'].queryset = CustomUser.objects.filter(site_id=request_site_id(request))
+
+    def validate_user(self, user):
+        if user.site_id != request_site_id(self.context['request']):
+            raise serializers.ValidationError('User belongs to another site.')
+        return user
+
 
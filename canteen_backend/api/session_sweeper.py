@@ -0,0 +1,77 @@
+"""
+Incremental removal of expired rows from ``django_session``.
+
+Each batch selects at most ``batch_size`` expired keys through the
+``expire_date`` index and deletes them in its own short transaction, so
+the sweep never holds a long lock on the session table.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DB_SESSION_ENGINES = ('django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db')
+
+
+def sweep_expired_sessions(batch_size=1000, max_batches=None, pause=0.0):
+    """Delete expired sessions batch by batch; returns (rows removed, seconds taken)"""
+    started = time.monotonic()
+    now = timezone.now()
+    removed = batches = 0
+    while max_batches is None or batches < max_batches:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        removed += Session.objects.filter(session_key__in=keys).delete()[0]
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return removed, time.monotonic() - started
+
+
+class SessionSweeper(threading.Thread):
+    """Daemon thread running sweep_expired_sessions every SESSION_SWEEP_INTERVAL seconds"""
+
+    def __init__(self, interval, batch_size, max_batches):
+        super().__init__(name='session-sweeper', daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                removed, elapsed = sweep_expired_sessions(self.batch_size, self.max_batches)
+            except DatabaseError:
+                logger.exception('Session sweep failed')
+            else:
+                if removed:
+                    logger.info('Removed %d expired sessions in %.2fs', removed, elapsed)
+            finally:
+                close_old_connections()
+
+
+_sweeper = None
+
+
+def start_session_sweeper():
+    """Start this process's sweeper thread; called from the WSGI/ASGI entrypoints only"""
+    global _sweeper
+    if _sweeper is not None or settings.SESSION_SWEEP_INTERVAL <= 0:
+        return
+    if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+        return
+    _sweeper = SessionSweeper(
+        settings.SESSION_SWEEP_INTERVAL, settings.SESSION_SWEEP_BATCH_SIZE, settings.SESSION_SWEEP_MAX_BATCHES
+    )
+    _sweeper.start()
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent when menu availability or stock counters change through queryset
+# updates, which bypass post_save. Receivers get the affected ``item_ids``.
+menu_changed = Signal()
+
+# Sent when token balances are set in bulk (allocation, monthly refresh).
+# Receivers get the affected ``site_ids`` (None for all sites).
+tokens_changed = Signal()
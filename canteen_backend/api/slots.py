@@ -0,0 +1,83 @@
+"""
+Pickup slots: capacity-based admission for order placement.
+
+Each order may claim one place in a PickupSlot. The claim is a single
+conditional UPDATE (``reserved < capacity``), so concurrent orders can
+never overfill a slot and no row is locked for longer than that
+statement. Declining an order gives its place back.
+
+The menu can advertise remaining capacity. Those numbers come from a
+per-process snapshot refreshed every PICKUP_SLOT_SNAPSHOT_TTL seconds,
+so a burst of menu reads at a shift break costs one slot query per
+process rather than one per request. The snapshot is only advisory; the
+conditional UPDATE at placement is what enforces capacity.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PickupSlot
+from .utils import day_bounds
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def reserve_slot(slot_id, site_id):
+    """Claim one place in a slot. Must run inside the order transaction."""
+    claimed = PickupSlot.objects.filter(
+        pk=slot_id, site_id=site_id, ends_at__gt=timezone.now(), reserved__lt=F('capacity')
+    ).update(reserved=F('reserved') + 1)
+    if not claimed:
+        if PickupSlot.objects.filter(pk=slot_id, site_id=site_id).exists():
+            raise SlotUnavailable('Pickup slot is full or has already closed')
+        raise SlotUnavailable(f'Pickup slot with id {slot_id} does not exist')
+    transaction.on_commit(lambda: _adjust_snapshot(site_id, slot_id, -1))
+
+
+def release_slot(order):
+    """Give back the place held by an order (e.g. when it is declined)"""
+    if order.pickup_slot_id is None:
+        return
+    site_id, slot_id = order.site_id, order.pickup_slot_id
+    PickupSlot.objects.filter(pk=slot_id, reserved__gt=0).update(reserved=F('reserved') - 1)
+    transaction.on_commit(lambda: _adjust_snapshot(site_id, slot_id, 1))
+
+
+# site_id -> (expires at, rows) for this process
+_snapshots = {}
+
+
+def slot_snapshot(site_id):
+    """Today's open slots for a site with their remaining capacity, at most TTL seconds old"""
+    now = time.monotonic()
+    cached = _snapshots.get(site_id)
+    if cached is None or cached[0] <= now:
+        start, end = day_bounds()
+        rows = [
+            {'id': pk, 'starts_at': starts_at, 'ends_at': ends_at, 'remaining': capacity - reserved}
+            for pk, starts_at, ends_at, capacity, reserved in PickupSlot.objects.filter(
+                site_id=site_id, starts_at__lt=end, ends_at__gt=timezone.now()
+            ).order_by('starts_at').values_list('id', 'starts_at', 'ends_at', 'capacity', 'reserved')
+        ]
+        cached = _snapshots[site_id] = (now + settings.PICKUP_SLOT_SNAPSHOT_TTL, rows)
+
+    current = timezone.now()
+    return [
+        {**row, 'starts_at': timezone.localtime(row['starts_at']), 'ends_at': timezone.localtime(row['ends_at'])}
+        for row in cached[1] if row['ends_at'] > current
+    ]
+
+
+def _adjust_snapshot(site_id, slot_id, delta):
+    # Keep this process's own claims visible before the snapshot expires
+    cached = _snapshots.get(site_id)
+    if cached is None:
+        return
+    for row in cached[1]:
+        if row['id'] == slot_id:
+            row['remaining'] = max(row['remaining'] + delta, 0)
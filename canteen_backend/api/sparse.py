@@ -0,0 +1,211 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?expand=`` on read responses.
+
+``?fields=id,status,order_items.quantity`` keeps only the listed fields.
+Dotted names reach into nested objects, and naming an object alone keeps
+all of its fields. The nested objects a serializer lists in
+``Meta.expandable`` are expansions. ``?expand=order_items`` keeps only the
+listed expansions; without ``?expand=`` every expansion is included, as
+before. An unexpanded relation either becomes its id (an order item's
+``menu_item``) or is left out (``user_details``, ``order_items``).
+
+The data is pruned as well as the output. ``prune_queryset`` limits a
+queryset to the columns the remaining fields read (``only()``) and
+prefetches only the relations still shown. The fast serializers fetch
+just the requested columns. Unknown names are rejected with 400
+(check_field_spec), and write requests always use the full serializer.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class FieldSpec:
+    """Which fields and expansions to render at one level of nesting (None = all)"""
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        """The request's ?fields=/?expand=, or None when it asks for the full payload"""
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        fields, expand = params.get('fields'), params.get('expand')
+        if fields is None and expand is None:
+            return None
+        tree = None
+        if fields:
+            tree = {}
+            for path in fields.split(','):
+                node = tree
+                for part in path.strip().split('.'):
+                    if part:
+                        node = node.setdefault(part, {})
+        expansions = None
+        if expand is not None:
+            expansions = {name.strip() for name in expand.split(',') if name.strip()}
+        return cls(tree, expansions)
+
+    def cache_key(self):
+        return (
+            repr(sorted(self.fields.items())) if self.fields is not None else None,
+            sorted(self.expand) if self.expand is not None else None,
+        )
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+    def child(self, name):
+        subtree = self.fields.get(name) if self.fields is not None else None
+        expand = None
+        if self.expand is not None:
+            prefix = f'{name}.'
+            expand = {path[len(prefix):] for path in self.expand if path.startswith(prefix)}
+        return FieldSpec(subtree or None, expand)
+
+
+@lru_cache(maxsize=None)
+def _shape(serializer_class):
+    """{name: nested sparse serializer class or None} for the fields ``serializer_class`` renders"""
+    shape = {}
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        shape[name] = type(nested) if isinstance(nested, SparseFieldsMixin) else None
+    return shape
+
+
+def unknown_names(spec, serializer_class, prefix=''):
+    """(fields, expansions) named in ``spec`` that ``serializer_class`` does not render, as dotted paths"""
+    shape = _shape(serializer_class)
+    expandable = getattr(serializer_class.Meta, 'expandable', {})
+    fields, expand = [], []
+    for name, subtree in (spec.fields or {}).items():
+        if name not in shape or (subtree and shape[name] is None):
+            fields.append(prefix + name)
+        elif subtree:
+            fields.extend(unknown_names(FieldSpec(subtree), shape[name], f'{prefix}{name}.')[0])
+    for path in sorted(spec.expand or ()):
+        name, _, rest = path.partition('.')
+        if not rest:
+            if name not in expandable:
+                expand.append(prefix + path)
+        elif shape.get(name) is None:
+            expand.append(prefix + path)
+        else:
+            expand.extend(unknown_names(FieldSpec(None, {rest}), shape[name], f'{prefix}{name}.')[1])
+    return fields, expand
+
+
+def check_field_spec(spec, serializer_class):
+    """Raise ValidationError (400) when ``spec`` names fields or expansions ``serializer_class`` lacks"""
+    if spec is None:
+        return
+    fields, expand = unknown_names(spec, serializer_class)
+    errors = {}
+    if fields:
+        errors['fields'] = [f'Unknown field: {name}' for name in fields]
+    if expand:
+        errors['expand'] = [f'Unknown expansion: {name}' for name in expand]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin taking a ``field_spec`` (FieldSpec) and dropping the
+    fields it leaves out. ``Meta.expandable`` maps expansion names to a
+    factory for their collapsed field, or None to drop them when collapsed.
+    ``Meta.sparse_sources`` lists the columns a method field reads.
+    """
+
+    def __init__(self, *args, field_spec=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if field_spec is not None:
+            check_field_spec(field_spec, type(self))
+            self.apply_field_spec(field_spec)
+
+    def apply_field_spec(self, spec):
+        expandable = getattr(self.Meta, 'expandable', {})
+        for name in list(self.fields):
+            field = self.fields[name]
+            if field.write_only:
+                continue
+            if not spec.includes(name):
+                del self.fields[name]
+            elif name in expandable and not spec.expands(name):
+                collapsed = expandable[name]
+                if collapsed is None:
+                    del self.fields[name]
+                else:
+                    self.fields[name] = collapsed()
+            else:
+                nested = field.child if isinstance(field, serializers.ListSerializer) else field
+                if isinstance(nested, SparseFieldsMixin):
+                    nested.apply_field_spec(spec.child(name))
+
+
+def _plan(serializer, model):
+    """
+    (columns, select_related, prefetches) read by a serializer's fields on
+    ``model``; columns is None when some field cannot be traced to a column.
+    """
+    columns, select, prefetch = {model._meta.pk.name}, [], []
+    sources = getattr(serializer.Meta, 'sparse_sources', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in sources:
+            for path in sources[name]:
+                columns.add(path)
+                if '__' in path:
+                    select.append(path.split('__')[0])
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            columns = None
+            continue
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not isinstance(nested, serializers.ModelSerializer):
+            if columns is not None:
+                columns.add(field.source)
+            continue
+
+        sub_columns, sub_select, sub_prefetch = _plan(nested, model_field.related_model)
+        if model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+            select.append(field.source)
+            select.extend(f'{field.source}__{path}' for path in sub_select)
+            if columns is not None and sub_columns is not None:
+                columns.update(f'{field.source}__{column}' for column in sub_columns)
+            elif columns is not None:
+                columns.add(field.source)
+        else:
+            # Reverse FK: prefetch the children, keeping the column that links them back
+            related = model_field.related_model.objects.select_related(*sub_select).prefetch_related(*sub_prefetch)
+            if sub_columns is not None:
+                related = related.only(*sub_columns, model_field.field.name)
+            prefetch.append(Prefetch(field.source, queryset=related))
+    return columns, select, prefetch
+
+
+def prune_queryset(queryset, serializer):
+    """Limit ``queryset`` to what a (field-spec pruned) serializer renders"""
+    columns, select, prefetch = _plan(serializer, queryset.model)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if columns is not None:
+        queryset = queryset.only(*columns)
+    return queryset
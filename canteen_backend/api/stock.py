@@ -0,0 +1,104 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import MenuItem
+from .signals import menu_changed
+
+
+class OutOfStock(Exception):
+    def __init__(self, menu_item):
+        self.menu_item = menu_item
+        super().__init__(f'{menu_item.name} is out of stock')
+
+
+# Day of the last stock rollover done by this process
+_last_rollover = None
+
+
+def rollover_stock(force=False):
+    """Refill daily stock for items whose counters belong to an earlier day"""
+    global _last_rollover
+    today = timezone.localdate()
+    if _last_rollover == today and not force:
+        return 0
+
+    # Items that sold out yesterday become available again; items that
+    # were switched off by hand stay off.
+    updated = (
+        MenuItem.objects.filter(daily_stock__isnull=False)
+        .exclude(stock_date=today)
+        .update(
+            stock_remaining=F('daily_stock'),
+            stock_date=today,
+            is_available=Case(
+                When(sold_out=True, then=Value(True)),
+                default=F('is_available'),
+            ),
+            sold_out=False,
+        )
+    )
+    _last_rollover = today
+    if updated:
+        menu_changed.send(sender=MenuItem, item_ids=None)
+    return updated
+
+
+async def arollover_stock():
+    """rollover_stock for async views; only leaves the event loop on the first call of a day"""
+    if _last_rollover == timezone.localdate():
+        return 0
+    return await sync_to_async(rollover_stock)()
+
+
+def reserve_stock(menu_items, quantities):
+    """
+    Decrement stock for an order. Must run inside the order transaction.
+
+    ``menu_items`` maps id -> MenuItem and ``quantities`` maps id -> quantity.
+    Each stocked item gets one conditional UPDATE, so concurrent orders can
+    never take the counter below zero. Raises OutOfStock on the first item
+    that cannot be covered; the caller's transaction rolls back the rest.
+    """
+    stocked = sorted(pk for pk in quantities if menu_items[pk].daily_stock is not None)
+    if not stocked:
+        return
+
+    today = timezone.localdate()
+    rollover_stock(force=any(menu_items[pk].stock_date != today for pk in stocked))
+    # Lock rows in id order so concurrent orders cannot deadlock
+    for pk in stocked:
+        qty = quantities[pk]
+        updated = MenuItem.objects.filter(
+            pk=pk, stock_remaining__gte=qty
+        ).update(stock_remaining=F('stock_remaining') - qty)
+        if not updated:
+            raise OutOfStock(menu_items[pk])
+
+    MenuItem.objects.filter(
+        pk__in=stocked, stock_remaining=0, is_available=True
+    ).update(is_available=False, sold_out=True)
+    menu_changed.send(sender=MenuItem, item_ids=stocked)
+
+
+def release_stock(order):
+    """Return the stock held by an order that will not be served"""
+    today = timezone.localdate()
+    if timezone.localtime(order.created_at).date() != today:
+        return
+
+    released = []
+    for order_item in order.order_items.all():
+        updated = MenuItem.objects.filter(
+            pk=order_item.menu_item_id, daily_stock__isnull=False, stock_date=today
+        ).update(
+            stock_remaining=F('stock_remaining') + order_item.quantity,
+            is_available=Case(
+                When(sold_out=True, then=Value(True)),
+                default=F('is_available'),
+            ),
+            sold_out=False,
+        )
+        if updated:
+            released.append(order_item.menu_item_id)
+    if released:
+        menu_changed.send(sender=MenuItem, item_ids=released)
@@ -0,0 +1,97 @@
+"""
+Delta sync for the staff order queue.
+
+``GET /api/staff/orders/?since=<cursor>`` returns only the orders created or
+changed (by Order.updated_at) since the cursor, plus the ids of orders
+deleted or archived since then. Those ids come from OrderTombstone rows
+written by the post_delete receiver below, or in bulk by archive.py. Every staff order list response
+carries the next cursor in the X-Sync-Cursor header.
+
+A cursor is the server time at which the previous response was built. An
+order saved by a transaction that committed just after that moment can
+carry an earlier timestamp, so each delta also re-sends the last
+DELTA_SYNC_OVERLAP seconds before the cursor; clients upsert by id, so
+repeats are harmless. Tombstones are kept for ORDER_TOMBSTONE_DAYS
+(archive_orders prunes them). An older cursor is answered with 410, and
+the client reloads the full list.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, OrderTombstone
+
+SYNC_CURSOR_HEADER = 'X-Sync-Cursor'
+
+_bulk = threading.local()
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def make_cursor(moment=None):
+    # UTC with a Z suffix, so the cursor survives query strings without escaping "+"
+    moment = (moment or timezone.now()).astimezone(dt_timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def parse_cursor(value):
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None or timezone.is_naive(moment):
+        raise InvalidCursor(f'Invalid sync cursor: {value}')
+    if moment < timezone.now() - timedelta(days=settings.ORDER_TOMBSTONE_DAYS):
+        raise CursorExpired()
+    return moment
+
+
+def order_changes(queryset, site_id, since):
+    """(orders changed since ``since``, ids of orders deleted since then)"""
+    start = since - timedelta(seconds=settings.DELTA_SYNC_OVERLAP)
+    changed = queryset.filter(updated_at__gte=start).order_by('updated_at', 'pk')
+    deleted = list(
+        OrderTombstone.objects.filter(site_id=site_id, deleted_at__gte=start)
+        .order_by('deleted_at').values_list('order_id', flat=True)
+    )
+    return changed, deleted
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than the retention window; returns how many went"""
+    cutoff = timezone.now() - timedelta(days=settings.ORDER_TOMBSTONE_DAYS if days is None else days)
+    return OrderTombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+def record_tombstones(orders):
+    """One bulk insert of tombstones for (order id, site id) pairs"""
+    OrderTombstone.objects.bulk_create([OrderTombstone(order_id=pk, site_id=site_id) for pk, site_id in orders])
+
+
+@contextmanager
+def tombstones_recorded():
+    """Orders deleted inside the block get no tombstone from the receiver; the caller records them in bulk"""
+    _bulk.recorded = True
+    try:
+        yield
+    finally:
+        _bulk.recorded = False
+
+
+@receiver(post_delete, sender=Order, dispatch_uid='order_tombstone')
+def _record_tombstone(sender, instance, **kwargs):
+    if getattr(_bulk, 'recorded', False):
+        return
+    OrderTombstone.objects.create(order_id=instance.pk, site_id=instance.site_id)
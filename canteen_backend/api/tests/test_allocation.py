@@ -0,0 +1,38 @@
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.allocation import apply_allocations
+from api.models import CustomUser, ShiftTokenAllocation, TokenDistribution
+
+
+def first_of_next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+class FutureAllocationTests(TestCase):
+    def setUp(self):
+        self.this_month = timezone.localdate().replace(day=1)
+        self.next_month = first_of_next_month(self.this_month)
+        self.user = CustomUser.objects.create(username='emp', role='employee', work_shift='day')
+        ShiftTokenAllocation.objects.create(shift='day', tokens_per_user=50, allocation_month=self.this_month)
+
+    def test_next_months_allocation_waits_for_the_rollover(self):
+        ShiftTokenAllocation.objects.create(shift='day', tokens_per_user=60, allocation_month=self.next_month)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.current_tokens(), 50)
+        self.assertFalse(TokenDistribution.objects.filter(allocation_month=self.next_month).exists())
+
+        rollover = timezone.make_aware(datetime.combine(self.next_month, time(0, 5)))
+        with mock.patch('django.utils.timezone.now', return_value=rollover):
+            self.assertEqual(apply_allocations(self.next_month), {(None, 'day'): 1})
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.current_tokens(), 60)
+
+    def test_applying_a_future_month_does_nothing(self):
+        ShiftTokenAllocation.objects.create(shift='day', tokens_per_user=60, allocation_month=self.next_month)
+        self.assertEqual(apply_allocations(self.next_month), {})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.monthly_tokens, self.user.last_token_reset), (50, self.this_month))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api import analytics
+from api.models import CustomUser, MenuItem, Order, OrderItem
+
+
+class BucketedTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username='emp', role='employee', work_shift='mid')
+        self.first = MenuItem.objects.create(name='Soup', description='Soup', price=5)
+        self.second = MenuItem.objects.create(name='Soup', description='Another soup', price=4)
+        now = timezone.now()
+        for days_ago, item, quantity in ((0, self.first, 2), (3, self.second, 1), (3, self.first, 1)):
+            order = Order.objects.create(user=user, status='completed', total_tokens=item.price * quantity,
+                                         item_count=quantity)
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=days_ago))
+            OrderItem.objects.create(order=order, menu_item=item, quantity=quantity, tokens_per_item=item.price)
+        self.start, self.end = timezone.localdate() - timedelta(days=6), timezone.localdate()
+
+    def test_menu_items_are_split_by_id_and_labelled_by_name(self):
+        result = analytics.bucketed(None, self.start, self.end, 'day', metric='items', dimension='menu_item')
+        self.assertEqual(
+            [(series['key'], series['label'], sum(series['values'])) for series in result['series']],
+            [(self.first.pk, 'Soup', 3), (self.second.pk, 'Soup', 1)],
+        )
+
+    def test_gap_fill_is_the_same_without_numpy(self):
+        for dimension in (None, 'shift', 'menu_item'):
+            with_numpy = analytics.bucketed(None, self.start, self.end, 'day', dimension=dimension)
+            with mock.patch.object(analytics, 'np', None):
+                without_numpy = analytics.bucketed(None, self.start, self.end, 'day', dimension=dimension)
+            self.assertEqual(with_numpy, without_numpy)
+            self.assertEqual(len(with_numpy['series'][0]['values']), 7)
+        self.assertEqual(with_numpy['series'][0]['values'][-1], 10)
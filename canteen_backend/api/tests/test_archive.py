@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.archive import archive_batch, archive_cutoff
+from api.models import ArchivedOrder, CustomUser, MenuItem, Order, OrderItem, OrderTombstone
+
+
+class ArchiveBatchTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username='emp')
+        item = MenuItem.objects.create(name='Soup', description='Soup', price=5)
+        self.orders = [
+            Order.objects.create(user=user, status='completed', total_tokens=5, item_count=1) for _ in range(3)
+        ]
+        Order.objects.update(created_at=timezone.now() - timedelta(days=100))
+        for order in self.orders:
+            OrderItem.objects.create(order=order, menu_item=item, quantity=1, tokens_per_item=5)
+
+    def test_archived_orders_get_tombstones_in_one_insert(self):
+        ids = [order.pk for order in self.orders]
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(archive_batch(ids, archive_cutoff(90)), (3, 3))
+        inserts = [query for query in context.captured_queries
+                   if query['sql'].startswith(f'INSERT INTO "{OrderTombstone._meta.db_table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(sorted(OrderTombstone.objects.values_list('order_id', flat=True)), ids)
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_orders_reopened_since_they_were_picked_stay_live(self):
+        ids = [order.pk for order in self.orders]
+        Order.objects.filter(pk=ids[0]).update(status='approved')
+        Order.objects.filter(pk=ids[1]).update(created_at=timezone.now())
+        self.assertEqual(archive_batch(ids, archive_cutoff(90)), (1, 1))
+        self.assertEqual(list(ArchivedOrder.objects.values_list('id', flat=True)), [ids[2]])
+        self.assertEqual(sorted(Order.objects.values_list('id', flat=True)), ids[:2])
+        self.assertEqual(OrderItem.objects.filter(order_id__in=ids[:2]).count(), 2)
+
+    def test_deleting_an_order_still_records_its_tombstone(self):
+        order_id = self.orders[0].pk
+        self.orders[0].delete()
+        self.assertEqual(list(OrderTombstone.objects.values_list('order_id', flat=True)), [order_id])
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from api.models import CustomUser, MenuItem, Order, OrderItem, PickupSlot
+
+
+@override_settings(QUERY_CACHE_ENABLED=False)
+class AsyncPayloadTests(TestCase):
+    """Each async endpoint answers with its DRF counterpart's payload"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create(username='emp', role='employee', first_name='Emma', monthly_tokens=40)
+        cls.staff = CustomUser.objects.create(username='staff', role='staff')
+        soup = MenuItem.objects.create(name='Soup', description='Hot', price=5, daily_stock=10,
+                                       stock_remaining=10, stock_date=timezone.localdate())
+        MenuItem.objects.create(name='Bread', description='Fresh', price=2)
+        now = timezone.now()
+        PickupSlot.objects.create(starts_at=now, ends_at=now + timedelta(hours=1), capacity=5)
+        for days_ago, order_status in [(0, 'pending'), (0, 'approved'), (2, 'completed'), (3, 'declined')]:
+            order = Order.objects.create(user=cls.employee, status=order_status, total_tokens=10, item_count=2,
+                                         items_summary='Soup x 2')
+            OrderItem.objects.create(order=order, menu_item=soup, quantity=2, tokens_per_item=5)
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=days_ago, seconds=order.pk))
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def assertSamePayload(self, client, sync_url, async_url):
+        sync_response = client.get(sync_url)
+        async_response = client.get(async_url)
+        self.assertEqual(sync_response.status_code, 200)
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response.json()
+
+    def test_profile(self):
+        client = self.client_for(self.employee)
+        for query in ('', '?fields=id,username,role'):
+            with self.subTest(query=query):
+                self.assertSamePayload(client, f'/api/profile/{query}', f'/api/async/profile/{query}')
+
+    def test_menu(self):
+        client = self.client_for(self.employee)
+        for query in ('', '?slots=1', '?fields=id,name,price'):
+            with self.subTest(query=query):
+                self.assertSamePayload(client, f'/api/employee/menu/{query}', f'/api/async/employee/menu/{query}')
+
+    def test_order_history(self):
+        client = self.client_for(self.employee)
+        for query in ('', '?expand=order_items'):
+            with self.subTest(query=query):
+                payload = self.assertSamePayload(
+                    client, f'/api/employee/orders/{query}', f'/api/async/employee/orders/{query}'
+                )
+                self.assertEqual((len(payload['today_orders']), len(payload['past_orders'])), (2, 2))
+
+    def test_kitchen_queue(self):
+        client = self.client_for(self.staff)
+        queue = client.get('/api/async/staff/queue/').json()
+        # The DRF list is newest first and holds every order; the queue is today's open ones, oldest first
+        listed = [order for order in client.get('/api/staff/orders/').json()
+                  if order['status'] in ('pending', 'approved')]
+        self.assertEqual(queue, listed[::-1])
+        self.assertEqual(len(queue), 2)
+
+    def test_role_permissions_match(self):
+        client = self.client_for(self.staff)
+        self.assertEqual(client.get('/api/employee/menu/').status_code, 403)
+        self.assertEqual(client.get('/api/async/employee/menu/').status_code, 403)
+        anonymous = Client()
+        self.assertEqual(anonymous.get('/api/async/profile/').status_code, 403)
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.models import Session
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import hashing
+from api.models import CustomUser
+
+
+class RoleClaimRevocationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='emp', password='secret-pass', role='employee')
+        self.client = self.login()
+
+    def login(self):
+        client = APIClient()
+        response = client.post('/api/login/', {'username': 'emp', 'password': 'secret-pass'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/api/employee/menu/').status_code, 200)
+        return client
+
+    def save_user(self, **changes):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        for name, value in changes.items():
+            setattr(user, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+    def assertRefused(self):
+        self.assertIn(self.client.get('/api/employee/menu/').status_code, (401, 403))
+
+    def test_role_change_outdates_claims(self):
+        self.save_user(role='staff')
+        self.assertRefused()
+
+    def test_deactivation_outdates_claims(self):
+        self.save_user(is_active=False)
+        self.assertRefused()
+
+    def test_password_change_outdates_claims(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.set_password('another-pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertRefused()
+
+    def test_other_changes_keep_claims(self):
+        self.save_user(first_name='Emma')
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.get(pk=self.user.pk).save(update_fields=['last_login'])
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).claim_version, 0)
+        with self.assertNumQueries(2):  # session and menu; no user query
+            self.assertEqual(self.client.get('/api/employee/menu/').status_code, 200)
+
+    def test_rehash_on_login_keeps_other_sessions(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            password=make_password('secret-pass', hasher='pbkdf2_sha1')
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.login()
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertFalse(user.password.startswith('pbkdf2_sha1$'))
+        self.assertEqual(user.claim_version, 0)
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertEqual(self.client.get('/api/employee/menu/').status_code, 200)
+        with override_settings(ROLE_CLAIM_TTL=-1):  # the full session lookup keeps it too
+            self.assertEqual(self.client.get('/api/employee/menu/').status_code, 200)
+
+
+class AsyncLoginTests(TestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(username='emp', password='secret-pass', role='employee', first_name='Emma')
+
+    async def test_same_payload_as_login_view(self):
+        credentials = {'username': 'emp', 'password': 'secret-pass'}
+        expected = (await sync_to_async(self.client.post)(
+            '/api/login/', credentials, content_type='application/json'
+        )).json()
+        response = await self.async_client.post('/api/async/login/', credentials, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+        # The session it starts carries a role claim the async endpoints accept
+        self.assertEqual((await self.async_client.get('/api/async/employee/menu/')).status_code, 200)
+
+    async def test_wrong_password_is_refused(self):
+        response = await self.async_client.post(
+            '/api/async/login/', {'username': 'emp', 'password': 'wrong'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.async_client.get('/api/async/profile/')).status_code, 403)
+
+    async def test_rehash_goes_through_the_async_pool(self):
+        await CustomUser.objects.filter(username='emp').aupdate(
+            password=make_password('secret-pass', hasher='pbkdf2_sha1')
+        )
+        with mock.patch('api.hashing.acheck_password', wraps=hashing.acheck_password) as acheck_password:
+            response = await self.async_client.post(
+                '/api/async/login/', {'username': 'emp', 'password': 'secret-pass'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        acheck_password.assert_awaited_once()
+        user = await CustomUser.objects.aget(username='emp')
+        self.assertFalse(user.password.startswith('pbkdf2_sha1$'))
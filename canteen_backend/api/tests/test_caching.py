@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, MenuItem, Order, OrderItem
+
+
+# One test process sees every invalidation, so LocMemCache can stand in for a shared backend
+@override_settings(QUERY_CACHE_ENABLED=True, QUERY_CACHE_SHARED=True)
+class OrderItemDeletionTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='emp', role='employee')
+        self.soup = MenuItem.objects.create(name='Soup', description='Soup', price=5)
+        tea = MenuItem.objects.create(name='Tea', description='Tea', price=2)
+        for _ in range(5):
+            order = Order.objects.create(user=self.user, total_tokens=7, item_count=2)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, menu_item=self.soup, quantity=1, tokens_per_item=5),
+                OrderItem(order=order, menu_item=tea, quantity=1, tokens_per_item=2),
+            ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def line_count(self):
+        response = self.client.get('/api/employee/orders/?expand=order_items')
+        self.assertEqual(response.status_code, 200)
+        return sum(len(order['order_items']) for order in response.data['today_orders'])
+
+    def test_deleted_lines_leave_order_history_without_per_line_lookups(self):
+        self.assertEqual(self.line_count(), 10)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as context:
+            self.soup.delete()
+        lookups = [query for query in context.captured_queries if query['sql'].startswith('SELECT "api_order"')]
+        self.assertEqual(lookups, [])
+        self.assertEqual(self.line_count(), 5)
+
+
+@override_settings(QUERY_CACHE_ENABLED=True, QUERY_CACHE_SHARED=False)
+class ProcessLocalCacheTests(TestCase):
+    def test_order_history_is_not_cached_per_process(self):
+        user = CustomUser.objects.create(username='emp', role='employee')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/employee/orders/').data['today_orders'], [])
+        # Written without signals, as another worker's write looks to this process
+        Order.objects.bulk_create([Order(user=user, total_tokens=5, item_count=1)])
+        self.assertEqual(len(client.get('/api/employee/orders/').data['today_orders']), 1)
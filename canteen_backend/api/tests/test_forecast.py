@@ -0,0 +1,63 @@
+from datetime import date, datetime, time, timedelta
+from unittest import skipUnless
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api import forecast
+from api.models import CustomUser, DemandForecast, MenuItem, Order, OrderItem
+
+TODAY = date(2024, 3, 18)  # a Monday; two weeks of history start on 2024-03-04
+
+
+@skipUnless(forecast.np is not None, 'Demand forecasting needs NumPy')
+class DemandForecastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        day_worker = CustomUser.objects.create(username='day', role='employee', work_shift='day')
+        night_worker = CustomUser.objects.create(username='night', role='employee', work_shift='night')
+        cls.soup = MenuItem.objects.create(name='Soup', description='Hot', price=5)
+        cls.bread = MenuItem.objects.create(name='Bread', description='Fresh', price=2)
+        for user, item, day, quantity, order_status in [
+            (day_worker, cls.soup, date(2024, 3, 4), 2, 'completed'),
+            (day_worker, cls.soup, date(2024, 3, 11), 4, 'completed'),
+            # Declined orders are not demand
+            (day_worker, cls.soup, date(2024, 3, 11), 10, 'declined'),
+            (night_worker, cls.bread, date(2024, 3, 12), 1, 'completed'),
+            # Outside the two-week window
+            (day_worker, cls.bread, date(2024, 3, 1), 9, 'completed'),
+        ]:
+            order = Order.objects.create(user=user, status=order_status, total_tokens=0, item_count=quantity)
+            OrderItem.objects.create(order=order, menu_item=item, quantity=quantity, tokens_per_item=0)
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime.combine(day, time(12))))
+
+    def test_weighted_seasonal_forecast(self):
+        self.assertEqual(forecast.compute_forecasts(None, today=TODAY, weeks=2), 2)
+        rows = {
+            (row.menu_item_id, row.shift, row.weekday): row for row in DemandForecast.objects.all()
+        }
+        self.assertEqual(set(rows), {(self.soup.pk, 'day', 0), (self.bread.pk, 'night', 1)})
+
+        soup = rows[self.soup.pk, 'day', 0]
+        # Mondays 2 then 4, the later week weighted twice: 10 / 3; level (4 / 7) / (6 / 14)
+        self.assertEqual((soup.weekday_average, soup.recent_average), (3.33, 0.57))
+        self.assertEqual((soup.forecast, soup.prep_quantity), (4.44, 5))
+
+        bread = rows[self.bread.pk, 'night', 1]
+        self.assertEqual((bread.weekday_average, bread.forecast, bread.prep_quantity), (0.67, 1.33, 2))
+
+    def test_recompute_replaces_the_rows(self):
+        forecast.compute_forecasts(None, today=TODAY, weeks=2)
+        forecast.compute_forecasts(None, today=TODAY + timedelta(weeks=8), weeks=2)
+        self.assertFalse(DemandForecast.objects.exists())
+
+    def test_prep_forecast_for_a_day(self):
+        forecast.compute_forecasts(None, today=TODAY, weeks=2)
+        prep = forecast.prep_forecast(None, TODAY + timedelta(weeks=1))
+        self.assertEqual(prep['items'], [
+            {'menu_item_id': self.soup.pk, 'name': 'Soup', 'prep_quantity': 5, 'forecast': 4.44,
+             'shifts': {'day': 5}},
+        ])
+        self.assertIsNotNone(prep['computed_at'])
+        MenuItem.objects.filter(pk=self.soup.pk).update(is_available=False)
+        self.assertEqual(forecast.prep_forecast(None, TODAY)['items'], [])
@@ -0,0 +1,22 @@
+from django.conf import global_settings, settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.test import SimpleTestCase, TestCase
+
+from api.models import CustomUser
+
+
+class PasswordHasherSettingsTests(SimpleTestCase):
+    def test_chosen_tier_first_and_django_defaults_kept(self):
+        self.assertEqual(
+            settings.PASSWORD_HASHERS[0], settings.PASSWORD_HASHER_TIERS[settings.PASSWORD_HASHER_TIER]
+        )
+        for hasher in [*global_settings.PASSWORD_HASHERS, *settings.PASSWORD_HASHER_TIERS.values()]:
+            self.assertIn(hasher, settings.PASSWORD_HASHERS)
+        self.assertEqual(len(settings.PASSWORD_HASHERS), len(set(settings.PASSWORD_HASHERS)))
+
+
+class DefaultPasswordTests(TestCase):
+    def test_new_user_without_password_gets_username(self):
+        user = CustomUser.objects.create(username='emp')
+        self.assertEqual(identify_hasher(user.password).algorithm, get_hasher().algorithm)
+        self.assertTrue(user.check_password('emp'))
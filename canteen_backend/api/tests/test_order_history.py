@@ -0,0 +1,57 @@
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, Order
+
+
+@override_settings(QUERY_CACHE_ENABLED=False, ORDER_HISTORY_DAYS=30)
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='emp', role='employee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.now = timezone.localtime()
+
+    def order(self, days_ago):
+        order = Order.objects.create(user=self.user, status='completed', total_tokens=5, item_count=1)
+        Order.objects.filter(pk=order.pk).update(created_at=self.now - timedelta(days=days_ago))
+        return order.pk
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def past_ids(self, data):
+        return [order['id'] for order in data['past_orders']]
+
+    def test_past_orders_are_paged_newest_first(self):
+        ids = [self.order(days_ago) for days_ago in range(1, 6)]
+        first = self.get('/api/employee/orders/?page_size=2')
+        self.assertEqual(self.past_ids(first), ids[:2])
+        self.assertIsNone(first['previous'])
+
+        next_url = urlsplit(first['next'])
+        second = self.get(f'{next_url.path}?{next_url.query}')
+        self.assertEqual(self.past_ids(second), ids[2:4])
+        self.assertIsNotNone(second['previous'])
+
+    def test_window_is_bounded_by_order_history_days(self):
+        today = self.order(0)
+        recent = self.order(29)
+        self.order(31)
+        data = self.get('/api/employee/orders/')
+        self.assertEqual([order['id'] for order in data['today_orders']], [today])
+        self.assertEqual(self.past_ids(data), [recent])
+        self.assertIsNone(data['next'])
+
+    def test_month_selects_that_month_only(self):
+        last_month = (self.now.date().replace(day=1) - timedelta(days=1)).replace(day=15)
+        inside = self.order((self.now.date() - last_month).days)
+        self.order((self.now.date() - last_month).days + 31)
+        data = self.get(f"/api/employee/orders/?month={last_month.strftime('%Y-%m')}")
+        self.assertEqual(self.past_ids(data), [inside])
@@ -0,0 +1,199 @@
+"""
+Query-plan and query-budget regression tests.
+
+setUpTestData seeds a site with seed_canteen and ANALYZEs it, so the
+planner (SQLite or PostgreSQL) chooses the way it would on a real
+database. Each plan test EXPLAINs a critical query and fails when none
+of the expected indexes is used or a growing table is read in full.
+Expected indexes are named by model fields and resolved to database
+index names through introspection. The budget test holds each read
+endpoint to a query count that must not grow with the data.
+"""
+import re
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+
+from api import analytics, views
+from api.models import CustomUser, DemandForecast, Order, OrderItem, TokenDistribution
+from api.sync import make_cursor, order_changes
+
+# Tables that grow with usage; a full scan of any of them fails the check
+LARGE_TABLES = [Order, OrderItem, TokenDistribution, CustomUser]
+
+# Most queries each endpoint may run, whatever the data size (session lookup included)
+QUERY_BUDGETS = {
+    '/api/staff/orders/': 3,
+    '/api/staff/orders/?since={cursor}': 4,
+    '/api/admin/dashboard/stats/': 13,
+    '/api/admin/dashboard/revenue/?period=year': 2,
+    '/api/admin/analytics/?period=year&dimension=menu_item': 2,
+    '/api/admin/token-distributions/?month={month}': 2,
+    # Includes the first request of the day's stock rollover
+    '/api/employee/menu/': 3,
+    '/api/employee/orders/': 5,
+    '/api/profile/': 2,
+    '/api/staff/forecast/': 2,
+}
+
+# Which role each budget is checked as
+BUDGET_ROLES = {
+    '/api/staff/': 'staff', '/api/admin/': 'admin', '/api/employee/': 'employee', '/api/profile/': 'employee',
+}
+
+
+class RawPlan:
+    """An already executed SQL statement, explained the way QuerySet.explain() would"""
+
+    def __init__(self, sql):
+        self.sql = sql
+
+    def explain(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {self.sql}')
+                return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN {self.sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def plan_facts(plan):
+    """(indexes used, tables read in full) in EXPLAIN output from SQLite or PostgreSQL"""
+    if connection.vendor == 'sqlite':
+        indexes = set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', plan))
+        # "SCAN t USING INDEX i" still walks the whole index
+        scans = set(re.findall(r'\bSCAN (\w+)', plan))
+    else:
+        indexes = set(re.findall(r'(?:Index Scan|Index Only Scan) using (\w+)', plan))
+        indexes |= set(re.findall(r'Bitmap Index Scan on (\w+)', plan))
+        scans = set(re.findall(r'Seq Scan on (\w+)', plan))
+    return indexes, scans
+
+
+def index_names(model, fields):
+    """Database names of the indexes covering exactly ``fields`` of ``model``, in order"""
+    columns = [model._meta.get_field(name).column for name in fields]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        name for name, info in constraints.items()
+        if info['columns'] == columns and (info['index'] or info['unique'] or info['primary_key'])
+    }
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN output is parsed for SQLite and PostgreSQL')
+@override_settings(QUERY_CACHE_ENABLED=False)  # cached responses would hide the queries
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_canteen', site='plans', orders=20000, employees=500, guests=50, days=120, seed=1,
+                     stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.users = {
+            role: CustomUser.objects.filter(site__code='plans', role=role).order_by('id').first()
+            for role in ('staff', 'admin', 'employee')
+        }
+
+    def viewset_queryset(self, viewset_class, role, params=None):
+        request = Request(RequestFactory().get('/', params or {}))
+        request.user = self.users[role]
+        view = viewset_class(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+        return view.filter_queryset(view.get_queryset())
+
+    def bucket_plan(self, dimension):
+        """The grouped query analytics.bucketed runs for the dashboards' year view"""
+        start, end, _ = analytics.period_range('year')
+        with CaptureQueriesContext(connection) as context:
+            analytics.bucketed(self.users['admin'].site_id, start, end, 'month', dimension=dimension)
+        return RawPlan(context.captured_queries[-1]['sql'])
+
+    def endpoint_plans(self, role, url, table):
+        """Every query reading ``table`` while ``role`` requests ``url``"""
+        client = Client()
+        client.force_login(self.users[role])
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(client.get(url).status_code, 200)
+        return [
+            RawPlan(query['sql']) for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        ]
+
+    def assertUsesIndex(self, plans, expected):
+        """At least one of ``plans`` uses one of the ``expected`` indexes and none reads a large table in full"""
+        large_tables = {model._meta.db_table for model in LARGE_TABLES}
+        wanted = set().union(*(index_names(model, fields) for model, fields in expected))
+        used = set()
+        for plan in plans:
+            explained = plan.explain()
+            indexes, scans = plan_facts(explained)
+            self.assertFalse(scans & large_tables, f'Full scan of {sorted(scans & large_tables)}:\n{explained}')
+            used |= indexes
+        self.assertTrue(used & wanted, f"None of {', '.join(sorted(wanted))} used; plans used {sorted(used)}")
+
+    def test_staff_order_queue(self):
+        self.assertUsesIndex(
+            [self.viewset_queryset(views.StaffOrderViewSet, 'staff')],
+            [(Order, ['site', 'created_at']), (Order, ['site', 'status', 'created_at'])],
+        )
+
+    def test_staff_order_delta_sync(self):
+        changed, _ = order_changes(
+            self.viewset_queryset(views.StaffOrderViewSet, 'staff'), self.users['staff'].site_id,
+            timezone.now() - timedelta(minutes=5),
+        )
+        self.assertUsesIndex([changed], [(Order, ['site', 'updated_at'])])
+
+    def test_revenue_buckets(self):
+        for dimension in (None, 'menu_item'):
+            with self.subTest(dimension=dimension):
+                self.assertUsesIndex(
+                    [self.bucket_plan(dimension)],
+                    [(Order, ['site', 'created_at']), (Order, ['site', 'status', 'created_at'])],
+                )
+
+    def test_token_distributions_for_a_month(self):
+        queryset = self.viewset_queryset(
+            views.TokenDistributionViewSet, 'admin', {'month': timezone.localdate().strftime('%Y-%m')}
+        )
+        self.assertUsesIndex(
+            [queryset],
+            [(TokenDistribution, ['allocation_month']), (TokenDistribution, ['user', 'allocation_month'])],
+        )
+
+    def test_employee_order_history(self):
+        # The orders OrderHistoryView reads through EmployeePolicy.history_queryset, cursor page included
+        plans = self.endpoint_plans('employee', '/api/employee/orders/', Order._meta.db_table)
+        self.assertTrue(plans)
+        self.assertUsesIndex(plans, [(Order, ['user', 'created_at'])])
+
+    def test_prep_forecast(self):
+        self.assertUsesIndex(
+            [DemandForecast.objects.filter(site_id=self.users['staff'].site_id, weekday=0)],
+            [(DemandForecast, ['site', 'weekday'])],
+        )
+
+    def test_query_budgets(self):
+        clients = {}
+        for role, user in self.users.items():
+            clients[role] = Client()
+            clients[role].force_login(user)
+            # The first request stores the session's role claim; budgets are for the requests after
+            clients[role].get('/api/profile/')
+        values = {'cursor': make_cursor(), 'month': timezone.localdate().strftime('%Y-%m')}
+
+        for path, budget in QUERY_BUDGETS.items():
+            url = path.format(**values)
+            role = next(role for prefix, role in BUDGET_ROLES.items() if url.startswith(prefix))
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = clients[role].get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(context.captured_queries), budget)
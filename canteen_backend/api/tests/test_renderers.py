@@ -0,0 +1,36 @@
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import serialize_many
+from api.models import CustomUser, MenuItem, Order, OrderItem
+from api.renderers import FastJSONRenderer
+from api.serializers import OrderSerializer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            'created_at': datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2024, 3, 1),
+            'price': Decimal('12.50'),
+            'name': 'Café',
+            'items': [1, None, True],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class FastSerializationTests(TestCase):
+    def test_order_rows_match_serializer(self):
+        user = CustomUser.objects.create(username='emp', role='employee')
+        item = MenuItem.objects.create(name='Soup', description='Soup', price=5)
+        order = Order.objects.create(user=user, total_tokens=10, item_count=2, items_summary='2x Soup')
+        OrderItem.objects.create(order=order, menu_item=item, quantity=2, tokens_per_item=5)
+        queryset = Order.objects.all()
+
+        fast = FastJSONRenderer().render(serialize_many(queryset, OrderSerializer))
+        with self.settings(FAST_SERIALIZATION=False):
+            slow = FastJSONRenderer().render(serialize_many(queryset, OrderSerializer))
+        self.assertEqual(fast, slow)
@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from api.models import Order
+from api.replica import REPLICA_DB_ALIAS, ReplicaPinMiddleware, ReplicaRouter, reads_from_replica
+
+router = ReplicaRouter()
+
+
+@reads_from_replica
+def report(request):
+    """Where the view's reads and writes would go"""
+    return router.db_for_read(Order), router.db_for_write(Order)
+
+
+@mock.patch('api.replica.replica_configured', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_report_reads_go_to_the_replica_and_writes_to_the_primary(self, configured):
+        self.assertEqual(report(self.factory.get('/')), (REPLICA_DB_ALIAS, DEFAULT_DB_ALIAS))
+        # Only while the view runs
+        self.assertIsNone(router.db_for_read(Order))
+
+    def test_pinned_client_reads_from_the_primary(self, configured):
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        self.assertEqual(report(request), (None, DEFAULT_DB_ALIAS))
+
+    def test_without_a_replica_reads_stay_on_the_primary(self, configured):
+        configured.return_value = False
+        self.assertEqual(report(self.factory.get('/')), (None, DEFAULT_DB_ALIAS))
+
+    def test_successful_writes_pin_the_client(self, configured):
+        def pinned(method, status):
+            middleware = ReplicaPinMiddleware(lambda request: HttpResponse(status=status))
+            response = middleware(self.factory.generic(method, '/'))
+            return settings.REPLICA_PIN_COOKIE in response.cookies
+
+        self.assertTrue(pinned('POST', 201))
+        self.assertTrue(pinned('DELETE', 204))
+        self.assertFalse(pinned('POST', 400))
+        self.assertFalse(pinned('GET', 200))
+        configured.return_value = False
+        self.assertFalse(pinned('POST', 201))
+
+    def test_pin_cookie_lasts_replica_pin_seconds(self, configured):
+        middleware = ReplicaPinMiddleware(lambda request: HttpResponse())
+        cookie = middleware(self.factory.post('/')).cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
@@ -0,0 +1,41 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.models import CustomUser, TokenDistribution
+from api.signals import tokens_changed
+
+
+class ResetMonthlyTokensTests(TestCase):
+    def test_only_users_actually_reset_are_counted_and_recorded(self):
+        due = CustomUser.objects.create(username='due', monthly_tokens=50, last_token_reset=date(2024, 2, 1))
+        ahead = CustomUser.objects.create(username='ahead', monthly_tokens=50, last_token_reset=date(2024, 4, 1))
+        done = CustomUser.objects.create(username='done', monthly_tokens=50, last_token_reset=date(2024, 3, 1))
+        TokenDistribution.objects.create(user=done, tokens_allocated=0, allocation_month=date(2024, 3, 1))
+
+        out = StringIO()
+        call_command('reset_monthly_tokens', month='2024-03', tokens=10, chunk_size=2, stdout=out)
+
+        self.assertIn('Reset tokens for 1 users and recorded 1 distributions', out.getvalue())
+        self.assertEqual(
+            set(TokenDistribution.objects.values_list('user__username', flat=True)), {'due', 'done'}
+        )
+        ahead.refresh_from_db()
+        self.assertEqual((ahead.monthly_tokens, ahead.last_token_reset), (50, date(2024, 4, 1)))
+        due.refresh_from_db()
+        self.assertEqual((due.monthly_tokens, due.last_token_reset), (10, date(2024, 3, 1)))
+
+    def test_each_reset_chunk_sends_tokens_changed(self):
+        for index in range(3):
+            CustomUser.objects.create(username=f'emp{index}', last_token_reset=date(2024, 2, 1))
+        calls = []
+
+        def receiver(sender, site_ids, **kwargs):
+            calls.append(site_ids)
+
+        tokens_changed.connect(receiver)
+        self.addCleanup(tokens_changed.disconnect, receiver)
+        call_command('reset_monthly_tokens', month='2024-03', chunk_size=2, stdout=StringIO())
+        self.assertEqual(calls, [[None], [None]])
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.session_sweeper import sweep_expired_sessions
+
+
+class SweepExpiredSessionsTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{index}', session_data='', expire_date=now - timedelta(hours=1))
+             for index in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(hours=1))]
+        )
+
+    def deletes(self, context):
+        return [query for query in context.captured_queries if query['sql'].startswith('DELETE')]
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        with CaptureQueriesContext(connection) as context:
+            removed, _ = sweep_expired_sessions(batch_size=2)
+        self.assertEqual(removed, 5)
+        self.assertEqual(len(self.deletes(context)), 3)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    def test_max_batches_bounds_one_run(self):
+        with CaptureQueriesContext(connection) as context:
+            removed, _ = sweep_expired_sessions(batch_size=2, max_batches=2)
+        self.assertEqual(removed, 4)
+        self.assertEqual(len(self.deletes(context)), 2)
+        self.assertEqual(Session.objects.count(), 2)
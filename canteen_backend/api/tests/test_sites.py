@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, ShiftTokenAllocation, Site, TokenDistribution
+
+
+class ShiftAllocationUniquenessTests(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(name='North', code='north')
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(username='admin', role='admin', site=self.site))
+
+    def post(self, month):
+        return self.client.post(
+            '/api/admin/shift-allocations/',
+            {'shift': 'day', 'tokens_per_user': 40, 'allocation_month': month}, format='json',
+        )
+
+    def test_duplicate_for_the_same_site_and_month_is_rejected(self):
+        self.assertEqual(self.post('2024-03-01').status_code, 201)
+        response = self.post('2024-03-15')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ShiftTokenAllocation.objects.filter(site=self.site).count(), 1)
+
+    def test_same_shift_and_month_at_another_site_is_allowed(self):
+        ShiftTokenAllocation.objects.create(shift='day', tokens_per_user=40, allocation_month=date(2024, 3, 1))
+        self.assertEqual(self.post('2024-03-01').status_code, 201)
+
+
+@override_settings(KIOSK_DEVICE_KEYS={'north-key': 'north', 'default-key': ''})
+class KioskSiteTests(TestCase):
+    def setUp(self):
+        self.north = Site.objects.create(name='North', code='north')
+        CustomUser.objects.create(username='north', user_id='B1', role='employee', site=self.north)
+        CustomUser.objects.create(username='main', user_id='B2', role='employee')
+        self.client = APIClient()
+
+    def login(self, key, badge):
+        return self.client.post('/api/kiosk/login/', {'badge': badge}, format='json', HTTP_X_KIOSK_KEY=key)
+
+    def test_device_only_accepts_badges_of_its_site(self):
+        self.assertEqual(self.login('north-key', 'B1').status_code, 200)
+        self.assertEqual(self.login('north-key', 'B2').status_code, 400)
+        self.assertEqual(self.login('default-key', 'B2').status_code, 200)
+        self.assertEqual(self.login('default-key', 'B1').status_code, 400)
+
+    def test_unknown_key_is_refused(self):
+        self.assertEqual(self.login('other-key', 'B1').status_code, 403)
+
+
+class TokenDistributionSiteTests(TestCase):
+    def setUp(self):
+        self.north = Site.objects.create(name='North', code='north')
+        self.local = CustomUser.objects.create(username='local', role='employee', site=self.north)
+        self.other = CustomUser.objects.create(username='other', role='employee')
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(username='admin', role='admin', site=self.north))
+
+    def post(self, user):
+        return self.client.post(
+            '/api/admin/token-distributions/',
+            {'user': user.pk, 'tokens_allocated': 10, 'allocation_month': '2024-03-01'}, format='json',
+        )
+
+    def test_users_of_another_site_are_rejected(self):
+        self.assertEqual(self.post(self.local).status_code, 201)
+        response = self.post(self.other)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('user', response.data)
+        self.assertFalse(TokenDistribution.objects.filter(user=self.other).exists())
+
+    def test_update_cannot_move_a_distribution_to_another_site(self):
+        distribution = TokenDistribution.objects.create(
+            user=self.local, tokens_allocated=10, allocation_month=date(2024, 3, 1)
+        )
+        response = self.client.patch(
+            f'/api/admin/token-distributions/{distribution.pk}/', {'user': self.other.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        distribution.refresh_from_db()
+        self.assertEqual(distribution.user, self.local)
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, MenuItem, Order, PickupSlot
+
+
+class PickupSlotAdmissionTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='emp', role='employee', monthly_tokens=50)
+        self.item = MenuItem.objects.create(name='Soup', description='Soup', price=5, daily_stock=5,
+                                            stock_remaining=5, stock_date=timezone.localdate())
+        now = timezone.now()
+        self.slot = PickupSlot.objects.create(starts_at=now, ends_at=now + timedelta(hours=1), capacity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def place(self, quantity=2):
+        return self.client.post('/api/employee/order/', {
+            'pickup_slot_id': self.slot.pk, 'items': [{'menu_item_id': self.item.pk, 'quantity': quantity}],
+        }, format='json')
+
+    def assertNothingTaken(self, reserved):
+        self.user.refresh_from_db()
+        self.item.refresh_from_db()
+        self.slot.refresh_from_db()
+        self.assertEqual(
+            (self.user.monthly_tokens, self.item.stock_remaining, self.slot.reserved), (50, 5, reserved)
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_takes_a_place(self):
+        self.assertEqual(self.place().status_code, 201)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.reserved, 1)
+        self.assertEqual(Order.objects.get().pickup_slot_id, self.slot.pk)
+
+    def test_full_slot_rejects_the_order_and_charges_nothing(self):
+        PickupSlot.objects.filter(pk=self.slot.pk).update(reserved=1)
+        response = self.place()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('full', response.data['error'])
+        self.assertNothingTaken(reserved=1)
+
+    def test_place_is_given_back_when_a_later_step_fails(self):
+        # The slot is claimed first; running out of stock afterwards rolls the claim back
+        response = self.place(quantity=6)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('out of stock', response.data['error'])
+        self.assertNothingTaken(reserved=0)
+
+    def test_closed_slot_rejects_the_order(self):
+        PickupSlot.objects.filter(pk=self.slot.pk).update(ends_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.place().status_code, 400)
+        self.assertNothingTaken(reserved=0)
@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, MenuItem, Order, OrderItem
+
+
+@override_settings(QUERY_CACHE_ENABLED=False)
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create(username='staff', role='staff')
+        employee = CustomUser.objects.create(username='emp', role='employee')
+        soup = MenuItem.objects.create(name='Soup', description='Hot', price=5)
+        cls.order = Order.objects.create(user=employee, total_tokens=10, item_count=2)
+        OrderItem.objects.create(order=cls.order, menu_item=soup, quantity=2, tokens_per_item=5)
+        cls.soup = soup
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def get(self, url, expected=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, expected, response.content)
+        return response.json()
+
+    def test_fields_keep_only_the_listed_ones(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), self.settings(FAST_SERIALIZATION=fast):
+                orders = self.get('/api/staff/orders/?fields=id,status,order_items.quantity')
+                self.assertEqual(orders, [{'id': self.order.pk, 'status': 'pending',
+                                           'order_items': [{'quantity': 2}]}])
+
+    def test_expand_collapses_what_it_does_not_list(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), self.settings(FAST_SERIALIZATION=fast):
+                order, = self.get('/api/staff/orders/?expand=order_items')
+                self.assertNotIn('user_details', order)
+                self.assertEqual(order['order_items'][0]['menu_item'], self.soup.pk)
+
+                order, = self.get('/api/staff/orders/?expand=order_items,order_items.menu_item&fields=order_items')
+                self.assertEqual(order['order_items'][0]['menu_item']['name'], 'Soup')
+
+    def test_unknown_fields_are_rejected(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), self.settings(FAST_SERIALIZATION=fast):
+                errors = self.get('/api/staff/orders/?fields=id,colour,order_items.size', expected=400)
+                self.assertEqual(errors, {'fields': ['Unknown field: colour', 'Unknown field: order_items.size']})
+                errors = self.get('/api/staff/orders/?expand=status,order_items.menu', expected=400)
+                self.assertEqual(errors, {'expand': ['Unknown expansion: order_items.menu',
+                                                     'Unknown expansion: status']})
+        self.assertEqual(self.get('/api/profile/?fields=password', expected=400),
+                         {'fields': ['Unknown field: password']})
+
+    def test_async_endpoints_reject_unknown_fields(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.get('/api/async/staff/queue/?fields=colour', expected=400),
+                         {'fields': ['Unknown field: colour']})
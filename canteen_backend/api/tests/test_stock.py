@@ -0,0 +1,78 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import CustomUser, MenuItem, Order, OrderItem
+from api.stock import OutOfStock, reserve_stock, rollover_stock
+from api.views import StaffOrderViewSet
+
+
+class StockRolloverTests(TestCase):
+    def setUp(self):
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+
+    def make_item(self, **kwargs):
+        defaults = {'name': 'Soup', 'description': 'Soup', 'price': 5, 'daily_stock': 2,
+                    'stock_remaining': 2, 'stock_date': timezone.localdate()}
+        return MenuItem.objects.create(**{**defaults, **kwargs})
+
+    def test_sold_out_item_is_switched_off_and_back_on_at_rollover(self):
+        item = self.make_item()
+        reserve_stock({item.pk: item}, {item.pk: 2})
+        item.refresh_from_db()
+        self.assertEqual((item.stock_remaining, item.is_available, item.sold_out), (0, False, True))
+
+        MenuItem.objects.filter(pk=item.pk).update(stock_date=self.yesterday)
+        rollover_stock(force=True)
+        item.refresh_from_db()
+        self.assertEqual((item.stock_remaining, item.is_available, item.sold_out), (2, True, False))
+
+    def test_item_switched_off_by_hand_stays_off_at_rollover(self):
+        item = self.make_item(stock_remaining=0, is_available=False, stock_date=self.yesterday)
+        rollover_stock(force=True)
+        item.refresh_from_db()
+        self.assertEqual((item.stock_remaining, item.is_available), (2, False))
+
+    def test_switching_a_sold_out_item_off_by_hand_keeps_it_off(self):
+        item = self.make_item()
+        reserve_stock({item.pk: item}, {item.pk: 2})
+        staff = CustomUser.objects.create(username='staff', role='staff')
+        client = APIClient()
+        client.force_authenticate(staff)
+        response = client.patch(f'/api/staff/menu/{item.pk}/', {'is_available': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        MenuItem.objects.filter(pk=item.pk).update(stock_date=self.yesterday)
+        rollover_stock(force=True)
+        item.refresh_from_db()
+        self.assertFalse(item.is_available)
+
+    def test_reserve_never_goes_below_zero(self):
+        item = self.make_item(stock_remaining=1)
+        with self.assertRaises(OutOfStock):
+            reserve_stock({item.pk: item}, {item.pk: 2})
+        item.refresh_from_db()
+        self.assertEqual(item.stock_remaining, 1)
+
+
+class DeclineReleaseTests(TestCase):
+    def test_concurrent_declines_release_stock_once(self):
+        item = MenuItem.objects.create(name='Soup', description='Soup', price=5, daily_stock=5,
+                                       stock_remaining=3, stock_date=timezone.localdate())
+        employee = CustomUser.objects.create(username='emp', role='employee')
+        order = Order.objects.create(user=employee, total_tokens=10, item_count=2)
+        OrderItem.objects.create(order=order, menu_item=item, quantity=2, tokens_per_item=5)
+        stale = Order.objects.get(pk=order.pk)
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username='staff', role='staff'))
+
+        url = f'/api/staff/orders/{order.pk}/update_status/'
+        self.assertEqual(client.patch(url, {'status': 'declined'}, format='json').status_code, 200)
+        # A second decline that read the order before the first one committed
+        with mock.patch.object(StaffOrderViewSet, 'get_object', return_value=stale):
+            self.assertEqual(client.patch(url, {'status': 'declined'}, format='json').status_code, 200)
+        item.refresh_from_db()
+        self.assertEqual(item.stock_remaining, 5)
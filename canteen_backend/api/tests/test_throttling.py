@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.throttling import LocMemBucketStore, WriteConcurrencyMiddleware
+
+RATES = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'orders': '2/min', 'login': '2/min'}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+class BucketThrottleTests(TestCase):
+    def setUp(self):
+        # Buckets of their own, so other tests' requests do not count
+        patcher = mock.patch('api.throttling._store', LocMemBucketStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def assertThrottled(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_order_throttle(self):
+        self.client.force_authenticate(CustomUser.objects.create(username='emp', role='employee'))
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/employee/order/', {'items': []}, format='json').status_code, 400)
+        self.assertThrottled(self.client.post('/api/employee/order/', {'items': []}, format='json'))
+
+    def test_login_throttle_is_per_username(self):
+        def login(username):
+            return self.client.post('/api/login/', {'username': username, 'password': 'wrong'}, format='json')
+
+        for _ in range(2):
+            self.assertEqual(login('emp').status_code, 400)
+        self.assertThrottled(login('emp'))
+        self.assertEqual(login('other').status_code, 400)
+
+
+@override_settings(WRITE_CONCURRENCY_LIMIT=1, WRITE_CONCURRENCY_WAIT=0.01)
+class WriteConcurrencyMiddlewareTests(SimpleTestCase):
+    def test_writes_over_the_limit_are_shed(self):
+        middleware = WriteConcurrencyMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+        # A write already in progress holds the only slot
+        middleware.slots.acquire()
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(middleware(factory.get('/')).status_code, 200)
+
+        middleware.slots.release()
+        self.assertEqual(middleware(factory.post('/')).status_code, 200)
+
+    async def test_async_writes_over_the_limit_are_shed(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = WriteConcurrencyMiddleware(get_response)
+        middleware.slots.acquire()
+        response = await middleware(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, 429)
+        middleware.slots.release()
+        self.assertEqual((await middleware(RequestFactory().post('/'))).status_code, 200)
+
+    @override_settings(WRITE_CONCURRENCY_LIMIT=0)
+    def test_zero_means_no_limit(self):
+        middleware = WriteConcurrencyMiddleware(lambda request: HttpResponse())
+        self.assertIsNone(middleware.slots)
+        self.assertEqual(middleware(RequestFactory().post('/')).status_code, 200)
@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from api.models import CustomUser, MenuItem, Order, OrderItem, summarize_lines
+
+
+class VerifyOrderTotalsTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username='emp')
+        self.item = MenuItem.objects.create(name='Soup', description='Soup', price=5)
+        total_tokens, item_count, items_summary = summarize_lines([('Soup', 2, 5)])
+        self.order = Order.objects.create(
+            user=user, total_tokens=total_tokens, item_count=item_count, items_summary=items_summary
+        )
+        OrderItem.objects.create(order=self.order, menu_item=self.item, quantity=2, tokens_per_item=5)
+
+    def verify(self, *args):
+        out = StringIO()
+        call_command('verify_order_totals', *args, stdout=out)
+        return out.getvalue()
+
+    def test_renamed_menu_item_is_not_drift(self):
+        MenuItem.objects.filter(pk=self.item.pk).update(name='Tomato Soup')
+        self.assertIn('All order summaries match', self.verify())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.items_summary, '2x Soup')
+
+    def test_drifted_totals_are_reported_and_fixed(self):
+        Order.objects.filter(pk=self.order.pk).update(total_tokens=3, item_count=1)
+        with self.assertRaises(CommandError):
+            self.verify()
+        self.verify('--fix')
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.total_tokens, self.order.item_count), (10, 2))
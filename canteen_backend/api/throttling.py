@@ -0,0 +1,255 @@
+"""
+Token-bucket throttling and write admission control.
+
+Throttles take one token per request from a bucket that refills at the
+configured rate ("10/min" = bucket of 10, refilled 10 per minute), so a
+short burst is allowed but a retry loop is cut off. Rates live in
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] under the throttle's scope;
+``<scope>.<role>`` overrides a per-user rate for one role, and
+``role.<role>`` caps all users of a role together. A scope without a
+rate is not throttled. DRF turns a refusal into 429 with Retry-After.
+
+Buckets live in the store named by THROTTLE_STORE:
+
+- LocMemBucketStore: per process, fastest
+- FileBucketStore: a SQLite file shared by every process on the host
+- CacheBucketStore: a Django cache alias, e.g. a local Redis (approximate
+  under contention, as get and set are separate calls)
+
+WriteConcurrencyMiddleware separately caps how many unsafe requests a
+process works on at once. Anything over the cap waits briefly and is then
+shed with 429 instead of piling up on SQLite's write lock.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (capacity 10, refill 10/60 tokens per second); None stays None"""
+    if rate is None:
+        return None
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill(tokens, updated, now, capacity, refill_rate):
+    """Take one token from a bucket; returns (tokens left, seconds to wait or 0)"""
+    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / refill_rate
+
+
+class LocMemBucketStore:
+    max_keys = 10000
+
+    def __init__(self, **options):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens, wait = refill(tokens, updated, now, capacity, refill_rate)
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                # Forget the least recently used half; a forgotten bucket restarts full
+                recent = sorted(self.buckets.items(), key=lambda item: item[1][1])[self.max_keys // 2:]
+                self.buckets = dict(recent)
+        return wait
+
+
+class FileBucketStore:
+    def __init__(self, path=None, **options):
+        self.path = str(path or settings.BASE_DIR / 'throttle.sqlite3')
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)'
+            )
+            self.local.conn = conn
+        return conn
+
+    def take(self, key, capacity, refill_rate):
+        # Wall clock, since the file is shared between processes
+        now = time.time()
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, wait = refill(*(row or (capacity, now)), now, capacity, refill_rate)
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class CacheBucketStore:
+    def __init__(self, alias='default', **options):
+        self.alias = alias
+
+    def take(self, key, capacity, refill_rate):
+        now = time.time()
+        cache = caches[self.alias]
+        cache_key = f'throttle:{key}'
+        tokens, updated = cache.get(cache_key) or (capacity, now)
+        tokens, wait = refill(tokens, updated, now, capacity, refill_rate)
+        # Expire once the bucket would be full again anyway
+        cache.set(cache_key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        return wait
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.THROTTLE_STORE)(**settings.THROTTLE_STORE_OPTIONS)
+    return _store
+
+
+class BucketThrottle(BaseThrottle):
+    """Base token-bucket throttle; subclasses pick the scope, rate and bucket key"""
+    scope = None
+
+    def get_rate(self, request):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = parse_rate(self.get_rate(request))
+        key = self.get_key(request) if rate else None
+        if key is None:
+            self.wait_seconds = None
+            return True
+        capacity, refill_rate = rate
+        self.wait_seconds = get_store().take(f'{self.scope}:{key}', capacity, refill_rate)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserBucketThrottle(BucketThrottle):
+    """One bucket per user (per client address when anonymous)"""
+    scope = 'user'
+
+    def get_rate(self, request):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        if not request.user.is_authenticated:
+            return rates.get('anon')
+        return rates.get(f'{self.scope}.{request.user.role}', rates.get(self.scope))
+
+    def get_key(self, request):
+        if request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class RoleBucketThrottle(BucketThrottle):
+    """One bucket shared by every user of a role, for roles with a ``role.<role>`` rate"""
+    scope = 'role'
+
+    def get_rate(self, request):
+        if not request.user.is_authenticated:
+            return None
+        return api_settings.DEFAULT_THROTTLE_RATES.get(f'role.{request.user.role}')
+
+    def get_key(self, request):
+        return request.user.role
+
+
+class OrderThrottle(UserBucketThrottle):
+    scope = 'orders'
+
+
+class ReportThrottle(UserBucketThrottle):
+    scope = 'reports'
+
+
+class LoginThrottle(BucketThrottle):
+    """Per client address and username, so one guessed account cannot lock out a shared terminal"""
+    scope = 'login'
+
+    def get_key(self, request):
+        return f"{self.get_ident(request)}:{str(request.data.get('username', ''))[:150]}"
+
+
+class KioskThrottle(BucketThrottle):
+    """One bucket per kiosk device key"""
+    scope = 'kiosk'
+
+    def get_key(self, request):
+        return request.headers.get('X-Kiosk-Key') or self.get_ident(request)
+
+
+class WriteConcurrencyMiddleware:
+    """Admit at most WRITE_CONCURRENCY_LIMIT unsafe requests at a time in this process"""
+    sync_capable = True
+    async_capable = True
+    unsafe_methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        limit = settings.WRITE_CONCURRENCY_LIMIT
+        self.slots = threading.BoundedSemaphore(limit) if limit > 0 else None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.slots is None or request.method not in self.unsafe_methods:
+            return self.get_response(request)
+        if not self.slots.acquire(timeout=settings.WRITE_CONCURRENCY_WAIT):
+            return self.busy_response()
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
+
+    async def __acall__(self, request):
+        if self.slots is None or request.method not in self.unsafe_methods:
+            return await self.get_response(request)
+        # Poll rather than block, so waiting never stalls the event loop
+        deadline = time.monotonic() + settings.WRITE_CONCURRENCY_WAIT
+        while not self.slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                return self.busy_response()
+            await asyncio.sleep(0.01)
+        try:
+            return await self.get_response(request)
+        finally:
+            self.slots.release()
+
+    def busy_response(self):
+        response = JsonResponse({'error': 'Server busy, please retry shortly'}, status=429)
+        response['Retry-After'] = '1'
+        return response
@@ -6,6 +6,7 @@ router = DefaultRouter()
 router.register(r'admin/users', views.AdminUserViewSet, basename='admin-users')
 router.register(r'staff/menu', views.StaffMenuViewSet, basename='staff-menu')
 router.register(r'staff/orders', views.StaffOrderViewSet, basename='staff-orders')
+router.register(r'staff/pickup-slots', views.StaffPickupSlotViewSet, basename='staff-pickup-slots')
 router.register(r'admin/shift-allocations', views.ShiftTokenAllocationViewSet, basename='shift-allocations')
 router.register(r'admin/token-distributions', views.TokenDistributionViewSet, basename='token-distributions')
 
@@ -24,12 +25,17 @@ urlpatterns = [
     path('admin/dashboard/stats/', views.get_dashboard_stats, name='dashboard_stats'),
     path('admin/dashboard/orders/recent/', views.get_recent_orders, name='recent_orders'),
     path('admin/dashboard/revenue/', views.get_revenue_data, name='revenue_data'),
+    path('admin/analytics/', views.get_analytics, name='analytics'),
+    path('admin/cache/stats/', views.get_cache_stats, name='cache_stats'),
     
     # Token management
     path('admin/tokens/assign/', views.assign_tokens, name='assign_tokens'),
     path('admin/tokens/summary/', views.get_token_summary, name='token_summary'),
     path('admin/tokens/refresh/', views.refresh_monthly_tokens, name='refresh_tokens'),
 
+    # Staff endpoints
+    path('staff/forecast/', views.get_prep_forecast, name='prep_forecast'),
+
     # Employee endpoints
     path('employee/menu/', views.employee_menu, name='employee_menu'),
     path('employee/order/', views.employee_place_order, name='employee_place_order'),
@@ -39,4 +45,17 @@ urlpatterns = [
     path('guest/menu/', views.guest_menu, name='guest_menu'),
     path('guest/order/', views.guest_place_order, name='guest_order'),
     path('guest/orders/', views.guest_orders, name='guest_orders'),
+
+    # Kiosk endpoints
+    path('kiosk/login/', views.kiosk_login, name='kiosk_login'),
+    path('kiosk/order/', views.kiosk_order, name='kiosk_order'),
+
+    # Async read endpoints (ASGI)
+    path('async/login/', views.async_login, name='async_login'),
+    path('async/profile/', views.async_profile, name='async_profile'),
+    path('async/employee/menu/', views.async_employee_menu, name='async_employee_menu'),
+    path('async/employee/orders/', views.async_employee_orders, name='async_employee_orders'),
+    path('async/guest/menu/', views.async_guest_menu, name='async_guest_menu'),
+    path('async/guest/orders/', views.async_guest_orders, name='async_guest_orders'),
+    path('async/staff/queue/', views.async_kitchen_queue, name='async_kitchen_queue'),
 ]
@@ -0,0 +1,29 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def day_bounds(day=None):
+    """Aware [start, end) datetimes covering a local calendar day"""
+    day = day or timezone.localdate()
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def month_bounds(month):
+    """Aware [start, end) datetimes covering the local calendar month of ``month``"""
+    first = month.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return day_bounds(first)[0], day_bounds(next_month)[0]
+
+
+def parse_month(value):
+    """Parse YYYY-MM or YYYY-MM-DD into the first day of that month, or None"""
+    if not value:
+        return None
+    if len(value) == 7:
+        value = f"{value}-01"
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().replace(day=1)
+    except ValueError:
+        return None
@@ -1,18 +1,40 @@
 from datetime import timedelta, date
-from django.db.models import Q, Count, Sum, F, IntegerField, ExpressionWrapper
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Count, Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth import login, logout
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from .permissions import IsAdmin, IsStaffOrAdmin, IsEmployee, IsGuest
-from .models import CustomUser, MenuItem, Order, ShiftTokenAllocation, TokenDistribution
+from . import async_views, hashing
+from .permissions import IsAdmin, IsStaffOrAdmin
+from .models import CustomUser, MenuItem, Order, PickupSlot, ShiftTokenAllocation, TokenDistribution
 from .serializers import (
     CustomUserSerializer, CustomUserCreateSerializer, LoginSerializer,
-    MenuItemSerializer, OrderSerializer, ShiftTokenAllocationSerializer, TokenDistributionSerializer
+    MenuItemSerializer, OrderSerializer, PickupSlotSerializer, ShiftTokenAllocationSerializer,
+    TokenDistributionSerializer
 )
+from .allocation import apply_allocations, due_users
+from .analytics import AnalyticsError, bucketed, requested_range
+from .authentication import store_role_claim
+from .caching import cache_response, cache_stats
+from .fast_serializers import FastListMixin, serialize_many
+from .forecast import prep_forecast
+from .kiosk import KioskLoginView, KioskOrderView
+from .ordering import EmployeePolicy, GuestPolicy, MenuView, OrderHistoryView, PlaceOrderView
+from .replica import reads_from_replica
+from .signals import tokens_changed
+from .sites import SiteScopedMixin, request_site_id
+from .slots import release_slot
+from .sparse import FieldSpec
+from .stock import release_stock
+from .sync import SYNC_CURSOR_HEADER, CursorExpired, InvalidCursor, make_cursor, order_changes, parse_cursor
+from .throttling import LoginThrottle, ReportThrottle
+from .utils import day_bounds, parse_month
 
 
 # CSRF token view
@@ -29,15 +51,6 @@ def csrf_token_view(request):
         'csrftoken': csrf_token
     })
     
-    # Set CORS headers
-    origin = request.META.get('HTTP_ORIGIN')
-    if origin in settings.CORS_ALLOWED_ORIGINS:
-        response['Access-Control-Allow-Origin'] = origin
-        response['Access-Control-Allow-Credentials'] = 'true'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'X-CSRFToken, Content-Type, X-Requested-With, Authorization'
-        response['Access-Control-Expose-Headers'] = 'X-CSRFToken'
-    
     # Set the CSRF cookie if it doesn't exist
     if not csrf_token:
         response.set_cookie(
@@ -53,22 +66,16 @@ def csrf_token_view(request):
 
 
 # Login view
-@api_view(['POST', 'OPTIONS'])
+@api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle])
 @ensure_csrf_cookie
 def login_view(request):
-    if request.method == 'OPTIONS':
-        response = Response()
-        response['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
-        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'X-CSRFToken, Content-Type, X-Requested-With'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        return response
-        
     serializer = LoginSerializer(data=request.data, context={'request': request})
     serializer.is_valid(raise_exception=True)
     user = serializer.validated_data['user']
     login(request, user)
+    store_role_claim(request, user)
     
     # Set session to expire when browser is closed
     if not request.data.get('remember_me'):
@@ -96,46 +103,25 @@ def login_view(request):
 
 
 # Logout view
-@api_view(['POST', 'OPTIONS'])
+@api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @ensure_csrf_cookie
 def logout_view(request):
-    # Handle OPTIONS preflight request
-    if request.method == 'OPTIONS':
-        response = Response(status=200)
-    else:
-        # Get session key before logging out
-        session_key = request.session.session_key
-        
-        # Logout the user
-        logout(request)
-        
-        # Delete the session from the database
-        if session_key:
-            from django.contrib.sessions.models import Session
-            try:
-                Session.objects.get(session_key=session_key).delete()
-            except (Session.DoesNotExist, AttributeError):
-                pass
-        
-        # Create response
-        response = Response({'message': 'Logout successful'}, status=200)
+    # Get session key before logging out
+    session_key = request.session.session_key
     
-    # Get the origin from the request
-    origin = request.META.get('HTTP_ORIGIN')
+    # Logout the user
+    logout(request)
     
-    # Set CORS headers if the origin is allowed
-    if origin in settings.CORS_ALLOWED_ORIGINS:
-        response['Access-Control-Allow-Origin'] = origin
-        response['Access-Control-Allow-Credentials'] = 'true'
-        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS, GET, PUT, PATCH, DELETE, HEAD'
-        response['Access-Control-Allow-Headers'] = 'X-CSRFToken, Content-Type, X-Requested-With, Authorization, Accept, Accept-Encoding, Accept-Language, Cache-Control, Connection, Host, Pragma, Referer, User-Agent'
-        response['Access-Control-Expose-Headers'] = 'X-CSRFToken, Content-Type, Content-Length, Content-Range, Content-Disposition, Authorization'
-        response['Access-Control-Max-Age'] = '86400'  # 24 hours
+    # Delete the session from the database
+    if session_key:
+        from django.contrib.sessions.models import Session
+        try:
+            Session.objects.get(session_key=session_key).delete()
+        except (Session.DoesNotExist, AttributeError):
+            pass
     
-    # Always set these headers for the response
-    response['Vary'] = 'Origin, Cookie'
-    response['Content-Type'] = 'application/json'
+    response = Response({'message': 'Logout successful'}, status=200)
     
     # Delete the session cookie
     response.delete_cookie(
@@ -143,7 +129,6 @@ def logout_view(request):
         path='/',
         domain=settings.SESSION_COOKIE_DOMAIN or None,
         samesite=settings.SESSION_COOKIE_SAMESITE,
-        secure=settings.SESSION_COOKIE_SECURE,
     )
     
     # Set an expired CSRF cookie to clear it
@@ -164,7 +149,6 @@ def logout_view(request):
         path='/',
         domain=settings.SESSION_COOKIE_DOMAIN or None,
         samesite=settings.SESSION_COOKIE_SAMESITE,
-        secure=settings.SESSION_COOKIE_SECURE,
     )
     
     return response
@@ -174,12 +158,12 @@ def logout_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile_view(request):
-    serializer = CustomUserSerializer(request.user)
+    serializer = CustomUserSerializer(request.user, field_spec=FieldSpec.from_request(request))
     return Response(serializer.data)
 
 
 # Admin user management
-class AdminUserViewSet(viewsets.ModelViewSet):
+class AdminUserViewSet(SiteScopedMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.exclude(role='admin')
     permission_classes = [IsAdmin]
 
@@ -191,7 +175,7 @@ class AdminUserViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
+        user = serializer.save(site_id=request_site_id(request))
 
         # Tokens are managed through the monthly_tokens field in CustomUser model
         # No need to create separate MonthlyToken objects
@@ -213,7 +197,7 @@ def refresh_monthly_tokens(request):
             )
             
         # Get all non-admin, non-staff users
-        users = CustomUser.objects.exclude(role__in=['admin', 'staff'])
+        users = CustomUser.objects.filter(site_id=request_site_id(request)).exclude(role__in=['admin', 'staff'])
         now = timezone.now().date()
         
         # Update tokens for each user
@@ -221,6 +205,7 @@ def refresh_monthly_tokens(request):
             monthly_tokens=token_count,
             last_token_reset=now
         )
+        tokens_changed.send(sender=CustomUser, site_ids=[request_site_id(request)])
         
         return Response({
             'message': f'Successfully refreshed tokens for {updated} users',
@@ -237,20 +222,46 @@ def refresh_monthly_tokens(request):
 
 
 # Staff: Menu management
-class StaffMenuViewSet(viewsets.ModelViewSet):
+class StaffMenuViewSet(SiteScopedMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
     permission_classes = [IsStaffOrAdmin]
 
+    def perform_update(self, serializer):
+        # Switching an item on or off by hand takes it out of the sold-out refill
+        if 'is_available' in serializer.validated_data:
+            serializer.save(sold_out=False)
+        else:
+            serializer.save()
+
+
+# Staff: Pickup slots
+class StaffPickupSlotViewSet(SiteScopedMixin, viewsets.ModelViewSet):
+    queryset = PickupSlot.objects.all()
+    serializer_class = PickupSlotSerializer
+    permission_classes = [IsStaffOrAdmin]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?date=YYYY-MM-DD limits the list to one day's slots
+        try:
+            day = parse_date(self.request.query_params.get('date') or '')
+        except ValueError:
+            day = None
+        if day:
+            start, end = day_bounds(day)
+            queryset = queryset.filter(starts_at__gte=start, starts_at__lt=end)
+        return queryset
+
 
 # Staff: Order management
-class StaffOrderViewSet(viewsets.ModelViewSet):
+class StaffOrderViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsStaffOrAdmin]
 
     def get_queryset(self):
-        queryset = Order.objects.all()
+        queryset = Order.objects.filter(site_id=request_site_id(self.request))
         search = self.request.query_params.get('search')
         if search:
             query = Q(user__username__icontains=search) | Q(user__user_id__icontains=search)
@@ -262,20 +273,52 @@ class StaffOrderViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(query)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """The whole queue, or with ?since=<cursor> only what changed (see sync.py)"""
+        cursor = make_cursor()
+        since = request.query_params.get('since')
+        if since is None:
+            response = super().list(request, *args, **kwargs)
+        else:
+            try:
+                since = parse_cursor(since)
+            except InvalidCursor as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            except CursorExpired:
+                return Response(
+                    {'error': 'Sync cursor has expired; reload the full order list'},
+                    status=status.HTTP_410_GONE
+                )
+            changed, deleted = order_changes(self.filter_queryset(self.get_queryset()), request_site_id(request), since)
+            response = Response({
+                'orders': serialize_many(changed, OrderSerializer, FieldSpec.from_request(request)),
+                'deleted': deleted,
+                'cursor': cursor,
+            })
+        response[SYNC_CURSOR_HEADER] = cursor
+        return response
+
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         order = self.get_object()
         new_status = request.data.get('status')
         if new_status in ['approved', 'declined', 'completed']:
-            order.status = new_status
-            order.save()
+            with transaction.atomic():
+                # Claim the decline with a conditional UPDATE so concurrent declines release once
+                if new_status == 'declined' and Order.objects.filter(pk=order.pk).exclude(
+                    status='declined'
+                ).update(status='declined'):
+                    release_stock(order)
+                    release_slot(order)
+                order.status = new_status
+                order.save()
             serializer = self.get_serializer(order)
             return Response(serializer.data)
         return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Admin: Shift token allocations
-class ShiftTokenAllocationViewSet(viewsets.ModelViewSet):
+class ShiftTokenAllocationViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     queryset = ShiftTokenAllocation.objects.all().order_by('-allocation_month')
     serializer_class = ShiftTokenAllocationSerializer
     permission_classes = [IsAdmin]
@@ -288,152 +331,39 @@ class TokenDistributionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdmin]
     
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().filter(user__site_id=request_site_id(self.request))
         user_id = self.request.query_params.get('user')
         month = self.request.query_params.get('month')  # format YYYY-MM or YYYY-MM-01
         if user_id:
             qs = qs.filter(user_id=user_id)
+        # Accept YYYY-MM or full date; normalize to first of month
+        month = parse_month(month)
         if month:
-            try:
-                # Accept YYYY-MM or full date; normalize to first of month
-                from datetime import datetime
-                if len(month) == 7:
-                    month = f"{month}-01"
-                dt = datetime.strptime(month, "%Y-%m-%d").date().replace(day=1)
-                qs = qs.filter(allocation_month=dt)
-            except Exception:
-                pass
+            qs = qs.filter(allocation_month=month)
         return qs
 
 
-# Employee: View menu
-@api_view(['GET'])
-@permission_classes([IsEmployee])
-def employee_menu(request):
-    menu_items = MenuItem.objects.filter(is_available=True)
-    serializer = MenuItemSerializer(menu_items, many=True)
-    return Response(serializer.data)
-
-
-# ✅ Employee: Place order
-@api_view(['POST'])
-@permission_classes([IsEmployee])
-def employee_place_order(request):
-    items = request.data.get('items', [])
-    if not items:
-        return Response({'error': 'No items provided'}, status=status.HTTP_400_BAD_REQUEST)
-
-    total_tokens_needed = 0
-    for item in items:
-        try:
-            menu_item = MenuItem.objects.get(id=item['menu_item_id'])
-            total_tokens_needed += menu_item.price * item['quantity']
-        except MenuItem.DoesNotExist:
-            return Response({'error': f'Menu item with id {item["menu_item_id"]} does not exist'},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-    user = request.user
-    
-    # Check if user has enough tokens
-    if user.current_tokens() < total_tokens_needed:
-        return Response(
-            {'error': f'Insufficient tokens. Required: {total_tokens_needed}, Available: {user.current_tokens()}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
-    serializer = OrderSerializer(data={'items': items}, context={'request': request})
-    serializer.is_valid(raise_exception=True)
-    order = serializer.save()
-
-    # Deduct tokens from user
-    user.monthly_tokens -= total_tokens_needed
-    user.save()
-
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-
-# Employee: View orders
-@api_view(['GET'])
-@permission_classes([IsEmployee])
-def employee_orders(request):
-    orders = Order.objects.filter(user=request.user).prefetch_related('order_items__menu_item')
-    today = timezone.now().date()
-
-    today_orders = orders.filter(created_at__date=today)
-    past_orders = orders.exclude(created_at__date=today)
-
-    today_serializer = OrderSerializer(today_orders, many=True)
-    past_serializer = OrderSerializer(past_orders, many=True)
-
-    return Response({
-        'today_orders': today_serializer.data,
-        'past_orders': past_serializer.data
-    })
-
-
-# ✅ Guest: View menu
-@api_view(['GET'])
-@permission_classes([IsGuest])
-def guest_menu(request):
-    menu_items = MenuItem.objects.filter(is_available=True)
-    serializer = MenuItemSerializer(menu_items, many=True)
-    return Response(serializer.data)
-
-
-# ✅ Guest: View orders
-@api_view(['GET'])
-@permission_classes([IsGuest])
-def guest_orders(request):
-    orders = Order.objects.filter(user=request.user).prefetch_related('order_items__menu_item')
-    today = timezone.now().date()
-
-    today_orders = orders.filter(created_at__date=today)
-    past_orders = orders.exclude(created_at__date=today)
-
-    today_serializer = OrderSerializer(today_orders, many=True)
-    past_serializer = OrderSerializer(past_orders, many=True)
-
-    return Response({
-        'today_orders': today_serializer.data,
-        'past_orders': past_serializer.data
-    })
-
-
-# ✅ Guest: Place order
-@api_view(['POST'])
-@permission_classes([IsGuest])
-def guest_place_order(request):
-    items = request.data.get('items', [])
-    if not items:
-        return Response({'error': 'No items provided'}, status=status.HTTP_400_BAD_REQUEST)
-
-    total_tokens_needed = 0
-    for item in items:
-        try:
-            menu_item = MenuItem.objects.get(id=item['menu_item_id'])
-            total_tokens_needed += menu_item.price * item['quantity']
-        except MenuItem.DoesNotExist:
-            return Response({'error': f'Menu item with id {item["menu_item_id"]} does not exist'},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-    user = request.user
-    
-    # Check if user has enough tokens
-    if user.current_tokens() < total_tokens_needed:
-        return Response(
-            {'error': f'Insufficient tokens. Required: {total_tokens_needed}, Available: {user.current_tokens()}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+# Employee and guest ordering (see ordering.py)
+employee_menu = MenuView.as_view(policy=EmployeePolicy())
+employee_place_order = PlaceOrderView.as_view(policy=EmployeePolicy())
+employee_orders = OrderHistoryView.as_view(policy=EmployeePolicy())
 
-    serializer = OrderSerializer(data={'items': items}, context={'request': request})
-    serializer.is_valid(raise_exception=True)
-    order = serializer.save()
+guest_menu = MenuView.as_view(policy=GuestPolicy())
+guest_place_order = PlaceOrderView.as_view(policy=GuestPolicy())
+guest_orders = OrderHistoryView.as_view(policy=GuestPolicy())
 
-    # Deduct tokens from user
-    user.monthly_tokens -= total_tokens_needed
-    user.save()
+# Async read endpoints for ASGI deployments (see async_views.py)
+async_employee_menu = async_views.menu_view(EmployeePolicy())
+async_employee_orders = async_views.order_history_view(EmployeePolicy())
+async_guest_menu = async_views.menu_view(GuestPolicy())
+async_guest_orders = async_views.order_history_view(GuestPolicy())
+async_profile = async_views.profile
+async_kitchen_queue = async_views.kitchen_queue
+async_login = async_views.login
 
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+# Kiosk badge login (see kiosk.py)
+kiosk_login = KioskLoginView.as_view()
+kiosk_order = KioskOrderView.as_view()
 
 
 # Token Management
@@ -448,36 +378,37 @@ def assign_tokens(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    shift_limits = {'day': 50, 'mid': 75, 'night': 100}
-    
-    # Check if it's within the first 3 days of the month
-    today = date.today()
-    if today.day > 3:
-        return Response(
-            {'error': 'Tokens can only be assigned within the first 3 days of the month'},
-            status=status.HTTP_400_BAD_REQUEST
+    # Use this month's configured allocation, creating it from the
+    # shift default when none has been set up yet
+    site_id = request_site_id(request)
+    month = timezone.localdate().replace(day=1)
+    allocation = ShiftTokenAllocation.objects.filter(site_id=site_id, shift=shift, allocation_month=month).first()
+    if allocation is None:
+        # Saving a new allocation applies it to the shift
+        allocation = ShiftTokenAllocation(
+            site_id=site_id, shift=shift, allocation_month=month,
+            tokens_per_user=settings.DEFAULT_SHIFT_TOKENS[shift]
         )
-    
-    users = CustomUser.objects.filter(
-        work_shift=shift,
-        role__in=['employee', 'guest']
-    )
-
-    # Bulk update tokens for users in the shift
-    updated = users.update(monthly_tokens=shift_limits[shift])
+        updated = due_users(month, site_id, shift, allocation.tokens_per_user).count()
+        allocation.save()
+    else:
+        updated = apply_allocations(month, shifts=[shift], site_ids=[site_id]).get((site_id, shift), 0)
 
     return Response({
         'status': 'success',
         'updated': updated,
-        'tokens_assigned': shift_limits[shift],
+        'tokens_assigned': allocation.tokens_per_user,
         'shift': shift
     })
 
 @api_view(['GET'])
 @permission_classes([IsAdmin])
+@throttle_classes([ReportThrottle])
+@reads_from_replica
+@cache_response('token_summary', ['dashboard', 'users'])
 def get_token_summary(request):
     users = CustomUser.objects.filter(
-        role__in=['employee', 'guest']
+        site_id=request_site_id(request), role__in=['employee', 'guest']
     ).order_by('work_shift', 'username')
     
     summary = {
@@ -501,18 +432,32 @@ def get_token_summary(request):
     
     return Response(summary)
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def get_cache_stats(request):
+    """Query cache hits and misses per cache name, for the process that answers"""
+    return Response({'backend': settings.CACHES[settings.QUERY_CACHE_ALIAS]['BACKEND'], 'caches': cache_stats()})
+
+
 # Dashboard views
 @api_view(['GET'])
 @permission_classes([IsAdmin])
+@throttle_classes([ReportThrottle])
+@reads_from_replica
+@cache_response('dashboard_stats', ['dashboard'])
 def get_dashboard_stats(request):
     """Get statistics for the admin dashboard"""
     try:
+        site_id = request_site_id(request)
+        users = CustomUser.objects.filter(site_id=site_id)
+        orders = Order.objects.filter(site_id=site_id)
+
         # Total users count
-        total_users = CustomUser.objects.count()
+        total_users = users.count()
         
         # User growth (percentage change from last month)
         last_month = timezone.now() - timedelta(days=30)
-        previous_users = CustomUser.objects.filter(
+        previous_users = users.filter(
             date_joined__lt=last_month
         ).count()
         
@@ -521,10 +466,11 @@ def get_dashboard_stats(request):
             user_growth = ((total_users - previous_users) / previous_users) * 100
         
         # Menu items count
-        total_menu_items = MenuItem.objects.count()
+        menu_items = MenuItem.objects.filter(site_id=site_id)
+        total_menu_items = menu_items.count()
         
         # New items this week
-        new_items_this_week = MenuItem.objects.filter(
+        new_items_this_week = menu_items.filter(
             created_at__gte=timezone.now() - timedelta(days=7)
         ).count()
         
@@ -532,24 +478,13 @@ def get_dashboard_stats(request):
         today = timezone.now().date()
         
         try:
-            value_expr = ExpressionWrapper(
-                F('order_items__tokens_per_item') * F('order_items__quantity'),
-                output_field=IntegerField(),
-            )
-
-            todays_orders = (
-                Order.objects.filter(created_at__date=today, status='completed')
-                .annotate(total_value=value_expr)
-            )
-            todays_revenue = todays_orders.aggregate(total=Sum('total_value'))['total'] or 0
+            todays_orders = orders.filter(created_at__date=today, status='completed')
+            todays_revenue = todays_orders.aggregate(total=Sum('total_tokens'))['total'] or 0
 
             # Revenue change from yesterday
             yesterday = today - timedelta(days=1)
-            yesterdays_orders = (
-                Order.objects.filter(created_at__date=yesterday, status='completed')
-                .annotate(total_value=value_expr)
-            )
-            yesterdays_revenue = yesterdays_orders.aggregate(total=Sum('total_value'))['total'] or 0
+            yesterdays_orders = orders.filter(created_at__date=yesterday, status='completed')
+            yesterdays_revenue = yesterdays_orders.aggregate(total=Sum('total_tokens'))['total'] or 0
 
             revenue_change = 0
             if yesterdays_revenue > 0:
@@ -560,11 +495,11 @@ def get_dashboard_stats(request):
         
         # Pending orders
         try:
-            pending_orders = Order.objects.filter(status='pending').count()
+            pending_orders = orders.filter(status='pending').count()
             
             # Pending change from yesterday
             yesterday = timezone.now().date() - timedelta(days=1)
-            yesterdays_pending = Order.objects.filter(
+            yesterdays_pending = orders.filter(
                 created_at__date=yesterday,
                 status='pending'
             ).count()
@@ -575,12 +510,12 @@ def get_dashboard_stats(request):
         
         # Get shift-wise employee counts
         try:
-            shift_employees = list(CustomUser.objects.filter(role='employee').values('work_shift').annotate(
+            shift_employees = list(users.filter(role='employee').values('work_shift').annotate(
                 count=Count('id')
             ))
             
             # Get shift-wise guest counts
-            shift_guests = list(CustomUser.objects.filter(role='guest').values('work_shift').annotate(
+            shift_guests = list(users.filter(role='guest').values('work_shift').annotate(
                 count=Count('id')
             ))
         except Exception as e:
@@ -588,8 +523,8 @@ def get_dashboard_stats(request):
             shift_guests = []
         
         # Get total staff and guest counts
-        total_staff = CustomUser.objects.filter(role='staff').count()
-        total_guests = CustomUser.objects.filter(role='guest').count()
+        total_staff = users.filter(role='staff').count()
+        total_guests = users.filter(role='guest').count()
         
         # Format shift data with default values
         shift_data = {
@@ -630,17 +565,20 @@ def get_dashboard_stats(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdmin])
+@throttle_classes([ReportThrottle])
+@reads_from_replica
+@cache_response('recent_orders', ['dashboard'])
 def get_recent_orders(request):
     """Get recent orders for the admin dashboard"""
     limit = int(request.query_params.get('limit', 5))
-    orders = Order.objects.select_related('user')\
-                         .prefetch_related('order_items__menu_item')\
+    orders = Order.objects.filter(site_id=request_site_id(request))\
+                         .select_related('user')\
                          .order_by('-created_at')[:limit]
     
     data = []
     for order in orders:
         user_name = order.user.username
-        items = [f"{item.quantity}x {item.menu_item.name}" for item in order.order_items.all()]
+        items = order.items_summary.splitlines()
         
         data.append({
             'id': order.id,
@@ -656,48 +594,54 @@ def get_recent_orders(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdmin])
+@throttle_classes([ReportThrottle])
+@reads_from_replica
+@cache_response('revenue_data', ['dashboard'])
 def get_revenue_data(request):
-    """Get revenue data for charts"""
-    period = request.query_params.get('period', 'week')
-    end_date = timezone.now().date()
-    
-    if period == 'week':
-        start_date = end_date - timedelta(days=6)
-        date_range = [start_date + timedelta(days=x) for x in range(7)]
-    elif period == 'month':
-        start_date = end_date - timedelta(days=29)
-        date_range = [start_date + timedelta(days=x) for x in range(30)]
-    else:  # year
-        start_date = end_date - timedelta(days=364)
-        date_range = [start_date + timedelta(days=x*30) for x in range(12)]
-    
-    # Get completed orders in the date range and aggregate in DB
-    value_expr = ExpressionWrapper(
-        F('order_items__tokens_per_item') * F('order_items__quantity'),
-        output_field=IntegerField(),
-    )
+    """Get revenue data for charts (daily for week/month, monthly for year)"""
+    try:
+        start_date, end_date, bucket = requested_range(request.query_params)
+        result = bucketed(request_site_id(request), start_date, end_date, bucket)
+    except AnalyticsError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    orders = (
-        Order.objects.filter(
-            created_at__date__range=[start_date, end_date], status='completed'
+    amounts = result['series'][0]['values']
+    data = [{'date': day, 'amount': float(amount)} for day, amount in zip(result['buckets'], amounts)]
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+@throttle_classes([ReportThrottle])
+@reads_from_replica
+@cache_response('analytics', ['dashboard'])
+def get_analytics(request):
+    """Bucketed revenue, order or item counts, optionally split by shift, role or menu item"""
+    params = request.query_params
+    try:
+        start_date, end_date, bucket = requested_range(params)
+        result = bucketed(
+            request_site_id(request), start_date, end_date, bucket,
+            metric=params.get('metric', 'revenue'), dimension=params.get('dimension') or None,
         )
-        .annotate(total_value=value_expr)
-        .values('created_at__date')
-        .annotate(amount=Sum('total_value'))
-    )
+    except AnalyticsError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
 
-    # Group by date
-    revenue_by_date = {row['created_at__date']: float(row['amount'] or 0) for row in orders}
-    
-    # Fill in missing dates with 0
-    data = []
-    for date in date_range:
-        data.append({
-            'date': date,
-            'amount': revenue_by_date.get(date, 0)
-        })
-    
-    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsStaffOrAdmin])
+@reads_from_replica
+def get_prep_forecast(request):
+    """Forecast prep quantities for ?date= (default tomorrow), from the nightly forecast_demand run"""
+    try:
+        day = parse_date(request.query_params.get('date') or '')
+    except ValueError:
+        day = None
+    if 'date' in request.query_params and day is None:
+        return Response({'error': 'Invalid date (expected YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    day = day or timezone.localdate() + timedelta(days=1)
+    return Response(prep_forecast(request_site_id(request), day))
 
 
 # Update password view
@@ -716,7 +660,7 @@ def update_password_view(request):
         )
     
     # Check if old password is correct
-    if not user.check_password(old_password):
+    if not hashing.check_password(user, old_password):
         return Response(
             {'error': 'Current password is incorrect'}, 
             status=status.HTTP_400_BAD_REQUEST
@@ -730,7 +674,7 @@ def update_password_view(request):
         )
     
     # Update password
-    user.set_password(new_password)
+    user.password = hashing.hash_password(new_password)
     user.save()
     
     return Response({'message': 'Password updated successfully'})
\ No newline at end of file
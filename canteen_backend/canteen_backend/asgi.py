@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'canteen_backend.settings')
 
 application = get_asgi_application()
+
+# Only serving processes sweep sessions; management commands and tests never start the thread
+from api.session_sweeper import start_session_sweeper  # noqa: E402
+
+start_session_sweeper()
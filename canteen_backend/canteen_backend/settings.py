@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from django.conf import global_settings
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,14 +23,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so preflight requests are answered before any other middleware runs
+    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Before sessions and auth, so shed writes cost next to nothing
+    'api.throttling.WriteConcurrencyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',  # Keep this high but after SessionMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.replica.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'canteen_backend.urls'
@@ -65,7 +70,7 @@ CSRF_TRUSTED_ORIGINS = [
 
 # CORS settings
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'X-Sync-Cursor']
 CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
@@ -75,8 +80,11 @@ CORS_ALLOW_HEADERS = [
     'origin',
     'user-agent',
     'x-csrftoken',
+    'x-kiosk-key',
     'x-requested-with',
 ]
+# Browsers cache preflight results for this many seconds
+CORS_PREFLIGHT_MAX_AGE = 86400
 CSRF_USE_SESSIONS = False
 
 # Session settings
@@ -85,6 +93,14 @@ CSRF_COOKIE_SECURE = False     # Set to True in production with HTTPS
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_AGE = 1209600  # 2 weeks, in seconds
 
+# Expired session cleanup (manage.py sweep_sessions from cron, or a
+# background thread in each server process, started from wsgi.py/asgi.py,
+# every SESSION_SWEEP_INTERVAL seconds when it is above 0; with several
+# worker processes prefer the command)
+SESSION_SWEEP_INTERVAL = config('SESSION_SWEEP_INTERVAL', default=0, cast=int)
+SESSION_SWEEP_BATCH_SIZE = config('SESSION_SWEEP_BATCH_SIZE', default=1000, cast=int)
+SESSION_SWEEP_MAX_BATCHES = config('SESSION_SWEEP_MAX_BATCHES', default=50, cast=int)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -108,16 +124,154 @@ DATABASES = {
     }
 }
 
+# Optional read replica for the admin dashboards and reports (see api/replica.py):
+# a second SQLite file, or the replica database name on DATABASE_REPLICA_HOST
+DATABASE_REPLICA = config('DATABASE_REPLICA', default='')
+if DATABASE_REPLICA:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DATABASE_REPLICA,
+        'HOST': config('DATABASE_REPLICA_HOST', default=DATABASES['default'].get('HOST', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.replica.ReplicaRouter']
+
+# After a write, the client reads its reports from the primary for this many seconds
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_PIN_COOKIE = 'replica_pin'
+
 AUTH_USER_MODEL = 'api.CustomUser'
 
+AUTHENTICATION_BACKENDS = ['api.backends.PooledModelBackend']
+
+# Password hashing. PASSWORD_HASHER_TIER picks the hasher for new hashes;
+# Django's default hashers (bcrypt included) and the other tiers stay
+# installed so existing hashes verify and are upgraded to the chosen tier
+# on the user's next login. 'argon2' needs argon2-cffi.
+PASSWORD_HASHER_TIER = config('PASSWORD_HASHER_TIER', default='pbkdf2')
+PASSWORD_HASHER_TIERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+}
+PASSWORD_HASHERS = list(dict.fromkeys([
+    PASSWORD_HASHER_TIERS[PASSWORD_HASHER_TIER],
+    *global_settings.PASSWORD_HASHERS,
+    *PASSWORD_HASHER_TIERS.values(),
+]))
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)
+PASSWORD_SCRYPT_BLOCK_SIZE = config('PASSWORD_SCRYPT_BLOCK_SIZE', default=8, cast=int)
+PASSWORD_SCRYPT_PARALLELISM = config('PASSWORD_SCRYPT_PARALLELISM', default=1, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+# Threads verifying passwords concurrently; 0 means one per CPU core
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=0, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
+        'api.authentication.SessionClaimAuthentication',
+        'api.authentication.KioskTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Token buckets (see api/throttling.py); "<scope>.<role>" overrides a
+    # per-user rate for one role, "role.<role>" caps a whole role
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserBucketThrottle',
+        'api.throttling.RoleBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': config('THROTTLE_ANON', default='300/min'),
+        'user': config('THROTTLE_USER', default='600/min'),
+        'orders': config('THROTTLE_ORDERS', default='20/min'),
+        'orders.guest': config('THROTTLE_ORDERS_GUEST', default='10/min'),
+        'role.guest': config('THROTTLE_ROLE_GUEST', default='1200/min'),
+        'reports': config('THROTTLE_REPORTS', default='60/min'),
+        'login': config('THROTTLE_LOGIN', default='10/min'),
+        'kiosk': config('THROTTLE_KIOSK', default='600/min'),
+    },
+}
+
+# Query result cache (see api/caching.py). Invalidation only reaches the
+# processes sharing the backend, so the cache is on by default only when
+# QUERY_CACHE_BACKEND/LOCATION point at a shared one (Redis, Memcached).
+# LocMemCache is per process: enable it explicitly for single-process
+# servers only; it evicts the least recently used entries beyond
+# QUERY_CACHE_MAX_ENTRIES and never holds per-user responses.
+QUERY_CACHE_ALIAS = 'query'
+QUERY_CACHE_BACKEND = config('QUERY_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+QUERY_CACHE_SHARED = not QUERY_CACHE_BACKEND.endswith(('LocMemCache', 'DummyCache'))
+QUERY_CACHE_ENABLED = config('QUERY_CACHE_ENABLED', default=QUERY_CACHE_SHARED, cast=bool)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    QUERY_CACHE_ALIAS: {
+        'BACKEND': QUERY_CACHE_BACKEND,
+        'LOCATION': config('QUERY_CACHE_LOCATION', default='canteen-query'),
+        'TIMEOUT': config('QUERY_CACHE_TIMEOUT', default=300, cast=int),
+    },
 }
+if QUERY_CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES[QUERY_CACHE_ALIAS]['OPTIONS'] = {
+        'MAX_ENTRIES': config('QUERY_CACHE_MAX_ENTRIES', default=5000, cast=int),
+        'CULL_FREQUENCY': 4,
+    }
+
+# Where throttle buckets live: api.throttling.LocMemBucketStore (per process),
+# FileBucketStore (SQLite file shared by local processes, option "path") or
+# CacheBucketStore (a CACHES alias such as a local Redis, option "alias")
+THROTTLE_STORE = config('THROTTLE_STORE', default='api.throttling.LocMemBucketStore')
+THROTTLE_STORE_OPTIONS = {}
+
+# Unsafe requests a process works on at once (0 = no cap), and how long an
+# extra one may wait for a turn before it is shed with 429
+WRITE_CONCURRENCY_LIMIT = config('WRITE_CONCURRENCY_LIMIT', default=8, cast=int)
+WRITE_CONCURRENCY_WAIT = config('WRITE_CONCURRENCY_WAIT', default=0.5, cast=float)
+
+# Seconds a session role claim is trusted before the user row is re-checked
+ROLE_CLAIM_TTL = config('ROLE_CLAIM_TTL', default=300, cast=int)
+
+# Tokens per user used by the assign endpoint when a shift has no
+# ShiftTokenAllocation for the current month
+DEFAULT_SHIFT_TOKENS = {'day': 50, 'mid': 75, 'night': 100}
+
+# Kiosk badge login: accepted device keys and token lifetime in seconds.
+# Each entry is "key=site-code"; a bare "key" serves the default canteen.
+KIOSK_DEVICE_KEYS = dict(
+    entry.partition('=')[::2] for entry in config('KIOSK_DEVICE_KEYS', default='', cast=Csv())
+)
+KIOSK_TOKEN_MAX_AGE = config('KIOSK_TOKEN_MAX_AGE', default=120, cast=int)
+
+# Serve list endpoints from .values() rows instead of DRF serializers
+FAST_SERIALIZATION = config('FAST_SERIALIZATION', default=True, cast=bool)
+
+# Days of earlier orders returned by the order history endpoints without ?month=
+ORDER_HISTORY_DAYS = config('ORDER_HISTORY_DAYS', default=30, cast=int)
+
+# Pickup slots (see api/slots.py): whether orders must name one, and how
+# long the menu's per-process view of remaining capacity may be reused
+PICKUP_SLOT_REQUIRED = config('PICKUP_SLOT_REQUIRED', default=False, cast=bool)
+PICKUP_SLOT_SNAPSHOT_TTL = config('PICKUP_SLOT_SNAPSHOT_TTL', default=5, cast=int)
+
+# Staff queue delta sync (see api/sync.py): seconds re-sent before each
+# cursor, and days deleted-order tombstones are kept (older cursors get 410)
+DELTA_SYNC_OVERLAP = config('DELTA_SYNC_OVERLAP', default=5, cast=int)
+ORDER_TOMBSTONE_DAYS = config('ORDER_TOMBSTONE_DAYS', default=7, cast=int)
+
+# Weeks of order history behind the nightly demand forecast (forecast_demand)
+FORECAST_WEEKS = config('FORECAST_WEEKS', default=8, cast=int)
+
+# Finished orders older than this move to the archive tables (archive_orders).
+# Keep it above the dashboards' one-year revenue window, which reads live orders only.
+ORDER_ARCHIVE_DAYS = config('ORDER_ARCHIVE_DAYS', default=400, cast=int)
 
 # Additional CORS & CSRF settings (duplicates removed above)
 
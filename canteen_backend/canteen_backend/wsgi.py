@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'canteen_backend.settings')
 
 application = get_wsgi_application()
+
+# Only serving processes sweep sessions; management commands and tests never start the thread
+from api.session_sweeper import start_session_sweeper  # noqa: E402
+
+start_session_sweeper()